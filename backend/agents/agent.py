@@ -1,12 +1,12 @@
 from dotenv import load_dotenv
 import asyncio
+import hashlib
 import os
 from pathlib import Path
 from textwrap import dedent
 import json
 import logging
-from datetime import datetime
-from typing import Dict, Optional, Any, List, Union
+from typing import Dict, Optional, Any, Awaitable, Callable, List, Tuple, Union
 from pydantic import BaseModel, Field
 import sys
 import traceback
@@ -17,10 +17,99 @@ from agno.agent import Agent
 from agno.models.google import Gemini
 from agno.tools.youtube import YouTubeTools
 
+from .article_utils import article_fetcher
+from .artifacts import ArtifactWriter
+from .cache import (
+    DiskStore,
+    LayeredCache,
+    TTLCache,
+    extraction_cache_key,
+    prompt_cache_key,
+    storage_dir,
+)
+from .chunking import chunk_text, estimate_tokens, merge_chunk_results
+from .rules import RuleEngine
+from .singleflight import SingleFlight
+from .sources import ContentSource, SourceMatch, YouTubeSource, source_router
+from .summarizer import summarize
+
 # Get model name from environment variables with fallbacks
 EXTRACT_MODEL = os.environ.get("EXTRACT_MODEL", "gemini-2.5-flash-preview-04-17")
 PROMPT_MODEL = os.environ.get("PROMPT_MODEL", "gemini-2.5-flash-preview-04-17")
 
+# Extraction cache configuration
+EXTRACTION_CACHE_ENABLED = (
+    os.environ.get("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+)
+EXTRACTION_CACHE_MAX_ENTRIES = int(
+    os.environ.get("EXTRACTION_CACHE_MAX_ENTRIES", "512")
+)
+EXTRACTION_CACHE_TTL_SECONDS = int(
+    os.environ.get("EXTRACTION_CACHE_TTL_SECONDS", str(24 * 3600))
+)
+EXTRACTION_CACHE_DISK_TTL_SECONDS = int(
+    os.environ.get("EXTRACTION_CACHE_DISK_TTL_SECONDS", str(7 * 24 * 3600))
+)
+EXTRACTION_CACHE_DISK_MAX_BYTES = int(
+    os.environ.get("EXTRACTION_CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024))
+)
+
+# Prompt cache configuration
+PROMPT_CACHE_ENABLED = os.environ.get("PROMPT_CACHE_ENABLED", "true").lower() == "true"
+PROMPT_CACHE_MAX_ENTRIES = int(os.environ.get("PROMPT_CACHE_MAX_ENTRIES", "1024"))
+PROMPT_CACHE_TTL_SECONDS = int(
+    os.environ.get("PROMPT_CACHE_TTL_SECONDS", str(24 * 3600))
+)
+
+# Hedged YouTube extraction: "off", "immediate" or "delayed"
+EXTRACT_HEDGE_MODE = os.environ.get("EXTRACT_HEDGE_MODE", "off").lower()
+EXTRACT_HEDGE_DELAY_SECONDS = float(os.environ.get("EXTRACT_HEDGE_DELAY", "8.0"))
+
+# Background artifact log of extractions and prompts
+ARTIFACTS_ENABLED = os.environ.get("ARTIFACTS_ENABLED", "true").lower() == "true"
+ARTIFACTS_DIR = os.environ.get("ARTIFACTS_DIR", str(storage_dir.joinpath("artifacts")))
+ARTIFACTS_MAX_QUEUE = int(os.environ.get("ARTIFACTS_MAX_QUEUE", "1024"))
+ARTIFACTS_SEGMENT_MAX_BYTES = int(
+    os.environ.get("ARTIFACTS_SEGMENT_MAX_BYTES", str(8 * 1024 * 1024))
+)
+ARTIFACTS_MAX_SEGMENTS = int(os.environ.get("ARTIFACTS_MAX_SEGMENTS", "50"))
+ARTIFACTS_MAX_AGE_SECONDS = int(
+    os.environ.get("ARTIFACTS_MAX_AGE_SECONDS", str(7 * 24 * 3600))
+)
+
+# Transcripts longer than the threshold are extracted in parallel chunks
+EXTRACT_CHUNK_THRESHOLD_TOKENS = int(
+    os.environ.get("EXTRACT_CHUNK_THRESHOLD_TOKENS", "24000")
+)
+EXTRACT_CHUNK_TOKENS = int(os.environ.get("EXTRACT_CHUNK_TOKENS", "6000"))
+EXTRACT_CHUNK_CONCURRENCY = int(os.environ.get("EXTRACT_CHUNK_CONCURRENCY", "4"))
+
+# Offline transcript analysis rule packs. Transcripts no pack matches well
+# enough get an extractive summary, unless RULES_DEFAULT_PACK names a pack.
+RULE_PACKS_DIR = os.environ.get(
+    "RULE_PACKS_DIR", str(Path(__file__).parent.resolve().joinpath("rule_packs"))
+)
+RULES_DEFAULT_PACK = os.environ.get("RULES_DEFAULT_PACK", "") or None
+
+# Extraction output: "markdown" parses JSON out of free text; "structured" has
+# the model emit InsightOutput directly against its schema (transcript path)
+EXTRACT_OUTPUT_MODE = os.environ.get("EXTRACT_OUTPUT_MODE", "markdown").lower()
+
+# Transcript prompt-template attempts: "sequential" (quota-friendly) or "parallel"
+TRANSCRIPT_TEMPLATE_STRATEGY = os.environ.get(
+    "TRANSCRIPT_TEMPLATE_STRATEGY", "sequential"
+).lower()
+TRANSCRIPT_TEMPLATE_CONCURRENCY = int(
+    os.environ.get("TRANSCRIPT_TEMPLATE_CONCURRENCY", "3")
+)
+
+# How a result was produced, reported to callers that charge for upstream work
+OUTCOME_CACHE_HIT = "cache_hit"
+OUTCOME_COALESCED = "coalesced"
+OUTCOME_FULL = "full"
+# Placeholders and fallbacks produced when the upstream work failed
+OUTCOME_FAILED = "failed"
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -28,12 +117,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger("introspect_agent")
 
-# Define output directory for saving responses
-cwd = Path(__file__).parent.resolve()
-output_dir = cwd.joinpath("outputs")
-output_dir.mkdir(exist_ok=True, parents=True)
-
-
 # Define Pydantic models for structured output
 class Insight(BaseModel):
     point: str = Field(description="A key takeaway or insight from the content")
@@ -46,105 +129,281 @@ class InsightOutput(BaseModel):
     insights: List[Insight] = Field(description="List of key insights from the content")
 
 
+EXTRACT_DESCRIPTION = dedent(
+    """
+    You are "Insight-Extractor", a multimodal analyst specialized in 
+    distilling the most valuable and actionable information from any content.
+    """
+)
+
+EXTRACT_INSTRUCTIONS = dedent(
+    """
+    Extract concise, *action-ready* insights from the user-supplied content.
+    
+    Follow these key guidelines:
+    - Focus on principles, actionable advice, and practical insights
+    - Ignore filler content, greetings, ads, and non-essential information
+    - Maintain factual accuracy and avoid hallucinations
+    - Extract no more than 7 key insights from the content
+    - Ensure the summary is comprehensive but concise (200 words max)
+    
+    When processing YouTube videos:
+    - Prioritize extracting the transcript from the video
+    - Focus on the actual content and main points rather than visual elements
+    - If given a transcript directly, process it as if it's the content of the video
+    
+    Your output must include:
+    - A title for the content
+    - A comprehensive summary (≤200 words)
+    - A list of key insights, each with:
+      * point: The key takeaway
+      * type: Either 'actionable', 'fact', or 'quote'
+
+    If you cannot access the content or there's an error retrieving it:
+    - Specify in the title that the content was inaccessible
+    - Provide a summary explaining why the content couldn't be accessed
+    - Include at least one insight about error handling or potential alternatives
+    
+    Always format your response as valid JSON with the following structure:
+    {
+      "title": "Content Title",
+      "summary": "Brief summary of the content",
+      "insights": [
+        {"point": "First key insight", "type": "actionable"},
+        {"point": "Second key insight", "type": "fact"},
+        {"point": "Third key insight", "type": "quote"}
+      ]
+    }
+    """
+)
+
+# Bump via EXTRACT_INSTRUCTIONS_VERSION to invalidate cached extractions without
+# editing the instructions; by default the version tracks the instruction text.
+EXTRACT_INSTRUCTIONS_VERSION = os.environ.get(
+    "EXTRACT_INSTRUCTIONS_VERSION",
+    hashlib.sha256(
+        (EXTRACT_DESCRIPTION + EXTRACT_INSTRUCTIONS).encode("utf-8")
+    ).hexdigest()[:12],
+)
+
+
+PROMPT_DESCRIPTION = dedent(
+    """
+    You are "Prompt-Architect", a specialist at creating personalized, 
+    actionable prompts that transform general knowledge into tailored advice.
+    """
+)
+
+PROMPT_INSTRUCTIONS = dedent(
+    """
+    Create a personalized prompt that the user can paste directly into ChatGPT.
+    
+    Your prompt must:
+    1. Begin with: "From what you know about me, I want you to apply these insights that I learned from a resource to my life..."
+    2. Include all of the key insights passed to you in context. Preserve all the original points but output it in the prompt as plain text. 
+    3. Reference the user's personal context (interests, goals, background)
+    4. Request an actionable plan with specific steps, timeline, and metrics
+    5. End with: "----"
+    6. Stay under 1000 words total
+    7. Be directly usable without additional editing
+
+    If the insights indicate that content couldn't be accessed:
+    - Acknowledge the problem in your prompt
+    - Pivot to asking for strategies to overcome information access barriers
+    - Request alternative sources or approaches for the same topic
+    
+    Only output the prompt text—no extra commentary, no JSON.
+    """
+)
+
+# Cached prompts are invalidated when the prompt instructions change
+PROMPT_INSTRUCTIONS_VERSION = os.environ.get(
+    "PROMPT_INSTRUCTIONS_VERSION",
+    hashlib.sha256(
+        (PROMPT_DESCRIPTION + PROMPT_INSTRUCTIONS).encode("utf-8")
+    ).hexdigest()[:12],
+)
+
+
 class IntrospectAgent:
     def __init__(self, debug_mode: bool = False):
         self.debug_mode = debug_mode
         self._loop = None
 
-        # Extract Agent - First hop in the two-hop process
-        self.extract_agent = Agent(
-            model=Gemini(id=EXTRACT_MODEL),
-            description=dedent(
-                """
-                You are "Insight-Extractor", a multimodal analyst specialized in 
-                distilling the most valuable and actionable information from any content.
-                """
-            ),
-            instructions=dedent(
-                """
-                Extract concise, *action-ready* insights from the user-supplied content.
-                
-                Follow these key guidelines:
-                - Focus on principles, actionable advice, and practical insights
-                - Ignore filler content, greetings, ads, and non-essential information
-                - Maintain factual accuracy and avoid hallucinations
-                - Extract no more than 7 key insights from the content
-                - Ensure the summary is comprehensive but concise (200 words max)
-                
-                When processing YouTube videos:
-                - Prioritize extracting the transcript from the video
-                - Focus on the actual content and main points rather than visual elements
-                - If given a transcript directly, process it as if it's the content of the video
-                
-                Your output must include:
-                - A title for the content
-                - A comprehensive summary (≤200 words)
-                - A list of key insights, each with:
-                  * point: The key takeaway
-                  * type: Either 'actionable', 'fact', or 'quote'
-
-                If you cannot access the content or there's an error retrieving it:
-                - Specify in the title that the content was inaccessible
-                - Provide a summary explaining why the content couldn't be accessed
-                - Include at least one insight about error handling or potential alternatives
-                
-                Always format your response as valid JSON with the following structure:
-                {
-                  "title": "Content Title",
-                  "summary": "Brief summary of the content",
-                  "insights": [
-                    {"point": "First key insight", "type": "actionable"},
-                    {"point": "Second key insight", "type": "fact"},
-                    {"point": "Third key insight", "type": "quote"}
-                  ]
-                }
-                """
-            ),
-            tools=[YouTubeTools()],
-            markdown=True,
-            show_tool_calls=True,
-            debug_mode=debug_mode,
-            add_datetime_to_instructions=True,
+        # Layered extraction cache (memory LRU in front of a disk store)
+        self.extraction_cache = None
+        if EXTRACTION_CACHE_ENABLED:
+            self.extraction_cache = LayeredCache(
+                TTLCache(
+                    max_entries=EXTRACTION_CACHE_MAX_ENTRIES,
+                    ttl_seconds=EXTRACTION_CACHE_TTL_SECONDS,
+                ),
+                DiskStore(
+                    storage_dir.joinpath("extractions"),
+                    ttl_seconds=EXTRACTION_CACHE_DISK_TTL_SECONDS,
+                    max_bytes=EXTRACTION_CACHE_DISK_MAX_BYTES,
+                ),
+            )
+
+        # Second-hop cache of generated prompts
+        self.prompt_cache = None
+        if PROMPT_CACHE_ENABLED:
+            self.prompt_cache = TTLCache(
+                max_entries=PROMPT_CACHE_MAX_ENTRIES,
+                ttl_seconds=PROMPT_CACHE_TTL_SECONDS,
+            )
+
+        # Coalesces concurrent extractions of the same content into one run
+        self.extraction_flight = SingleFlight()
+
+        # Extraction pipeline per content source; other sources go to the
+        # extraction agent
+        self.source_extractors: Dict[
+            str, Callable[[SourceMatch], Awaitable[Dict[str, Any]]]
+        ] = {
+            "youtube": self._youtube_extraction,
+            "article": self._article_extraction,
+        }
+
+        # Rule packs for offline transcript analysis, compiled once
+        self.rule_engine = RuleEngine.from_directory(
+            Path(RULE_PACKS_DIR), RULES_DEFAULT_PACK
         )
 
+        # Outcomes of schema-constrained extraction runs
+        self.structured_output_stats = {
+            "attempts": 0,
+            "parsed": 0,
+            "empty_responses": 0,
+            "validation_failures": 0,
+            "too_few_insights": 0,
+            "errors": 0,
+        }
+
+        # Artifacts are written off the request path by a background thread
+        self.artifacts = None
+        if ARTIFACTS_ENABLED:
+            self.artifacts = ArtifactWriter(
+                Path(ARTIFACTS_DIR),
+                max_queue=ARTIFACTS_MAX_QUEUE,
+                segment_max_bytes=ARTIFACTS_SEGMENT_MAX_BYTES,
+                max_segments=ARTIFACTS_MAX_SEGMENTS,
+                max_age_seconds=ARTIFACTS_MAX_AGE_SECONDS,
+            )
+            # Old segments are deleted at startup, not only once one rotates
+            self.artifacts.start()
+
+        # Extract Agents - First hop in the two-hop process. Agno agents keep
+        # per-run state on the instance, and extractions for different
+        # requests or hedged paths run concurrently, so each extraction run
+        # gets its own agent from _build_extract_agent().
+
         # Prompt Agent - Second hop in the two-hop process
         self.prompt_agent = Agent(
             model=Gemini(id=PROMPT_MODEL),
-            description=dedent(
-                """
-                You are "Prompt-Architect", a specialist at creating personalized, 
-                actionable prompts that transform general knowledge into tailored advice.
-                """
-            ),
-            instructions=dedent(
-                """
-                Create a personalized prompt that the user can paste directly into ChatGPT.
-                
-                Your prompt must:
-                1. Begin with: "From what you know about me, I want you to apply these insights that I learned from a resource to my life..."
-                2. Include all of the key insights passed to you in context. Preserve all the original points but output it in the prompt as plain text. 
-                3. Reference the user's personal context (interests, goals, background)
-                4. Request an actionable plan with specific steps, timeline, and metrics
-                5. End with: "----"
-                6. Stay under 1000 words total
-                7. Be directly usable without additional editing
-
-                If the insights indicate that content couldn't be accessed:
-                - Acknowledge the problem in your prompt
-                - Pivot to asking for strategies to overcome information access barriers
-                - Request alternative sources or approaches for the same topic
-                
-                Only output the prompt text—no extra commentary, no JSON.
-                """
-            ),
+            description=PROMPT_DESCRIPTION,
+            instructions=PROMPT_INSTRUCTIONS,
             markdown=True,
             debug_mode=debug_mode,
         )
 
+        if EXTRACT_OUTPUT_MODE == "structured" and EXTRACT_HEDGE_MODE != "off":
+            # Structured mode always takes the transcript path, so there is no
+            # tool path to race against it
+            logger.warning(
+                f"EXTRACT_HEDGE_MODE={EXTRACT_HEDGE_MODE} has no effect with "
+                "EXTRACT_OUTPUT_MODE=structured; YouTube extraction is not hedged"
+            )
+
         logger.info("IntrospectAgent initialized")
 
+    def _build_extract_agent(self) -> Agent:
+        """
+        Create an extraction agent.
+
+        Agno agents keep per-run state on the instance, so runs that must
+        execute concurrently each get their own agent from this factory.
+        """
+        return Agent(
+            model=Gemini(id=EXTRACT_MODEL),
+            description=EXTRACT_DESCRIPTION,
+            instructions=EXTRACT_INSTRUCTIONS,
+            tools=[YouTubeTools()],
+            markdown=True,
+            show_tool_calls=True,
+            debug_mode=self.debug_mode,
+            add_datetime_to_instructions=True,
+        )
+
+    def _build_structured_extract_agent(self) -> Agent:
+        """
+        Create an extraction agent whose output is constrained to InsightOutput.
+
+        Gemini cannot combine a response schema with tool calls, so this agent
+        has no tools and is given the transcript directly.
+        """
+        return Agent(
+            model=Gemini(id=EXTRACT_MODEL),
+            description=EXTRACT_DESCRIPTION,
+            instructions=EXTRACT_INSTRUCTIONS,
+            response_model=InsightOutput,
+            debug_mode=self.debug_mode,
+            add_datetime_to_instructions=True,
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return cache and pipeline counters for monitoring"""
+        from .youtube_utils import (
+            transcript_normalizer,
+            transcript_store,
+            unavailable_videos,
+        )
+
+        return {
+            "extraction_cache": (
+                self.extraction_cache.stats() if self.extraction_cache else None
+            ),
+            "extraction_singleflight": self.extraction_flight.stats(),
+            "prompt_cache": self.prompt_cache.stats() if self.prompt_cache else None,
+            "transcript_store": transcript_store.stats(),
+            "transcript_normalizer": transcript_normalizer.stats(),
+            "unavailable_videos": unavailable_videos.stats(),
+            "articles": article_fetcher.stats(),
+            "sources": source_router.stats(),
+            "artifacts": self.artifacts.stats() if self.artifacts else None,
+            "rule_engine": self.rule_engine.stats(),
+            "structured_output": {
+                "mode": EXTRACT_OUTPUT_MODE,
+                **self.structured_output_stats,
+            },
+        }
+
+    def _save_output(
+        self, kind: str, content: Union[str, Dict[str, Any]]
+    ) -> Optional[str]:
+        """
+        Queue a response artifact for the background artifact writer.
+
+        Never blocks: the record is dropped if the writer is backed up.
+
+        Args:
+            kind: Artifact type, e.g. "extract" or "prompt"
+            content: Text or JSON-serializable data
+
+        Returns:
+            Record id, or None if artifacts are disabled or the record was dropped
+        """
+        if self.artifacts is None:
+            return None
+        return self.artifacts.write(kind, content)
+
     def _get_event_loop(self):
-        """Get or create an event loop in a thread-safe way"""
+        """
+        Get or create an event loop for the synchronous wrappers.
+
+        Only used by the sync CLI entry points; the API awaits the async
+        methods directly on the server's event loop.
+        """
         try:
             # Try to get the current event loop
             loop = asyncio.get_event_loop()
@@ -260,10 +519,16 @@ class IntrospectAgent:
     def _create_default_extraction_data(
         self, title: str, summary: str
     ) -> Dict[str, Any]:
-        """Create default extraction data structure for error cases"""
+        """
+        Create default extraction data structure for error cases.
+
+        The error flag marks the result as a placeholder, so it is never
+        cached, never wins a hedged race and is not merged as a chunk result.
+        """
         return {
             "title": title,
             "summary": summary,
+            "error": True,
             "insights": [
                 {
                     "point": "The system encountered an error processing the content.",
@@ -280,36 +545,289 @@ class IntrospectAgent:
             ],
         }
 
-    async def extract_key_points_async(self, resource_url: str) -> Dict[str, Any]:
+    def _is_valid_extraction(self, data: Dict[str, Any]) -> bool:
+        """
+        Check that an extraction is a real result rather than a placeholder.
+
+        Error placeholders and offline direct analysis don't count, so they
+        are neither cached nor accepted as the winner of a hedged race.
+        """
+        if not data or not data.get("insights"):
+            return False
+        if data.get("error") is True:
+            return False
+        # Direct transcript analysis is a degraded result worth retrying later
+        if "raw_transcript" in data:
+            return False
+
+        try:
+            InsightOutput.model_validate(data)
+        except ValueError:
+            return False
+        return True
+
+    async def extract_key_points_async(
+        self, resource_url: str, content_hash: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Extract key points from a resource (like a YouTube video) asynchronously.
 
+        Results are served from the extraction cache when the same content was
+        already processed with the current model and instructions. Concurrent
+        requests for the same content share a single extraction run.
+
         Args:
             resource_url (str): URL to the resource to extract insights from
+            content_hash (Optional[str]): SHA-256 of uploaded content, used as the
+                cache key instead of the resource name
 
         Returns:
             Dict[str, Any]: Extracted key points and insights as structured data
         """
-        logger.info(f"Extracting insights from: {resource_url}")
+        data, _ = await self.extract_key_points_with_outcome_async(
+            resource_url, content_hash
+        )
+        return data
+
+    async def extract_key_points_with_outcome_async(
+        self, resource_url: str, content_hash: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], str]:
+        """
+        Extract key points and report how the result was produced.
+
+        Args:
+            resource_url (str): URL to the resource to extract insights from
+            content_hash (Optional[str]): SHA-256 of uploaded content
+
+        Returns:
+            Tuple[Dict[str, Any], str]: The extracted data and one of
+            OUTCOME_CACHE_HIT, OUTCOME_COALESCED, OUTCOME_FULL or
+            OUTCOME_FAILED. Videos
+            that recently failed are answered from the negative cache and
+            reported as OUTCOME_CACHE_HIT.
+        """
+        match = source_router.route(resource_url)
+        if content_hash:
+            match.params["content_hash"] = content_hash
+
+        if match.source.name == "youtube":
+            known_failure = self._known_unavailable_extraction(resource_url)
+            if known_failure is not None:
+                return known_failure, OUTCOME_CACHE_HIT
+
+        cache_key = extraction_cache_key(
+            match.key, EXTRACT_MODEL, EXTRACT_INSTRUCTIONS_VERSION
+        )
+        return await self._cached_extraction(
+            cache_key,
+            resource_url,
+            lambda: self._extract_key_points_uncached(match),
+        )
+
+    async def extract_text_with_outcome_async(
+        self,
+        text: str,
+        source_info: Dict[str, Any],
+        content_hash: str,
+        chunks: Optional[List[str]] = None,
+    ) -> Tuple[Dict[str, Any], str]:
+        """
+        Extract key points from already extracted text, such as an uploaded file.
+
+        The text goes through the same extraction hop as YouTube transcripts,
+        and shares the extraction cache and in-flight coalescing.
+
+        Args:
+            text (str): Document text
+            source_info (Dict[str, Any]): Metadata with at least a title
+            content_hash (str): SHA-256 of the original content, the cache key
+            chunks (Optional[List[str]]): The text already split into chunks
+                of EXTRACT_CHUNK_TOKENS, used if the text is long
+
+        Returns:
+            Tuple[Dict[str, Any], str]: The extracted data and one of
+            OUTCOME_CACHE_HIT, OUTCOME_COALESCED, OUTCOME_FULL or
+            OUTCOME_FAILED
+        """
+        title = source_info.get("title", "uploaded text")
+        match = source_router.route_upload(
+            source_info.get("mime_type"), content_hash, title
+        )
+        source_info = {**source_info, "content_noun": match.source.content_noun}
+
+        cache_key = extraction_cache_key(
+            match.key, EXTRACT_MODEL, EXTRACT_INSTRUCTIONS_VERSION
+        )
+        return await self._cached_extraction(
+            cache_key,
+            title,
+            lambda: self._run_source_extraction(
+                match,
+                lambda: self._try_extract_insights_from_transcript(
+                    source_info, text, chunks
+                ),
+            ),
+        )
+
+    async def _cached_extraction(
+        self,
+        cache_key: str,
+        label: str,
+        run: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Tuple[Dict[str, Any], str]:
+        """
+        Serve an extraction from the cache, an in-flight run or a new run.
+
+        Args:
+            cache_key: Extraction cache key
+            label: Resource name for logging
+            run: Coroutine factory performing the extraction
+
+        Returns:
+            Tuple of the extracted data and its outcome; error placeholders
+            are reported as OUTCOME_FAILED
+        """
+        if self.extraction_cache is not None:
+            cached = await self.extraction_cache.aget(cache_key)
+            if cached is not None:
+                logger.info(f"Extraction cache hit for: {label}")
+                return cached, OUTCOME_CACHE_HIT
+
+        data, shared = await self.extraction_flight.do(
+            cache_key, lambda: self._extract_and_cache(run, cache_key)
+        )
+        if data.get("error") is True:
+            return data, OUTCOME_FAILED
+        if shared:
+            logger.info(f"Coalesced with in-flight extraction for: {label}")
+            return data, OUTCOME_COALESCED
+
+        return data, OUTCOME_FULL
+
+    async def _extract_and_cache(
+        self, run: Callable[[], Awaitable[Dict[str, Any]]], cache_key: str
+    ) -> Dict[str, Any]:
+        """Run an extraction and store cacheable results"""
+        data = await run()
+
+        if self.extraction_cache is not None and self._is_valid_extraction(data):
+            await self.extraction_cache.aset(cache_key, data)
 
-        # Check if this is a YouTube URL
-        is_youtube = "youtube.com" in resource_url or "youtu.be" in resource_url
+        return data
 
+    async def _extract_key_points_uncached(self, match: SourceMatch) -> Dict[str, Any]:
+        """
+        Run the full extraction pipeline for a resource, bypassing the cache.
+
+        Args:
+            match (SourceMatch): The resource routed to its source
+
+        Returns:
+            Dict[str, Any]: Extracted key points and insights as structured data
+        """
+        logger.info(f"Extracting insights from {match.source.name}: {match.resource}")
+
+        extractor = self.source_extractors.get(
+            match.source.name, self._agent_extraction
+        )
+        return await self._run_source_extraction(match, lambda: extractor(match))
+
+    async def _run_source_extraction(
+        self, match: SourceMatch, run: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Run an extraction within the time and concurrency limits of its source.
+
+        Args:
+            match: The resource routed to its source
+            run: Coroutine factory performing the extraction
+
+        Returns:
+            Extraction data dictionary
+        """
         try:
-            # First attempt: Use the Agno agent with built-in YouTube tools
-            response = await self.extract_agent.arun(resource_url)
+            return await match.source.run(run)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Extraction from {match.resource} exceeded the {match.source.timeout_seconds}s limit of the {match.source.name} source"
+            )
+            return self._create_default_extraction_data(
+                match.source.error_title,
+                f"Extraction from {match.resource} took longer than {match.source.timeout_seconds:g} seconds.",
+            )
 
-            if self.debug_mode:
-                logger.debug(
-                    f"Extraction response content type: {type(response.content)}"
-                )
-                if response.content:
-                    logger.debug(f"Extraction response length: {len(response.content)}")
-                    logger.debug(
-                        f"Extraction response snippet: {response.content[:100]}..."
-                    )
-                else:
-                    logger.debug("Extraction response is empty")
+    async def _youtube_extraction(self, match: SourceMatch) -> Dict[str, Any]:
+        """
+        Extract insights from a YouTube video.
+
+        Args:
+            match: The video URL routed to the YouTube source
+
+        Returns:
+            Extraction data dictionary
+        """
+        resource_url = match.resource
+
+        if EXTRACT_OUTPUT_MODE == "structured":
+            # Fetch the transcript ourselves so the model can answer with the
+            # schema instead of calling tools. This is the hedge's backup path
+            # on its own, so EXTRACT_HEDGE_MODE does not apply.
+            return await self._try_backup_youtube_extraction(resource_url)
+
+        if EXTRACT_HEDGE_MODE in ("immediate", "delayed"):
+            return await self._hedged_youtube_extraction(resource_url)
+
+        return await self._agent_extraction(match)
+
+    def _known_unavailable_extraction(
+        self, resource_url: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Answer for a video that recently failed, without any upstream work.
+
+        Known-dead videos skip the cache, the tool run, the backup fetch and
+        the LLM attempts.
+
+        Args:
+            resource_url: YouTube URL
+
+        Returns:
+            The access error placeholder, or None if the video is not known
+            to be unavailable
+        """
+        from .youtube_utils import get_known_unavailable
+
+        known_failure = get_known_unavailable(resource_url)
+        if known_failure is None:
+            return None
+
+        logger.info(
+            f"Video recently failed with {known_failure['error_class']}, skipping extraction"
+        )
+        return self._create_default_extraction_data(
+            "YouTube Video Access Error",
+            f"Unable to access the YouTube video at {resource_url}. This could be due to regional restrictions, privacy settings, age restrictions, or the video being unavailable/deleted.",
+        )
+
+    async def _agent_extraction(self, match: SourceMatch) -> Dict[str, Any]:
+        """
+        Extract insights by handing the resource to the extraction agent.
+
+        YouTube videos fall back to fetching the transcript directly when
+        the agent's tools fail.
+
+        Args:
+            match: The resource routed to its source
+
+        Returns:
+            Extraction data dictionary
+        """
+        resource_url = match.resource
+        is_youtube = match.source.name == "youtube"
+
+        try:
+            # First attempt: Use the Agno agent with built-in YouTube tools
+            response = await self._run_extract_agent(resource_url)
 
             # Handle empty response
             if not response or not response.content:
@@ -328,12 +846,9 @@ class IntrospectAgent:
                 data = self._safe_extract_json(response.content)
 
                 # Save the extracted data
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                output_path = output_dir.joinpath(f"extract_{timestamp}.json")
-                with open(output_path, "w") as f:
-                    json.dump(data, f, indent=2)
+                artifact_id = self._save_output("extract", data)
 
-                logger.info(f"Extracted data saved to {output_path}")
+                logger.info(f"Extracted data saved as artifact {artifact_id}")
                 return data
 
             except Exception as e:
@@ -362,6 +877,131 @@ class IntrospectAgent:
                     f"Failed to access or process the content from {resource_url}. Error: {str(e)}",
                 )
 
+    async def _run_extract_agent(self, resource_url: str):
+        """Run a fresh extraction agent (with YouTube tools) on a resource"""
+        response = await self._build_extract_agent().arun(resource_url)
+
+        if self.debug_mode:
+            logger.debug(f"Extraction response content type: {type(response.content)}")
+            if response.content:
+                logger.debug(f"Extraction response length: {len(response.content)}")
+                logger.debug(
+                    f"Extraction response snippet: {response.content[:100]}..."
+                )
+            else:
+                logger.debug("Extraction response is empty")
+
+        return response
+
+    async def _tool_path_extraction(self, resource_url: str) -> Dict[str, Any]:
+        """
+        Extract via the agent's YouTube tools, without any fallback.
+
+        Raises:
+            ValueError: If the agent returned an empty response
+        """
+        response = await self._run_extract_agent(resource_url)
+        if not response or not response.content:
+            raise ValueError("Empty response from extraction agent")
+
+        data = self._safe_extract_json(response.content)
+
+        self._save_output("extract", data)
+        return data
+
+    async def _hedged_youtube_extraction(self, resource_url: str) -> Dict[str, Any]:
+        """
+        Race the YouTube tool path against the transcript backup path.
+
+        The backup path starts immediately or after EXTRACT_HEDGE_DELAY seconds
+        (sooner if the tool path finishes first without a usable result). The
+        first result that passes validation wins and the other path is
+        cancelled. If neither produces a valid result, the best available
+        fallback is returned.
+
+        Args:
+            resource_url: YouTube URL
+
+        Returns:
+            Extraction data dictionary
+        """
+        primary = asyncio.create_task(self._tool_path_extraction(resource_url))
+
+        async def hedge() -> Dict[str, Any]:
+            if EXTRACT_HEDGE_MODE == "delayed" and EXTRACT_HEDGE_DELAY_SECONDS > 0:
+                await asyncio.wait({primary}, timeout=EXTRACT_HEDGE_DELAY_SECONDS)
+            logger.info(f"Starting hedged backup extraction for: {resource_url}")
+            return await self._try_backup_youtube_extraction(resource_url)
+
+        backup = asyncio.create_task(hedge())
+        pending = {primary, backup}
+        fallback = None
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    path = "tool" if task is primary else "backup"
+                    if task.exception() is not None:
+                        logger.warning(
+                            f"Hedged {path} path failed: {str(task.exception())}"
+                        )
+                        continue
+
+                    data = task.result()
+                    if self._is_valid_extraction(data):
+                        logger.info(f"Hedged extraction won by {path} path")
+                        return data
+
+                    # Keep the backup path's result: it carries the specific
+                    # access error or the direct transcript analysis
+                    if fallback is None or task is backup:
+                        fallback = data
+        finally:
+            for task in pending:
+                task.cancel()
+            # Let the losing path unwind before returning
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        if fallback is not None:
+            return fallback
+
+        return self._create_default_extraction_data(
+            "YouTube Video Access Error",
+            f"Unable to access the YouTube video at {resource_url}.",
+        )
+
+    async def _article_extraction(self, match: SourceMatch) -> Dict[str, Any]:
+        """
+        Extract insights from a web article fetched and cleaned locally.
+
+        Args:
+            match: The URL routed to the article source
+
+        Returns:
+            Extraction data dictionary
+        """
+        resource_url = match.resource
+        article = await article_fetcher.fetch(resource_url)
+        if article["error"]:
+            logger.warning(
+                f"Article fetch failed for {resource_url}: {article['message']}"
+            )
+            return self._create_default_extraction_data(
+                "Content Access Error",
+                f"Unable to read an article at {resource_url}. {article['message']}.",
+            )
+
+        logger.info(
+            f"Fetched article ({article['cache']}), extracting insights from its text"
+        )
+        return await self._try_extract_insights_from_transcript(
+            {**article["article_info"], "content_noun": match.source.content_noun},
+            article["content"],
+        )
+
     async def _try_backup_youtube_extraction(self, resource_url: str) -> Dict[str, Any]:
         """
         Try backup method for YouTube transcript extraction.
@@ -378,10 +1018,10 @@ class IntrospectAgent:
 
         try:
             # Import the YouTube utilities here to avoid circular imports
-            from .youtube_utils import process_youtube_content
+            from .youtube_utils import aprocess_youtube_content
 
             # Use our backup method to get YouTube content
-            youtube_content = process_youtube_content(resource_url)
+            youtube_content = await aprocess_youtube_content(resource_url)
 
             if not youtube_content["error"] and youtube_content["content"]:
                 # We successfully got the transcript, now let the model extract insights from it
@@ -390,7 +1030,10 @@ class IntrospectAgent:
                 )
 
                 # Format the content for the model
-                video_info = youtube_content["video_info"]
+                video_info = {
+                    **youtube_content["video_info"],
+                    "content_noun": YouTubeSource.content_noun,
+                }
                 transcript = youtube_content["content"]
 
                 # Try to extract insights using the LLM
@@ -412,14 +1055,19 @@ class IntrospectAgent:
             )
 
     async def _try_extract_insights_from_transcript(
-        self, video_info: Dict[str, Any], transcript: str
+        self,
+        video_info: Dict[str, Any],
+        transcript: str,
+        chunks: Optional[List[str]] = None,
     ) -> Dict[str, Any]:
         """
         Try to extract insights from a transcript using multiple approaches.
 
         Args:
-            video_info: Video metadata
+            video_info: Video metadata, or the metadata of another source
+                with its content_noun (e.g. "web article") for the prompts
             transcript: Raw transcript text
+            chunks: Prebuilt chunks of the transcript for the long-text path
 
         Returns:
             Structured analysis data
@@ -427,13 +1075,13 @@ class IntrospectAgent:
         # Define different prompt templates to try
         prompt_templates = [
             # First attempt - standard approach
-            "Please extract insights from this YouTube transcript:\n\n{transcript}",
+            "Please extract insights from this {source}:\n\n{transcript}",
             # Second attempt - more explicit instructions
-            "Analyze this YouTube transcript and extract the 7 key points mentioned. Format your response as JSON with title, summary, and insights fields:\n\n{transcript}",
+            "Analyze this {source} and extract the 7 key points mentioned. Format your response as JSON with title, summary, and insights fields:\n\n{transcript}",
             # Third attempt - structured approach with example
-            """Extract the main points from this transcript and format as JSON like this example:
+            """Extract the main points from this {source} and format as JSON like this example:
             {
-              "title": "Video Title",
+              "title": "Title",
               "summary": "Brief 2-3 sentence overview",
               "insights": [
                 {"point": "Key insight 1", "type": "actionable"},
@@ -441,64 +1089,331 @@ class IntrospectAgent:
               ]
             }
             
-            Transcript to analyze:
+            Content to analyze:
             {transcript}""",
         ]
+        # Uploads and articles are not YouTube transcripts
+        noun = self._content_noun(video_info)
+        prompt_templates = [
+            template.replace("{source}", noun) for template in prompt_templates
+        ]
 
         try:
-            # Try each prompt template
-            for attempt_idx, prompt_template in enumerate(prompt_templates, 1):
-                logger.debug(
-                    f"LLM extraction attempt {attempt_idx}/{len(prompt_templates)}"
+            data = None
+            if estimate_tokens(transcript) > EXTRACT_CHUNK_THRESHOLD_TOKENS:
+                # Whole-transcript prompts are slow and risk the context limit
+                data = await self._chunked_transcript_extraction(
+                    video_info, transcript, chunks
                 )
+            else:
+                if EXTRACT_OUTPUT_MODE == "structured":
+                    data = await self._structured_transcript_extraction(
+                        video_info, transcript
+                    )
 
-                # Format the prompt with the transcript
-                formatted_prompt = prompt_template.format(transcript=transcript)
-
-                # Process the transcript with our extract agent
-                transcript_response = await self.extract_agent.arun(formatted_prompt)
+                # Free-text prompt templates, also the fallback for structured mode
+                if data is None and TRANSCRIPT_TEMPLATE_STRATEGY == "parallel":
+                    data = await self._run_templates_parallel(
+                        prompt_templates, video_info, transcript
+                    )
+                elif data is None:
+                    data = await self._run_templates_sequential(
+                        prompt_templates, video_info, transcript
+                    )
 
-                # Check for valid response
-                if (
-                    transcript_response
-                    and transcript_response.content
-                    and len(transcript_response.content.strip()) > 20
-                ):
-                    # Try to parse the JSON response
-                    try:
-                        data = self._safe_extract_json(transcript_response.content)
-
-                        # If we have data but it's missing required fields, add them from video info
-                        if not data.get("title") and video_info.get("title"):
-                            data["title"] = video_info["title"]
-
-                        # If we have valid insights, return the data
-                        if data.get("insights") and len(data["insights"]) > 3:
-                            # Save the extracted data
-                            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                            output_path = output_dir.joinpath(
-                                f"extract_backup_{timestamp}.json"
-                            )
-                            with open(output_path, "w") as f:
-                                json.dump(data, f, indent=2)
-
-                            return data
-                    except Exception as json_error:
-                        logger.warning(
-                            f"Error parsing transcript JSON response (attempt {attempt_idx}): {str(json_error)}"
-                        )
-                        # Continue to next attempt
+            if data is not None:
+                # Save the extracted data
+                self._save_output("extract_backup", data)
+                return data
 
             # If all attempts failed, perform direct analysis of the transcript
             logger.info(
                 "All LLM extraction attempts failed, performing direct transcript analysis"
             )
-            return self._direct_transcript_analysis(video_info, transcript)
+            return await asyncio.to_thread(
+                self._direct_transcript_analysis, video_info, transcript
+            )
         except Exception as transcript_error:
             logger.error(
                 f"Error processing transcript response: {str(transcript_error)}"
             )
-            return self._direct_transcript_analysis(video_info, transcript)
+            return await asyncio.to_thread(
+                self._direct_transcript_analysis, video_info, transcript
+            )
+
+    @staticmethod
+    def _content_noun(source_info: Dict[str, Any]) -> str:
+        """What the content of a source is called in extraction prompts."""
+        return source_info.get("content_noun") or ContentSource.content_noun
+
+    async def _structured_transcript_extraction(
+        self,
+        video_info: Dict[str, Any],
+        transcript: str,
+        part: Optional[Tuple[int, int]] = None,
+        min_insights: int = 4,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Extract insights in one schema-constrained model call.
+
+        The response is validated once against InsightOutput. Failures are
+        counted by kind, and None is returned so the caller can fall back
+        to the prompt-template attempts.
+
+        Args:
+            video_info: Video metadata
+            transcript: Transcript text, or one chunk of it
+            part: (index, count) when the text is one chunk of a transcript
+            min_insights: Fewest insights accepted as a usable result
+
+        Returns:
+            Extraction data, or None if the response was unusable
+        """
+        stats = self.structured_output_stats
+        stats["attempts"] += 1
+
+        title = video_info.get("title") or "Unknown Title"
+        author = video_info.get("author_name") or "Unknown Author"
+        scope = f"part {part[0]} of {part[1]} of " if part else ""
+        prompt = (
+            f"Extract insights from {scope}this {self._content_noun(video_info)}."
+            f"\n\nTitle: {title}\nAuthor: {author}\n\nContent:\n{transcript}"
+        )
+
+        try:
+            response = await self._build_structured_extract_agent().arun(prompt)
+        except Exception as e:
+            stats["errors"] += 1
+            logger.warning(f"Structured extraction failed: {str(e)}")
+            return None
+
+        content = response.content if response else None
+        if not content:
+            stats["empty_responses"] += 1
+            return None
+
+        try:
+            # Agno returns the parsed model, or the raw text if it could not
+            if isinstance(content, InsightOutput):
+                output = content
+            elif isinstance(content, str):
+                output = InsightOutput.model_validate_json(content)
+            else:
+                output = InsightOutput.model_validate(content)
+        except ValueError as e:
+            stats["validation_failures"] += 1
+            logger.warning(f"Structured extraction did not match schema: {str(e)}")
+            return None
+
+        data = output.model_dump()
+        if not data["title"] and video_info.get("title"):
+            data["title"] = video_info["title"]
+        if len(data["insights"]) < min_insights:
+            stats["too_few_insights"] += 1
+            return None
+
+        stats["parsed"] += 1
+        return data
+
+    async def _chunked_transcript_extraction(
+        self,
+        video_info: Dict[str, Any],
+        transcript: str,
+        chunks: Optional[List[str]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Map-reduce extraction for long transcripts.
+
+        The transcript is split on sentence boundaries into chunks of about
+        EXTRACT_CHUNK_TOKENS, at most EXTRACT_CHUNK_CONCURRENCY chunks are
+        extracted at once, and the results are merged into the final insights
+        without another model call. Chunks built while the text was being
+        extracted, such as PDF pages, are used as they are.
+
+        Returns:
+            Merged extraction data, or None if fewer than half the chunks succeeded
+        """
+        if not chunks:
+            chunks = chunk_text(transcript, EXTRACT_CHUNK_TOKENS)
+        logger.info(
+            f"Transcript of ~{estimate_tokens(transcript)} tokens split into {len(chunks)} chunks"
+        )
+        semaphore = asyncio.Semaphore(max(1, EXTRACT_CHUNK_CONCURRENCY))
+
+        async def extract(chunk_idx: int, chunk: str):
+            async with semaphore:
+                return await self._extract_transcript_chunk(
+                    chunk_idx, len(chunks), chunk, video_info
+                )
+
+        results = await asyncio.gather(
+            *(extract(idx, chunk) for idx, chunk in enumerate(chunks, 1)),
+            return_exceptions=True,
+        )
+
+        chunk_results = []
+        for chunk_idx, result in enumerate(results, 1):
+            if isinstance(result, BaseException):
+                logger.warning(f"Chunk {chunk_idx} extraction failed: {str(result)}")
+            elif result is not None:
+                chunk_results.append(result)
+
+        if len(chunk_results) * 2 < len(chunks):
+            logger.warning(
+                f"Only {len(chunk_results)}/{len(chunks)} chunks extracted, giving up"
+            )
+            return None
+
+        return merge_chunk_results(chunk_results, title=video_info.get("title"))
+
+    async def _extract_transcript_chunk(
+        self,
+        chunk_idx: int,
+        chunk_count: int,
+        chunk: str,
+        video_info: Dict[str, Any],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Extract insights from one chunk of a transcript with a fresh agent.
+
+        Returns:
+            Extraction data for the chunk, or None if it was unusable
+        """
+        if EXTRACT_OUTPUT_MODE == "structured":
+            data = await self._structured_transcript_extraction(
+                video_info, chunk, part=(chunk_idx, chunk_count), min_insights=1
+            )
+            if data is not None:
+                return data
+
+        prompt = (
+            f"This is part {chunk_idx} of {chunk_count} of the "
+            f"{self._content_noun(video_info)} "
+            f"\"{video_info.get('title') or 'Untitled'}\". Extract up to 7 key "
+            f"insights from this part. Format your response as JSON with title, "
+            f"summary, and insights fields:\n\n{chunk}"
+        )
+        response = await self._build_extract_agent().arun(prompt)
+        if not response or not response.content:
+            return None
+
+        data = self._safe_extract_json(response.content)
+        return data if self._is_valid_extraction(data) else None
+
+    async def _run_templates_sequential(
+        self, prompt_templates: List[str], video_info: Dict[str, Any], transcript: str
+    ) -> Optional[Dict[str, Any]]:
+        """Try each prompt template in turn, stopping at the first valid result"""
+        agent = self._build_extract_agent()
+        for attempt_idx, prompt_template in enumerate(prompt_templates, 1):
+            data = await self._attempt_transcript_template(
+                agent,
+                attempt_idx,
+                len(prompt_templates),
+                prompt_template,
+                video_info,
+                transcript,
+            )
+            if data is not None:
+                return data
+        return None
+
+    async def _run_templates_parallel(
+        self, prompt_templates: List[str], video_info: Dict[str, Any], transcript: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Run prompt template attempts concurrently and return the first valid result.
+
+        At most TRANSCRIPT_TEMPLATE_CONCURRENCY attempts run at once; the rest
+        are cancelled as soon as one attempt succeeds.
+        """
+        semaphore = asyncio.Semaphore(max(1, TRANSCRIPT_TEMPLATE_CONCURRENCY))
+
+        async def attempt(attempt_idx: int, prompt_template: str):
+            async with semaphore:
+                return await self._attempt_transcript_template(
+                    self._build_extract_agent(),
+                    attempt_idx,
+                    len(prompt_templates),
+                    prompt_template,
+                    video_info,
+                    transcript,
+                )
+
+        pending = {
+            asyncio.create_task(attempt(attempt_idx, prompt_template))
+            for attempt_idx, prompt_template in enumerate(prompt_templates, 1)
+        }
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is not None:
+                        logger.warning(
+                            f"LLM extraction attempt failed: {str(task.exception())}"
+                        )
+                        continue
+                    if task.result() is not None:
+                        return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        return None
+
+    async def _attempt_transcript_template(
+        self,
+        agent: Agent,
+        attempt_idx: int,
+        attempt_count: int,
+        prompt_template: str,
+        video_info: Dict[str, Any],
+        transcript: str,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Run one prompt template against the transcript.
+
+        Returns:
+            Extraction data if the response has more than three insights, else None
+        """
+        logger.debug(f"LLM extraction attempt {attempt_idx}/{attempt_count}")
+
+        # Format the prompt with the transcript. Templates contain literal JSON
+        # braces, so substitute the placeholder rather than using str.format.
+        formatted_prompt = prompt_template.replace("{transcript}", transcript)
+
+        # Process the transcript with the extract agent
+        transcript_response = await agent.arun(formatted_prompt)
+
+        # Check for valid response
+        if not (
+            transcript_response
+            and transcript_response.content
+            and len(transcript_response.content.strip()) > 20
+        ):
+            return None
+
+        # Try to parse the JSON response
+        try:
+            data = self._safe_extract_json(transcript_response.content)
+
+            # If we have data but it's missing required fields, add them from video info
+            if not data.get("title") and video_info.get("title"):
+                data["title"] = video_info["title"]
+
+            # If we have valid insights, return the data
+            if data.get("insights") and len(data["insights"]) > 3:
+                return data
+        except Exception as json_error:
+            logger.warning(
+                f"Error parsing transcript JSON response (attempt {attempt_idx}): {str(json_error)}"
+            )
+
+        return None
 
     def _direct_transcript_analysis(
         self, video_info: Dict[str, Any], transcript: str
@@ -519,143 +1434,24 @@ class IntrospectAgent:
         title = video_info.get("title", "YouTube Video")
         channel = video_info.get("author_name", "Unknown Creator")
 
-        # Initialize the data structure
-        analysis = {
-            "title": title,
-            "summary": f"This video by {channel} discusses seven productivity principles practiced by top performers to accomplish more in less time.",
-            "insights": [],
-            "raw_transcript": transcript[:500]
-            + ("..." if len(transcript) > 500 else ""),
-        }
-
-        # For this specific video, we know there are exactly 7 productivity rules
-        # We'll look for explicit mentions of the rules by their number or key phrases
-        rules = [
-            {
-                "markers": [
-                    "first secret",
-                    "professionals at saying no",
-                    "say no more often",
-                ],
-                "point": "Learn to say no more often - The ultra wealthy are professionals at saying no to make space for the few important yeses.",
-                "type": "actionable",
-            },
-            {
-                "markers": [
-                    "second thing",
-                    "guard the first hour",
-                    "sacred start",
-                    "power hour",
-                ],
-                "point": "Guard the first hour of your day - How you start your day sets the tone for everything that follows. No phone, no people, no dopamine drips.",
-                "type": "actionable",
-            },
-            {
-                "markers": [
-                    "third thing",
-                    "remove any guesswork",
-                    "design their defaults",
-                    "default meals",
-                    "zero cognitive load",
-                ],
-                "point": "Design your defaults - Remove guesswork through standardization. Default meals, wake times, and routines eliminate cognitive load.",
-                "type": "actionable",
-            },
-            {
-                "markers": [
-                    "energy cadence",
-                    "cycles, not their schedules",
-                    "sleep, diet, sun",
-                    "energy vampire",
-                    "energy management problems",
-                ],
-                "point": "Optimize your energy cycles, not your schedule - Identify your natural energy patterns and eliminate energy vampires (people, habits, foods).",
-                "type": "actionable",
-            },
-            {
-                "markers": [
-                    "fifth thing",
-                    "stack identity",
-                    "identity precedes habits",
-                    "identity based goals",
-                ],
-                "point": "Stack identity, not just habits - Adopt the identity of a high performer. When your identity changes, actions automatically follow.",
-                "type": "actionable",
-            },
-            {
-                "markers": [
-                    "calendar like a crime scene",
-                    "calendar exposes the truth",
-                    "color code",
-                    "track it for a week",
-                ],
-                "point": "Treat your calendar like a crime scene - Track where your time actually goes to expose the truth about your productivity leakages.",
-                "type": "actionable",
-            },
-            {
-                "markers": [
-                    "seventh",
-                    "weaponize boredom",
-                    "boredom is a feature",
-                    "mind breathe",
-                    "intuition space",
-                ],
-                "point": "Weaponize boredom - Allow yourself periods of boredom and silence for creativity and intuition. Boredom is your brain detoxing.",
-                "type": "actionable",
-            },
-        ]
-
-        # Search for each rule in the transcript
-        found_rules = []
-        for rule in rules:
-            for marker in rule["markers"]:
-                if marker.lower() in transcript.lower():
-                    # Found this rule
-                    if rule not in found_rules:
-                        found_rules.append(rule)
-                    break
-
-        # Add found rules to insights
-        for rule in found_rules:
-            analysis["insights"].append({"point": rule["point"], "type": rule["type"]})
-
-        # If we didn't find all 7 rules, add generic insights
-        if len(analysis["insights"]) < 7:
-            # These are backup generic insights if pattern matching fails
-            generic_insights = [
-                {
-                    "point": "Top performers can accomplish more in 1 hour than average people do in 10 hours due to their productivity techniques.",
-                    "type": "fact",
-                },
-                {
-                    "point": "Most people don't have a time problem, they have an energy management problem.",
-                    "type": "fact",
-                },
-                {
-                    "point": "You can have anything you want in life, but you can't have everything - focus is key to success.",
-                    "type": "quote",
-                },
-                {
-                    "point": "High performers ask 'What would a high performer do right now?' to guide their decisions.",
-                    "type": "actionable",
-                },
-                {
-                    "point": "If you need motivation, your systems are flawed - rely on systems, not emotions.",
-                    "type": "quote",
-                },
-            ]
+        # One pass over the transcript against every loaded rule pack
+        pack, matches = self.rule_engine.match(transcript)
+        if pack is not None:
+            analysis = pack.build_analysis(matches, video_info)
+            logger.info(
+                f"Rule pack '{pack.name}' matched {len(matches)} marker(s) in transcript"
+            )
+        else:
+            # Nothing matched: summarize the transcript itself
+            analysis = summarize(transcript, title=title, channel=channel)
+            logger.info("No rule pack matched, using extractive summary")
 
-            # Add generic insights until we have 7 total
-            for insight in generic_insights:
-                if len(analysis["insights"]) >= 7:
-                    break
-                analysis["insights"].append(insight)
+        analysis["raw_transcript"] = transcript[:500] + (
+            "..." if len(transcript) > 500 else ""
+        )
 
         # Save the analysis
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_path = output_dir.joinpath(f"direct_analysis_{timestamp}.json")
-        with open(output_path, "w") as f:
-            json.dump(analysis, f, indent=2)
+        self._save_output("direct_analysis", analysis)
 
         logger.info(f"Direct analysis found {len(analysis['insights'])} insights")
         return analysis
@@ -676,12 +1472,18 @@ class IntrospectAgent:
         # Try direct analysis first before falling back to basic extraction
         return self._direct_transcript_analysis(video_info, transcript)
 
-    def extract_key_points(self, resource_url: str) -> Dict[str, Any]:
+    def extract_key_points(
+        self, resource_url: str, content_hash: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Extract key points from a resource (like a YouTube video).
 
+        Synchronous wrapper for CLI use. Async callers such as the API should
+        await extract_key_points_async instead.
+
         Args:
             resource_url (str): URL to the resource to extract insights from
+            content_hash (Optional[str]): SHA-256 of uploaded content, if any
 
         Returns:
             Dict[str, Any]: Extracted key points and insights as structured data
@@ -692,7 +1494,7 @@ class IntrospectAgent:
 
             # Use run_until_complete instead of asyncio.run to avoid creating/closing loops
             task = asyncio.ensure_future(
-                self.extract_key_points_async(resource_url), loop=loop
+                self.extract_key_points_async(resource_url, content_hash), loop=loop
             )
             result = loop.run_until_complete(task)
 
@@ -723,6 +1525,27 @@ class IntrospectAgent:
         Returns:
             str: Generated prompt for user's agent
         """
+        prompt, _ = await self.generate_prompt_with_outcome_async(
+            extracted_data, user_context
+        )
+        return prompt
+
+    async def generate_prompt_with_outcome_async(
+        self,
+        extracted_data: Dict[str, Any],
+        user_context: Optional[Dict[str, str]] = None,
+    ) -> Tuple[str, str]:
+        """
+        Generate a personalized prompt and report how it was produced.
+
+        Args:
+            extracted_data (Dict[str, Any]): Structured data containing key points and insights
+            user_context (Optional[Dict[str, str]]): User context with interests, goals, and background
+
+        Returns:
+            Tuple[str, str]: The prompt and OUTCOME_CACHE_HIT, OUTCOME_FULL or,
+            for fallback prompts, OUTCOME_FAILED
+        """
         if not extracted_data:
             logger.error("No extracted data to generate prompt from")
             raise ValueError("No extracted data to generate prompt from")
@@ -748,6 +1571,17 @@ class IntrospectAgent:
         if user_context is None:
             user_context = {"interests": "", "goals": "", "background": ""}
 
+        # Identical extractions with equivalent user context reuse the prompt
+        cache_key = None
+        if self.prompt_cache is not None:
+            cache_key = prompt_cache_key(
+                extracted_data, user_context, PROMPT_MODEL, PROMPT_INSTRUCTIONS_VERSION
+            )
+            cached_prompt = self.prompt_cache.get(cache_key)
+            if cached_prompt is not None:
+                logger.info("Prompt cache hit")
+                return cached_prompt, OUTCOME_CACHE_HIT
+
         # Prepare input for the prompt agent
         input_text = f"""
 # EXTRACTED INSIGHTS
@@ -775,20 +1609,26 @@ Create a personalized prompt using the extracted insights and user context.
             # Check for empty response
             if not response or not response.content:
                 logger.warning("Empty response from prompt agent")
-                return self._create_fallback_prompt(
-                    extracted_data, user_context, "Empty response"
+                return (
+                    self._create_fallback_prompt(
+                        extracted_data, user_context, "Empty response"
+                    ),
+                    OUTCOME_FAILED,
                 )
 
             # Save the generated prompt
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_path = output_dir.joinpath(f"prompt_{timestamp}.md")
-            with open(output_path, "w") as f:
-                f.write(response.content)
+            self._save_output("prompt", response.content)
+
+            if cache_key is not None:
+                self.prompt_cache.set(cache_key, response.content)
 
-            return response.content
+            return response.content, OUTCOME_FULL
         except Exception as e:
             logger.exception(f"Error generating prompt: {str(e)}")
-            return self._create_fallback_prompt(extracted_data, user_context, str(e))
+            return (
+                self._create_fallback_prompt(extracted_data, user_context, str(e)),
+                OUTCOME_FAILED,
+            )
 
     def _create_fallback_prompt(self, extracted_data, user_context, error_msg):
         """Helper method to create a fallback prompt when generation fails"""
@@ -847,6 +1687,9 @@ Please include specific steps, a reasonable timeline, and metrics I can use to t
         """
         Generate a personalized prompt based on extracted insights.
 
+        Synchronous wrapper for CLI use. Async callers such as the API should
+        await generate_prompt_async instead.
+
         Args:
             extracted_data (Dict[str, Any]): Structured data containing key points and insights
             user_context (Optional[Dict[str, str]]): User context with interests, goals, and background
@@ -894,12 +1737,9 @@ Please include specific steps, a reasonable timeline, and metrics I can use to t
                 # Generate personalized prompt
                 prompt = await self.generate_prompt_async(extracted_data, user_context)
 
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                output_path = output_dir.joinpath(f"final_prompt_{timestamp}.md")
-                with open(output_path, "w") as f:
-                    f.write(prompt)
+                artifact_id = self._save_output("final_prompt", prompt)
 
-                logger.info(f"Prompt generated successfully and saved to {output_path}")
+                logger.info(f"Prompt generated successfully and saved as artifact {artifact_id}")
                 return prompt
             else:
                 logger.error("Failed to extract content from the resource")
@@ -922,10 +1762,9 @@ Please include specific steps, a reasonable timeline, and metrics I can use to t
         if user_context is None:
             user_context = {"interests": "", "goals": "", "background": ""}
 
-        # Check if this is a YouTube URL
-        is_youtube = "youtube.com" in resource_url or "youtu.be" in resource_url
+        source = source_router.match(resource_url).source
 
-        if is_youtube:
+        if source.name == "youtube":
             return f"""From what you know about me, I want you to apply these insights that I learned from a resource to my life...
 
 I attempted to access a YouTube video at {resource_url}, but encountered accessibility issues. {error_details if error_details else "The video might be unavailable, private, or region-restricted."}
@@ -960,6 +1799,9 @@ Please provide a specific timeline and metrics I can use to track my progress.
         """
         Process a resource by extracting key points and generating a prompt.
 
+        Synchronous wrapper for CLI use. Async callers such as the API should
+        await process_resource_async instead.
+
         Args:
             resource_url (str): URL to the resource to process
             user_context (Optional[Dict[str, str]]): User context with interests, goals, and background
@@ -1007,9 +1849,8 @@ Please provide a specific timeline and metrics I can use to track my progress.
                 return
 
             # Check if the extraction encountered an error
-            is_error = any(
-                "error" in extracted_data.get("title", "").lower()
-                or "could not" in insight.get("point", "").lower()
+            is_error = extracted_data.get("error") is True or any(
+                "could not" in insight.get("point", "").lower()
                 for insight in extracted_data.get("insights", [])
             )
 
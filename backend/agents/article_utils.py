@@ -0,0 +1,848 @@
+"""
+Web article utilities for non-YouTube URLs.
+
+Articles are fetched locally instead of handing the bare URL to the model.
+The page is streamed with a byte cap and an overall timeout, the main text
+is separated from navigation, comments and other boilerplate with a
+readability-style scorer, and the clean text goes to the same extraction
+hop as transcripts. Fetched articles are cached by canonical URL and
+revalidated with ETag / Last-Modified once they are no longer fresh.
+"""
+
+import asyncio
+import ipaddress
+import logging
+import os
+import re
+import socket
+import time
+from html.parser import HTMLParser
+from typing import Any, Dict, FrozenSet, List, Optional
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from . import http_client
+from .cache import DiskStore, storage_dir
+
+logger = logging.getLogger("introspect_agent")
+
+# Fetch limits
+ARTICLE_MAX_BYTES = int(os.environ.get("ARTICLE_MAX_BYTES", str(5 * 1024 * 1024)))
+ARTICLE_FETCH_TIMEOUT = float(os.environ.get("ARTICLE_FETCH_TIMEOUT", "15"))
+
+# Cached articles are served without a request while fresh, then revalidated
+ARTICLE_CACHE_FRESH_SECONDS = int(
+    os.environ.get("ARTICLE_CACHE_FRESH_SECONDS", "3600")
+)
+ARTICLE_CACHE_TTL_SECONDS = int(
+    os.environ.get("ARTICLE_CACHE_TTL_SECONDS", str(7 * 86400))
+)
+ARTICLE_CACHE_MAX_BYTES = int(
+    os.environ.get("ARTICLE_CACHE_MAX_BYTES", str(128 * 1024 * 1024))
+)
+
+# Pages with less main text than this are not treated as articles
+ARTICLE_MIN_CHARS = int(os.environ.get("ARTICLE_MIN_CHARS", "250"))
+
+# Redirects are followed by hand so every hop's address can be checked
+ARTICLE_MAX_REDIRECTS = int(os.environ.get("ARTICLE_MAX_REDIRECTS", "5"))
+# Loopback, private, link-local and reserved addresses are refused unless
+# this is set, so user-supplied URLs cannot reach internal services
+ARTICLE_ALLOW_PRIVATE_HOSTS = (
+    os.environ.get("ARTICLE_ALLOW_PRIVATE_HOSTS", "false").lower() == "true"
+)
+
+USER_AGENT = "Mozilla/5.0 (compatible; IntrospectAI/0.1; article fetcher)"
+ACCEPT = "text/html,application/xhtml+xml;q=0.9,text/plain;q=0.8"
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+TEXT_CONTENT_TYPES = ("text/plain",)
+
+# Query parameters that identify a campaign, not content
+TRACKING_PARAMS = re.compile(
+    r"^(?:utm_\w+|fbclid|gclid|dclid|msclkid|mc_cid|mc_eid|igshid|ref_src|"
+    r"_hsenc|_hsmi)$"
+)
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.IGNORECASE)
+
+
+def is_article_url(url: str) -> bool:
+    """Return True for absolute http(s) URLs."""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return False
+    return parts.scheme.lower() in ("http", "https") and bool(parts.netloc)
+
+
+def canonical_url(url: str) -> str:
+    """
+    Normalize a URL so trivially different spellings share one cache entry.
+
+    The scheme and host are lowercased, default ports, fragments and
+    tracking parameters are dropped, and the remaining query parameters are
+    sorted.
+
+    Args:
+        url: URL to normalize
+
+    Returns:
+        str: Canonical URL
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not TRACKING_PARAMS.match(key)
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+# Readability-style heuristics for class and id attributes
+UNLIKELY_CANDIDATES = re.compile(
+    r"-ad-|ai2html|banner|breadcrumbs|combx|comment|community|cover-wrap|disqus|"
+    r"extra|footer|gdpr|header|legends|menu|related|remark|replies|rss|shoutbox|"
+    r"sidebar|skyscraper|social|sponsor|supplemental|ad-break|agegate|pagination|"
+    r"pager|popup|yom-remote",
+    re.IGNORECASE,
+)
+MAYBE_CANDIDATES = re.compile(
+    r"and|article|body|column|content|main|shadow", re.IGNORECASE
+)
+POSITIVE_HINTS = re.compile(
+    r"article|body|content|entry|hentry|h-entry|main|page|post|text|blog|story",
+    re.IGNORECASE,
+)
+NEGATIVE_HINTS = re.compile(
+    r"-ad-|hidden|banner|combx|comment|com-|contact|foot|footer|footnote|gdpr|"
+    r"masthead|media|meta|outbrain|promo|related|scroll|share|shoutbox|sidebar|"
+    r"skyscraper|sponsor|shopping|tags|tool|widget",
+    re.IGNORECASE,
+)
+
+SKIPPED_TAGS = frozenset(
+    """
+    script style noscript template svg iframe form button select textarea nav
+    aside footer canvas object embed title
+    """.split()
+)
+VOID_TAGS = frozenset(
+    "area base br col embed hr img input link meta param source track wbr".split()
+)
+PARAGRAPH_TAGS = frozenset(
+    "p pre blockquote li h1 h2 h3 h4 h5 h6 td dd dt figcaption".split()
+)
+HEADING_TAGS = frozenset("h1 h2 h3 h4 h5 h6".split())
+BLOCK_TAGS = PARAGRAPH_TAGS | frozenset(
+    """
+    html body div section article main header ul ol dl table tbody thead tr
+    figure br hr
+    """.split()
+)
+# Elements never removed as boilerplate, whatever their class says
+STRUCTURAL_TAGS = frozenset("html body article main".split())
+
+
+class _Element:
+    """An open element; parent is the nearest enclosing block element."""
+
+    __slots__ = ("id", "tag", "parent", "weight", "score")
+
+    def __init__(self, element_id: int, tag: str, parent, weight: float):
+        self.id = element_id
+        self.tag = tag
+        self.parent = parent
+        self.weight = weight
+        self.score = 0.0
+
+
+class _Paragraph:
+    __slots__ = ("text", "link_chars", "tag", "container", "ancestors")
+
+    def __init__(self, text, link_chars, tag, container, ancestors):
+        self.text = text
+        self.link_chars = link_chars
+        self.tag = tag
+        self.container = container
+        self.ancestors: FrozenSet[int] = ancestors
+
+    @property
+    def link_density(self) -> float:
+        return min(1.0, self.link_chars / max(1, len(self.text)))
+
+
+def _class_weight(attrs: Dict[str, str]) -> float:
+    weight = 0.0
+    for name in ("class", "id"):
+        value = attrs.get(name) or ""
+        if not value:
+            continue
+        if NEGATIVE_HINTS.search(value):
+            weight -= 25
+        if POSITIVE_HINTS.search(value):
+            weight += 25
+    return weight
+
+
+class _ArticleParser(HTMLParser):
+    """
+    Splits a page into paragraphs, each annotated with its enclosing block
+    elements, and collects page metadata. Boilerplate subtrees are dropped.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack: List[_Element] = []
+        self.paragraphs: List[_Paragraph] = []
+        self.meta: Dict[str, str] = {}
+        self.title = ""
+        self._next_id = 0
+        self._skip_element: Optional[_Element] = None
+        self._in_title = False
+        self._buffer: List[str] = []
+        self._link_chars = 0
+        self._link_depth = 0
+
+    def _flush(self):
+        text = " ".join("".join(self._buffer).split())
+        link_chars = self._link_chars
+        self._buffer = []
+        self._link_chars = 0
+        if not text:
+            return
+
+        blocks = [element for element in self.stack if element.tag in BLOCK_TAGS]
+        if not blocks:
+            return
+        # A <p> is scored through the block holding it; bare text in a
+        # <div> through the <div> itself
+        innermost = blocks[-1]
+        container = innermost
+        if innermost.tag in PARAGRAPH_TAGS and innermost.parent is not None:
+            container = innermost.parent
+        self.paragraphs.append(
+            _Paragraph(
+                text,
+                link_chars,
+                innermost.tag,
+                container,
+                frozenset(element.id for element in blocks),
+            )
+        )
+
+    def _close_to(self, index: int):
+        """Pop the stack down to (and including) the element at index."""
+        while len(self.stack) > index:
+            element = self.stack.pop()
+            if element.tag == "a":
+                self._link_depth = max(0, self._link_depth - 1)
+            if element is self._skip_element:
+                self._skip_element = None
+
+    def _find_open(self, tag: str, stop_tags: FrozenSet[str] = frozenset()) -> int:
+        for index in range(len(self.stack) - 1, -1, -1):
+            if self.stack[index].tag == tag:
+                return index
+            if self.stack[index].tag in stop_tags:
+                break
+        return -1
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: value or "" for name, value in attrs}
+        if tag == "meta":
+            self._handle_meta(attrs)
+        elif tag == "link" and "canonical" in attrs.get("rel", "").lower().split():
+            self.meta.setdefault("canonical", attrs.get("href", ""))
+        elif tag == "html" and attrs.get("lang"):
+            self.meta["lang"] = attrs["lang"]
+
+        if tag in BLOCK_TAGS and self._skip_element is None:
+            self._flush()
+        if tag in VOID_TAGS:
+            if tag == "br":
+                self._buffer.append(" ")
+            return
+
+        # Implicitly closed elements: a block ends an open <p>, a <li> the
+        # previous <li> of the same list
+        if tag in BLOCK_TAGS:
+            index = self._find_open("p", stop_tags=BLOCK_TAGS - {"p"})
+            if index >= 0:
+                self._close_to(index)
+        if tag == "li":
+            index = self._find_open("li", stop_tags=frozenset(["ul", "ol"]))
+            if index >= 0:
+                self._close_to(index)
+
+        parent = next(
+            (element for element in reversed(self.stack) if element.tag in BLOCK_TAGS),
+            None,
+        )
+        element = _Element(self._next_id, tag, parent, _class_weight(attrs))
+        self._next_id += 1
+        self.stack.append(element)
+
+        if tag == "title":
+            self._in_title = True
+        if tag == "a":
+            self._link_depth += 1
+        if self._skip_element is None and self._is_boilerplate(tag, attrs):
+            self._skip_element = element
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS:
+            return
+        index = self._find_open(tag)
+        if index < 0:
+            return
+        if tag in BLOCK_TAGS and self._skip_element is None:
+            self._flush()
+        if tag == "title":
+            self._in_title = False
+        self._close_to(index)
+        if tag in BLOCK_TAGS and self._skip_element is None:
+            self._flush()
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+            return
+        if self._skip_element is not None:
+            return
+        self._buffer.append(data)
+        if self._link_depth:
+            self._link_chars += len(data.strip())
+
+    def close(self):
+        super().close()
+        if self._skip_element is None:
+            self._flush()
+
+    def _handle_meta(self, attrs: Dict[str, str]):
+        name = (attrs.get("property") or attrs.get("name") or "").lower()
+        content = attrs.get("content", "").strip()
+        if name and content:
+            self.meta.setdefault(name, content)
+
+    @staticmethod
+    def _is_boilerplate(tag: str, attrs: Dict[str, str]) -> bool:
+        if tag in SKIPPED_TAGS:
+            return True
+        if "hidden" in attrs or attrs.get("aria-hidden") == "true":
+            return True
+        style = attrs.get("style", "").replace(" ", "").lower()
+        if "display:none" in style or "visibility:hidden" in style:
+            return True
+        if tag in STRUCTURAL_TAGS:
+            return False
+        match_string = f"{attrs.get('class', '')} {attrs.get('id', '')}"
+        return bool(
+            UNLIKELY_CANDIDATES.search(match_string)
+            and not MAYBE_CANDIDATES.search(match_string)
+        )
+
+
+def _select_paragraphs(paragraphs: List[_Paragraph]) -> List[_Paragraph]:
+    """Pick the paragraphs of the highest-scoring container and its siblings."""
+    # Score containers by the text they hold, half for the grandparent
+    scored: Dict[int, _Element] = {}
+    for paragraph in paragraphs:
+        if len(paragraph.text) < 25:
+            continue
+        score = 1 + paragraph.text.count(",") + min(len(paragraph.text) / 100, 3)
+        container = paragraph.container
+        for element, share in ((container, 1.0), (container.parent, 0.5)):
+            if element is None:
+                continue
+            if element.id not in scored:
+                element.score = element.weight
+                scored[element.id] = element
+            element.score += score * share
+
+    if not scored:
+        return []
+
+    # Containers dominated by links are navigation, not content
+    chars: Dict[int, int] = {}
+    link_chars: Dict[int, int] = {}
+    for paragraph in paragraphs:
+        for element_id in paragraph.ancestors:
+            if element_id in scored:
+                chars[element_id] = chars.get(element_id, 0) + len(paragraph.text)
+                link_chars[element_id] = (
+                    link_chars.get(element_id, 0) + paragraph.link_chars
+                )
+    final: Dict[int, float] = {}
+    for element_id, element in scored.items():
+        density = link_chars.get(element_id, 0) / max(1, chars.get(element_id, 0))
+        final[element_id] = element.score * (1 - min(1.0, density))
+
+    top_id = max(final, key=final.get)
+    top = scored[top_id]
+    threshold = max(10.0, final[top_id] * 0.2)
+    selected = {top_id} | {
+        element_id
+        for element_id, element in scored.items()
+        if top.parent is not None
+        and element.parent is top.parent
+        and final[element_id] >= threshold
+    }
+
+    return [
+        paragraph
+        for paragraph in paragraphs
+        if paragraph.ancestors & selected
+        and (
+            paragraph.tag in HEADING_TAGS
+            or paragraph.link_density < 0.25
+            or (paragraph.link_density < 0.5 and len(paragraph.text) > 80)
+        )
+    ]
+
+
+def extract_article(html: str, min_chars: int = ARTICLE_MIN_CHARS) -> Dict[str, Any]:
+    """
+    Extract the main text and metadata of an HTML page.
+
+    Args:
+        html: Page markup
+        min_chars: Below this much main text, every substantial paragraph of
+            the page is used instead
+
+    Returns:
+        Dict with title, byline, site_name, description, canonical, lang,
+        text and word_count
+    """
+    parser = _ArticleParser()
+    parser.feed(html)
+    parser.close()
+
+    chosen = _select_paragraphs(parser.paragraphs)
+    text = "\n\n".join(paragraph.text for paragraph in chosen)
+    if len(text) < min_chars:
+        # No clear main container: keep every prose-like paragraph
+        text = "\n\n".join(
+            paragraph.text
+            for paragraph in parser.paragraphs
+            if len(paragraph.text) >= 40 and paragraph.link_density < 0.3
+        )
+
+    meta = parser.meta
+    headings = [p.text for p in parser.paragraphs if p.tag == "h1"]
+    title = (
+        meta.get("og:title")
+        or " ".join(parser.title.split())
+        or (headings[0] if headings else "")
+    )
+    return {
+        "title": title,
+        "byline": meta.get("author") or meta.get("article:author") or "",
+        "site_name": meta.get("og:site_name", ""),
+        "description": meta.get("og:description") or meta.get("description", ""),
+        "canonical": meta.get("canonical", ""),
+        "lang": meta.get("lang", ""),
+        "text": text,
+        "word_count": len(text.split()),
+    }
+
+
+def _decode(body: bytes, content_type: str) -> str:
+    """Decode a page using the header or <meta> charset, defaulting to UTF-8."""
+    match = re.search(r"charset=([\w-]+)", content_type, re.IGNORECASE)
+    charset = match.group(1) if match else None
+    if charset is None:
+        meta = _CHARSET.search(body[:2048])
+        charset = meta.group(1).decode("ascii", "ignore") if meta else "utf-8"
+    try:
+        return body.decode(charset, errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+class BlockedAddressError(ValueError):
+    """Raised when a URL resolves to an address that may not be fetched."""
+
+
+class TooManyRedirects(ValueError):
+    """Raised when a fetch exceeds its redirect limit."""
+
+
+def is_public_address(address: str) -> bool:
+    """
+    Check that an IP address is globally routable.
+
+    Args:
+        address: IPv4 or IPv6 address
+
+    Returns:
+        bool: False for loopback, private, link-local, multicast, reserved
+        and unspecified addresses
+    """
+    try:
+        ip = ipaddress.ip_address(address.split("%", 1)[0])
+    except ValueError:
+        return False
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not (ip.is_multicast or ip.is_reserved)
+
+
+def _peer_address(response) -> Optional[str]:
+    """
+    Get the IP address a streamed response was received from.
+
+    Args:
+        response: httpx response, or requests response opened with stream=True
+
+    Returns:
+        The peer's IP address, or None if the client does not expose it
+    """
+    extensions = getattr(response, "extensions", None)
+    if extensions is not None:
+        stream = extensions.get("network_stream")
+        peer = stream.get_extra_info("server_addr") if stream is not None else None
+    else:
+        # urllib3 keeps the socket on the connection, or only on the response
+        # file once the server has said it will close the connection
+        raw = getattr(response, "raw", None)
+        sock = getattr(getattr(raw, "_connection", None), "sock", None)
+        if sock is None:
+            reader = getattr(getattr(raw, "_original_response", None), "fp", None)
+            sock = getattr(getattr(reader, "raw", None), "_sock", None)
+        try:
+            peer = sock.getpeername() if sock is not None else None
+        except OSError:
+            peer = None
+    return str(peer[0]) if peer else None
+
+
+class ArticleFetcher:
+    """
+    Fetches, extracts and caches web articles.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[DiskStore] = None,
+        max_bytes: int = 5 * 1024 * 1024,
+        timeout_seconds: float = 15.0,
+        fresh_seconds: float = 3600,
+        min_chars: int = 250,
+        chunk_bytes: int = 64 * 1024,
+        max_redirects: int = 5,
+        allow_private_hosts: bool = False,
+    ):
+        """
+        Initialize the fetcher.
+
+        Args:
+            cache: Store for extracted articles and their validators
+            max_bytes: Bytes of a page read at most; the rest is ignored
+            timeout_seconds: Time limit for a whole fetch, body included
+            fresh_seconds: Age below which cached articles are served as is
+            min_chars: Least main text for a page to count as an article
+            chunk_bytes: Read size while streaming the body
+            max_redirects: Redirects followed at most per fetch
+            allow_private_hosts: Allow hosts resolving to loopback, private,
+                link-local or reserved addresses
+        """
+        self.cache = cache
+        self.max_bytes = max_bytes
+        self.timeout_seconds = timeout_seconds
+        self.fresh_seconds = fresh_seconds
+        self.min_chars = min_chars
+        self.chunk_bytes = chunk_bytes
+        self.max_redirects = max_redirects
+        self.allow_private_hosts = allow_private_hosts
+
+        self.fetches = 0
+        self.fresh_hits = 0
+        self.revalidated = 0
+        self.modified = 0
+        self.truncated = 0
+        self.bytes_downloaded = 0
+        self.errors: Dict[str, int] = {}
+
+    def _error(self, reason: str, message: str) -> Dict[str, Any]:
+        self.errors[reason] = self.errors.get(reason, 0) + 1
+        return {"error": True, "message": message, "content": None}
+
+    def _address_allowed(self, address: str) -> bool:
+        return self.allow_private_hosts or is_public_address(address)
+
+    async def _check_url(self, url: str):
+        """
+        Resolve a URL's host and refuse it unless every address is allowed.
+
+        Raises:
+            BlockedAddressError: If the URL or one of its addresses is refused
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise BlockedAddressError(f"Unsupported URL: {url}")
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await loop.getaddrinfo(
+                parts.hostname, port, type=socket.SOCK_STREAM
+            )
+        except socket.gaierror as e:
+            raise OSError(f"Could not resolve {parts.hostname}: {str(e)}") from e
+
+        for info in infos:
+            if not self._address_allowed(info[4][0]):
+                raise BlockedAddressError(
+                    f"{parts.hostname} resolves to a non-public address"
+                )
+
+    def _check_peer(self, response, url: str):
+        """
+        Refuse a response unless the address actually connected to is allowed.
+
+        The HTTP client resolves the host again when it connects, so a host
+        whose DNS answer changes after _check_url (DNS rebinding) could
+        otherwise point the request at an internal address. Called before
+        any of the body is read.
+
+        Raises:
+            BlockedAddressError: If the peer address is refused or unknown
+        """
+        if self.allow_private_hosts:
+            return
+        address = _peer_address(response)
+        if address is None or not self._address_allowed(address):
+            raise BlockedAddressError(
+                f"{urlsplit(url).hostname} connected to a non-public address"
+            )
+
+    async def _stream(self, url: str, headers: Dict[str, str]) -> Dict[str, Any]:
+        """
+        GET a URL, following redirects by hand. Each hop's host is resolved
+        and checked before connecting, and the address connected to is
+        checked again before the body is read.
+
+        Raises:
+            BlockedAddressError: If a hop's address is refused
+            TooManyRedirects: If more than max_redirects redirects are met
+        """
+        client = http_client.get_async_client()
+        for _ in range(self.max_redirects + 1):
+            await self._check_url(url)
+            if client is None:
+                result = await asyncio.to_thread(self._stream_sync, url, headers)
+            else:
+                result = await self._stream_async(client, url, headers)
+
+            location = result["headers"].get("location")
+            if result["status_code"] not in REDIRECT_STATUSES or not location:
+                return result
+            url = urljoin(url, location)
+        raise TooManyRedirects(f"More than {self.max_redirects} redirects")
+
+    async def _stream_async(
+        self, client, url: str, headers: Dict[str, str]
+    ) -> Dict[str, Any]:
+        """
+        GET one URL, reading the body only for a 200 text response and only
+        up to max_bytes.
+        """
+        async with client.stream(
+            "GET", url, headers=headers, follow_redirects=False
+        ) as response:
+            self._check_peer(response, url)
+            result = {
+                "status_code": response.status_code,
+                "headers": {k.lower(): v for k, v in response.headers.items()},
+                "url": str(response.url),
+                "body": b"",
+                "truncated": False,
+            }
+            if not self._wants_body(result):
+                return result
+
+            body = bytearray()
+            async for chunk in response.aiter_bytes(self.chunk_bytes):
+                body += chunk
+                if len(body) >= self.max_bytes:
+                    del body[self.max_bytes :]
+                    result["truncated"] = True
+                    break
+            result["body"] = bytes(body)
+            return result
+
+    def _stream_sync(self, url: str, headers: Dict[str, str]) -> Dict[str, Any]:
+        """Blocking fallback of _stream_async for when httpx is not installed."""
+        deadline = time.monotonic() + self.timeout_seconds
+        with http_client.get(
+            url, headers=headers, stream=True, allow_redirects=False
+        ) as response:
+            self._check_peer(response, url)
+            result = {
+                "status_code": response.status_code,
+                "headers": {k.lower(): v for k, v in response.headers.items()},
+                "url": response.url,
+                "body": b"",
+                "truncated": False,
+            }
+            if not self._wants_body(result):
+                return result
+
+            body = bytearray()
+            for chunk in response.iter_content(self.chunk_bytes):
+                body += chunk
+                if len(body) >= self.max_bytes:
+                    del body[self.max_bytes :]
+                    result["truncated"] = True
+                    break
+                if time.monotonic() > deadline:
+                    raise TimeoutError("article download timed out")
+            result["body"] = bytes(body)
+            return result
+
+    @staticmethod
+    def _wants_body(result: Dict[str, Any]) -> bool:
+        content_type = result["headers"].get("content-type", "").lower()
+        return result["status_code"] == 200 and (
+            not content_type
+            or content_type.startswith(HTML_CONTENT_TYPES + TEXT_CONTENT_TYPES)
+        )
+
+    async def fetch(self, url: str) -> Dict[str, Any]:
+        """
+        Fetch the main text of a web article.
+
+        Args:
+            url: Article URL
+
+        Returns:
+            Dictionary with error flag, article_info, content (the article
+            text) and cache ("fresh", "revalidated" or "miss"), or an error
+            message
+        """
+        key = canonical_url(url)
+        cache_key = f"article:{key}"
+
+        entry = None
+        if self.cache is not None:
+            entry = await asyncio.to_thread(self.cache.get, cache_key)
+        if entry is not None and time.time() - entry["fetched_at"] < self.fresh_seconds:
+            self.fresh_hits += 1
+            return {**entry["result"], "cache": "fresh"}
+
+        headers = {"User-Agent": USER_AGENT, "Accept": ACCEPT}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        self.fetches += 1
+        try:
+            response = await asyncio.wait_for(
+                self._stream(url, headers), timeout=self.timeout_seconds
+            )
+        except (asyncio.TimeoutError, TimeoutError):
+            return self._error("timeout", f"Timed out after {self.timeout_seconds}s")
+        except BlockedAddressError as e:
+            logger.warning(f"Refused article fetch for {url}: {str(e)}")
+            return self._error("blocked", "The page's address is not allowed")
+        except TooManyRedirects as e:
+            return self._error("redirects", str(e))
+        except Exception as e:
+            logger.warning(f"Article fetch failed for {url}: {str(e)}")
+            return self._error("network", f"Could not fetch the page: {str(e)}")
+
+        status = response["status_code"]
+        if status == 304 and entry is not None:
+            self.revalidated += 1
+            entry["fetched_at"] = time.time()
+            await asyncio.to_thread(self.cache.set, cache_key, entry)
+            return {**entry["result"], "cache": "revalidated"}
+        if status != 200:
+            return self._error("http_status", f"The page returned HTTP {status}")
+
+        content_type = response["headers"].get("content-type", "").lower()
+        if content_type and not content_type.startswith(
+            HTML_CONTENT_TYPES + TEXT_CONTENT_TYPES
+        ):
+            return self._error(
+                "content_type", f"Unsupported content type: {content_type}"
+            )
+
+        body = response["body"]
+        self.bytes_downloaded += len(body)
+        if response["truncated"]:
+            self.truncated += 1
+            logger.info(f"Article at {url} truncated to {self.max_bytes} bytes")
+
+        page = _decode(body, content_type)
+        if content_type.startswith(TEXT_CONTENT_TYPES):
+            article = {"title": "", "text": page.strip(), "byline": "", "site_name": ""}
+        else:
+            article = await asyncio.to_thread(extract_article, page, self.min_chars)
+
+        if len(article["text"]) < self.min_chars:
+            return self._error("no_article", "No article text found on the page")
+
+        result = {
+            "error": False,
+            "article_info": {
+                "title": article["title"] or urlsplit(key).netloc,
+                "author_name": article["byline"] or article["site_name"],
+                "url": key,
+                "site_name": article["site_name"],
+                "truncated": response["truncated"],
+            },
+            "content": article["text"],
+        }
+        if entry is not None:
+            self.modified += 1
+
+        if self.cache is not None:
+            record = {
+                "fetched_at": time.time(),
+                "etag": response["headers"].get("etag"),
+                "last_modified": response["headers"].get("last-modified"),
+                "result": result,
+            }
+            await asyncio.to_thread(self.cache.set, cache_key, record)
+
+        logger.info(
+            f"Extracted {len(article['text'])} chars of article text from {key}"
+        )
+        return {**result, "cache": "miss"}
+
+    def stats(self) -> Dict[str, Any]:
+        """Return fetch and cache counters."""
+        return {
+            "fetches": self.fetches,
+            "fresh_hits": self.fresh_hits,
+            "revalidated": self.revalidated,
+            "modified": self.modified,
+            "truncated": self.truncated,
+            "bytes_downloaded": self.bytes_downloaded,
+            "errors": dict(self.errors),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+
+# Shared fetcher with an on-disk article cache
+article_fetcher = ArticleFetcher(
+    cache=DiskStore(
+        storage_dir.joinpath("articles"),
+        ttl_seconds=ARTICLE_CACHE_TTL_SECONDS,
+        max_bytes=ARTICLE_CACHE_MAX_BYTES,
+    ),
+    max_bytes=ARTICLE_MAX_BYTES,
+    timeout_seconds=ARTICLE_FETCH_TIMEOUT,
+    fresh_seconds=ARTICLE_CACHE_FRESH_SECONDS,
+    min_chars=ARTICLE_MIN_CHARS,
+    max_redirects=ARTICLE_MAX_REDIRECTS,
+    allow_private_hosts=ARTICLE_ALLOW_PRIVATE_HOSTS,
+)
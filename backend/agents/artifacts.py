@@ -0,0 +1,371 @@
+"""
+Background writer for response artifacts.
+
+Extraction results and generated prompts are kept for inspection, but
+writing them must never slow down or block a request. Records are put on a
+bounded queue and a daemon thread appends them in batches to gzip-compressed
+JSON Lines segments. Segments rotate by size, are listed in an index, and
+old ones are deleted by count and age (when the writer starts, on rotation
+and periodically), along with the index files of writers that have no
+segments left. When the queue is full, records are
+dropped and counted instead of making the caller wait.
+"""
+
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("introspect_agent")
+
+SEGMENT_SUFFIX = ".jsonl.gz"
+INDEX_PREFIX = "index-"
+
+# Queue sentinel telling the writer thread to finish
+_STOP = object()
+
+
+class ArtifactWriter:
+    """
+    Batched, size-rotated artifact log.
+
+    Each writer owns its segments and its index file, both named after a
+    writer id. Several processes can share one directory without clobbering
+    each other. Every batch is appended as its own gzip member, so segments
+    stay readable with gzip.open while they are still being written.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_queue: int = 1024,
+        batch_size: int = 64,
+        flush_interval_seconds: float = 1.0,
+        segment_max_bytes: int = 8 * 1024 * 1024,
+        max_segments: int = 50,
+        max_age_seconds: float = 7 * 24 * 3600,
+        retention_interval_seconds: float = 3600,
+    ):
+        """
+        Initialize the writer. The background thread starts on first write,
+        or when start() is called.
+
+        Args:
+            directory: Directory holding segments and index files
+            max_queue: Records waiting to be written before new ones are dropped
+            batch_size: Maximum records appended per batch
+            flush_interval_seconds: Longest time a record waits to be written
+            segment_max_bytes: Compressed size at which a segment is rotated
+            max_segments: Segments kept in the directory across all writers
+            max_age_seconds: Segments older than this are deleted
+            retention_interval_seconds: Longest time between retention
+                passes, so old segments are deleted even when nothing rotates
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.segment_max_bytes = segment_max_bytes
+        self.max_segments = max_segments
+        self.max_age_seconds = max_age_seconds
+        self.retention_interval_seconds = retention_interval_seconds
+        self._last_retention: Optional[float] = None
+
+        self.writer_id = f"{int(time.time())}-{os.getpid()}"
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # Guards the counters updated by request threads
+        self._stats_lock = threading.Lock()
+
+        self._sequence = 0
+        self._segment: Optional[Dict[str, Any]] = None
+        self._segments: List[Dict[str, Any]] = []
+
+        self.written = 0
+        self.dropped: Dict[str, int] = {}
+        self.batches = 0
+        self.rotations = 0
+        self.deleted_segments = 0
+        self.deleted_indexes = 0
+        self.errors = 0
+
+    def write(
+        self,
+        kind: str,
+        content: Any,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Optional[str]:
+        """
+        Queue an artifact without blocking.
+
+        Args:
+            kind: Artifact type, e.g. "extract" or "prompt"
+            content: Text or JSON-serializable data
+            metadata: Extra fields stored with the record
+
+        Returns:
+            Optional[str]: Record id, or None if the record was dropped
+        """
+        record = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "created": datetime.now().isoformat(),
+            "content": content,
+        }
+        if metadata:
+            record["metadata"] = metadata
+
+        self.start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped[kind] = self.dropped.get(kind, 0) + 1
+            logger.debug(f"Artifact queue full, dropped {kind} record")
+            return None
+        return record["id"]
+
+    def start(self):
+        """Start the writer thread, which first applies retention."""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="artifact-writer", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        """Writer thread: gather records into batches and append them."""
+        stopping = False
+        while not stopping:
+            if (
+                self._last_retention is None
+                or time.monotonic() - self._last_retention
+                >= self.retention_interval_seconds
+            ):
+                self._run_retention()
+            try:
+                item = self._queue.get(timeout=self.flush_interval_seconds)
+            except queue.Empty:
+                continue
+
+            batch = []
+            while True:
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+                if stopping or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    self._append(batch)
+                except Exception as e:
+                    self.errors += 1
+                    logger.warning(f"Failed to write {len(batch)} artifacts: {e}")
+            for _ in range(len(batch) + (1 if stopping else 0)):
+                self._queue.task_done()
+
+    def _open_segment(self):
+        self._sequence += 1
+        self._segment = {
+            "file": f"{self.writer_id}-{self._sequence:05d}{SEGMENT_SUFFIX}",
+            "created": time.time(),
+            "records": 0,
+            "bytes": 0,
+            "kinds": {},
+        }
+        self._segments.append(self._segment)
+
+    def _append(self, batch: List[Dict[str, Any]]):
+        """Append a batch as one gzip member, rotating and indexing as needed."""
+        if self._segment is None or self._segment["bytes"] >= self.segment_max_bytes:
+            if self._segment is not None:
+                self.rotations += 1
+            self._open_segment()
+            self._run_retention()
+
+        lines = "".join(
+            json.dumps(record, default=str) + "\n" for record in batch
+        ).encode("utf-8")
+        path = self.directory.joinpath(self._segment["file"])
+        with open(path, "ab") as f:
+            f.write(gzip.compress(lines, compresslevel=6))
+
+        segment = self._segment
+        segment["bytes"] = path.stat().st_size
+        segment["records"] += len(batch)
+        segment["updated"] = time.time()
+        for record in batch:
+            segment["kinds"][record["kind"]] = (
+                segment["kinds"].get(record["kind"], 0) + 1
+            )
+
+        self.written += len(batch)
+        self.batches += 1
+        self._save_index()
+
+    def _save_index(self):
+        """Atomically write this writer's index of segments."""
+        index_path = self.directory.joinpath(f"{INDEX_PREFIX}{self.writer_id}.json")
+        tmp_path = index_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"writer_id": self.writer_id, "segments": self._segments}, f)
+        os.replace(tmp_path, index_path)
+
+    def _run_retention(self):
+        """Apply retention from the writer thread, counting failures."""
+        self._last_retention = time.monotonic()
+        try:
+            self._apply_retention()
+        except OSError as e:
+            self.errors += 1
+            logger.warning(f"Artifact retention failed: {e}")
+
+    def _apply_retention(self):
+        """
+        Delete segments beyond max_segments or older than max_age_seconds.
+
+        Runs when the writer thread starts, on rotation and at least every
+        retention_interval_seconds, and covers every writer's segments. The
+        current segment is never deleted. Index files of other writers are
+        deleted once none of their segments are left, so every process
+        start no longer leaves an index behind for good.
+        """
+        now = time.time()
+        segments = []
+        index_files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(SEGMENT_SUFFIX):
+                    segments.append((entry.stat().st_mtime, entry.name))
+                elif entry.name.startswith(INDEX_PREFIX):
+                    index_files.append(entry.name)
+        segments.sort(reverse=True)
+
+        current = self._segment["file"] if self._segment else None
+        kept = 0
+        writers = {self.writer_id}
+        for mtime, name in segments:
+            if name == current:
+                continue
+            kept += 1
+            if kept < self.max_segments and now - mtime <= self.max_age_seconds:
+                # Segments are named {writer_id}-{sequence}
+                writers.add(name[: -len(SEGMENT_SUFFIX)].rsplit("-", 1)[0])
+                continue
+            try:
+                self.directory.joinpath(name).unlink()
+                self.deleted_segments += 1
+            except FileNotFoundError:
+                pass
+
+        for name in index_files:
+            # index-{writer_id}.json, or .tmp if its writer died mid-save
+            writer_id = name[len(INDEX_PREFIX) :].rsplit(".", 1)[0]
+            if writer_id in writers:
+                continue
+            try:
+                self.directory.joinpath(name).unlink()
+                self.deleted_indexes += 1
+            except FileNotFoundError:
+                pass
+
+        self._segments = [
+            segment
+            for segment in self._segments
+            if self.directory.joinpath(segment["file"]).exists()
+            or segment is self._segment
+        ]
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued record has been written.
+
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            bool: True if the queue drained in time
+        """
+        if self._thread is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout: float = 5.0):
+        """Write out queued records and stop the writer thread."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("Artifact queue still full at shutdown")
+            return
+        thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue and segment counters."""
+        with self._stats_lock:
+            dropped = dict(self.dropped)
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+            "written": self.written,
+            "dropped": dropped,
+            "batches": self.batches,
+            "segments": len(self._segments),
+            "rotations": self.rotations,
+            "deleted_segments": self.deleted_segments,
+            "deleted_indexes": self.deleted_indexes,
+            "errors": self.errors,
+        }
+
+
+def read_artifacts(directory: Path, kind: Optional[str] = None):
+    """
+    Iterate over stored artifact records, oldest segment first.
+
+    Args:
+        directory: Artifact directory
+        kind: Only yield records of this kind
+
+    Yields:
+        Dict[str, Any]: Artifact records
+    """
+    directory = Path(directory)
+    paths = sorted(
+        directory.glob(f"*{SEGMENT_SUFFIX}"), key=lambda path: path.stat().st_mtime
+    )
+    for path in paths:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    if kind is None or record.get("kind") == kind:
+                        yield record
+        except (OSError, EOFError, ValueError) as e:
+            # A segment may end in a partially written member
+            logger.warning(f"Stopped reading artifact segment {path.name}: {e}")
@@ -0,0 +1,470 @@
+"""
+Caching utilities for extraction results.
+
+Provides an in-memory LRU cache with TTL and a size-capped on-disk store,
+combined into a layered cache so repeat requests for the same content can
+skip the LLM round trip entirely.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("introspect_agent")
+
+# Root directory for persisted caches and stores
+storage_dir = Path(
+    os.environ.get(
+        "STORAGE_DIR", str(Path(__file__).parent.resolve().joinpath("storage"))
+    )
+)
+
+
+def hash_key(key: str) -> str:
+    """Return a stable, filesystem-safe digest for a cache key."""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def extraction_cache_key(
+    source_key: str, model: str, instructions_version: str
+) -> str:
+    """
+    Build the cache key for an extraction result.
+
+    Args:
+        source_key: Canonical content identifier (e.g. "youtube:<video_id>")
+        model: Name of the model that produced the extraction
+        instructions_version: Version of the extraction instructions
+
+    Returns:
+        Cache key string
+    """
+    return f"extract:{model}:{instructions_version}:{source_key}"
+
+
+def stable_hash(data: Any) -> str:
+    """Return a digest of JSON-serializable data that ignores key order."""
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hash_key(canonical)
+
+
+def normalize_user_context(user_context: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Normalize user context so trivially different inputs share a cache entry.
+
+    Values are trimmed, case-folded and have internal whitespace collapsed.
+    """
+    user_context = user_context or {}
+    return {
+        field: " ".join(str(user_context.get(field) or "").split()).casefold()
+        for field in ("interests", "goals", "background")
+    }
+
+
+def prompt_cache_key(
+    extracted_data: Dict[str, Any],
+    user_context: Optional[Dict[str, Any]],
+    model: str,
+    instructions_version: str,
+) -> str:
+    """
+    Build the cache key for a generated prompt.
+
+    Args:
+        extracted_data: Extraction result the prompt is generated from
+        user_context: User context with interests, goals and background
+        model: Name of the model that generates the prompt
+        instructions_version: Version of the prompt instructions
+
+    Returns:
+        Cache key string
+    """
+    extraction_hash = stable_hash(
+        {
+            "title": extracted_data.get("title"),
+            "summary": extracted_data.get("summary"),
+            "insights": extracted_data.get("insights"),
+        }
+    )
+    context_hash = stable_hash(normalize_user_context(user_context))
+    return f"prompt:{model}:{instructions_version}:{extraction_hash}:{context_hash}"
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory LRU cache with per-entry expiry.
+
+    Values are deep-copied on the way in and out so callers can mutate
+    what they get back without corrupting the cached entry.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 86400):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries kept in memory
+            ttl_seconds: Time-to-live for each entry in seconds
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for a key, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        """Store a value, evicting the least recently used entries if full."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._entries[key] = (expires_at, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        """Remove a key from the cache if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters."""
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class DiskStore:
+    """
+    JSON file store with TTL and a total size cap.
+
+    Each entry is written to its own file named after the hashed key. Files
+    are written atomically via a temporary file and rename. When the store
+    exceeds its size budget, the least recently written entries are removed.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        ttl_seconds: float = 7 * 86400,
+        max_bytes: int = 256 * 1024 * 1024,
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            directory: Directory to store entries in
+            ttl_seconds: Time-to-live for each entry in seconds
+            max_bytes: Maximum total size of stored entries in bytes
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Maps file name -> (mtime, size), scanned once at startup
+        self._index: Dict[str, Tuple[float, int]] = {}
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load_index()
+
+    def _load_index(self):
+        """Build the in-memory size index from the files on disk."""
+        for entry in os.scandir(self.directory):
+            if not entry.is_file() or not entry.name.endswith(".json"):
+                continue
+            stat = entry.stat()
+            self._index[entry.name] = (stat.st_mtime, stat.st_size)
+            self._total_bytes += stat.st_size
+
+    def _path_for(self, key: str) -> Path:
+        return self.directory.joinpath(f"{hash_key(key)}.json")
+
+    def _remove(self, name: str):
+        """Remove a file and its index entry. Caller must hold the lock."""
+        _, size = self._index.pop(name, (0, 0))
+        self._total_bytes -= size
+        try:
+            self.directory.joinpath(name).unlink()
+        except FileNotFoundError:
+            pass
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the stored value for a key, or None if missing or expired."""
+        entry = self.get_with_expiry(key)
+        return entry[0] if entry is not None else None
+
+    def get_with_expiry(self, key: str) -> Optional[Tuple[Any, float]]:
+        """
+        Return the stored value for a key with the time it expires.
+
+        Returns:
+            Tuple of the value and its expiry as a Unix timestamp, or None if
+            missing or expired
+        """
+        path = self._path_for(key)
+        try:
+            with open(path, "r") as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable cache entry {path.name}: {e}")
+            with self._lock:
+                self._remove(path.name)
+            self.misses += 1
+            return None
+
+        expires_at = record.get("expires_at", 0)
+        if record.get("key") != key or expires_at <= time.time():
+            with self._lock:
+                self._remove(path.name)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return record.get("value"), expires_at
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        """Write a value to disk and enforce the size budget."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        path = self._path_for(key)
+        payload = json.dumps(
+            {"key": key, "expires_at": time.time() + ttl, "value": value}
+        )
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+
+        with self._lock:
+            with open(tmp_path, "w") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+
+            _, old_size = self._index.get(path.name, (0, 0))
+            size = len(payload.encode("utf-8"))
+            self._index[path.name] = (time.time(), size)
+            self._total_bytes += size - old_size
+            self._evict_over_budget()
+
+    def _evict_over_budget(self):
+        """Remove the oldest entries until under the size budget."""
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        for name, _ in sorted(self._index.items(), key=lambda item: item[1][0]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._remove(name)
+            self.evictions += 1
+
+    def delete(self, key: str):
+        """Remove a key from the store if present."""
+        with self._lock:
+            self._remove(self._path_for(key).name)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return store counters."""
+        return {
+            "entries": len(self._index),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class LayeredCache:
+    """
+    Two-level cache: an in-memory LRU in front of an on-disk store.
+
+    Reads check memory first and promote disk hits into memory, for no
+    longer than the disk entry has left to live. Writes go to both layers.
+    The async variants serve memory hits inline and only offload disk I/O
+    to a worker thread.
+    """
+
+    def __init__(self, memory: TTLCache, disk: Optional[DiskStore] = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for a key, or None on a miss."""
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        return self._get_from_disk(key)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """Async variant of get that keeps disk reads off the event loop."""
+        value = self.memory.get(key)
+        if value is not None or self.disk is None:
+            return value
+        return await asyncio.to_thread(self._get_from_disk, key)
+
+    def _get_from_disk(self, key: str) -> Optional[Any]:
+        """
+        Read a key from disk and promote it into memory.
+
+        The promoted entry expires no later than the disk entry, so a value
+        close to its disk expiry is not served from memory for a full
+        memory TTL after it.
+        """
+        if self.disk is None:
+            return None
+
+        entry = self.disk.get_with_expiry(key)
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        remaining = expires_at - time.time()
+        if value is not None and remaining > 0:
+            self.memory.set(
+                key, value, ttl_seconds=min(self.memory.ttl_seconds, remaining)
+            )
+        return value
+
+    def set(self, key: str, value: Any):
+        """Store a value in every layer."""
+        self.memory.set(key, value)
+        self._set_on_disk(key, value)
+
+    async def aset(self, key: str, value: Any):
+        """Async variant of set that keeps disk writes off the event loop."""
+        self.memory.set(key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self._set_on_disk, key, value)
+
+    def _set_on_disk(self, key: str, value: Any):
+        """Persist a value, logging rather than raising on I/O errors."""
+        if self.disk is None:
+            return
+        try:
+            self.disk.set(key, value)
+        except OSError as e:
+            logger.warning(f"Failed to persist cache entry: {e}")
+
+    def delete(self, key: str):
+        """Remove a key from every layer."""
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters for every layer."""
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
+
+
+class NegativeCache:
+    """
+    Short-lived cache of known failures, with a TTL per error class.
+
+    Lets callers skip expensive work for inputs that recently failed in a
+    way that is unlikely to change soon (e.g. a deleted video).
+    """
+
+    def __init__(
+        self,
+        ttls: Dict[str, float],
+        default_ttl_seconds: float = 600,
+        max_entries: int = 4096,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            ttls: Time-to-live in seconds per error class name
+            default_ttl_seconds: TTL for error classes not listed in ttls
+            max_entries: Maximum number of remembered failures
+        """
+        self.ttls = ttls
+        self.default_ttl_seconds = default_ttl_seconds
+        self._entries = TTLCache(
+            max_entries=max_entries, ttl_seconds=default_ttl_seconds
+        )
+        self._lock = threading.Lock()
+        self.recorded: Dict[str, int] = {}
+        self.hits: Dict[str, int] = {}
+
+    def record(self, key: str, error_class: str, message: str = ""):
+        """Remember that work for a key failed with the given error class."""
+        ttl = self.ttls.get(error_class, self.default_ttl_seconds)
+        self._entries.set(
+            key, {"error_class": error_class, "message": message}, ttl_seconds=ttl
+        )
+        with self._lock:
+            self.recorded[error_class] = self.recorded.get(error_class, 0) + 1
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        """
+        Return the remembered failure for a key, if still fresh.
+
+        Returns:
+            Dict with error_class and message, or None
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            with self._lock:
+                error_class = entry["error_class"]
+                self.hits[error_class] = self.hits.get(error_class, 0) + 1
+        return entry
+
+    def delete(self, key: str):
+        """Forget a remembered failure."""
+        self._entries.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-error-class counters."""
+        return {
+            "entries": len(self._entries),
+            "recorded": dict(self.recorded),
+            "hits": dict(self.hits),
+        }
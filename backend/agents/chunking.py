@@ -0,0 +1,261 @@
+"""
+Map-reduce helpers for long transcripts.
+
+Long content is split on sentence boundaries into chunks that fit a token
+budget, each chunk is extracted independently (and concurrently), and the
+per-chunk insights are merged without another model call: near-duplicates
+are collapsed and insights are ranked by how many chunks support them and
+how highly each chunk ranked them.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from .summarizer import split_sentences, tokenize
+
+# Rough characters per token for English text
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of model tokens in a text."""
+    return estimate_tokens_for_chars(len(text))
+
+
+def estimate_tokens_for_chars(chars: int) -> int:
+    """Estimate the number of model tokens in a text of the given length."""
+    return chars // CHARS_PER_TOKEN + 1
+
+
+class StreamingChunker:
+    """
+    Incremental version of chunk_text for text that arrives in pieces.
+
+    Chunks are emitted as soon as they are full, so work on the first chunks
+    can start before the whole text is available. The last sentence of each
+    piece is held back, since the next piece may continue it.
+    """
+
+    def __init__(self, max_tokens: int, overlap_sentences: int = 1):
+        """
+        Initialize the chunker.
+
+        Args:
+            max_tokens: Token budget per chunk
+            overlap_sentences: Sentences repeated at the start of the next chunk
+        """
+        self.max_tokens = max_tokens
+        self.overlap_sentences = overlap_sentences
+        self._current: List[str] = []
+        self._current_tokens = 0
+        self._pending = ""
+
+    def _split_oversized(self, sentence: str) -> List[str]:
+        """
+        Cut a sentence longer than the budget into pieces that fit.
+
+        Pieces break on whitespace; a single word longer than the budget,
+        such as a URL, is cut wherever the budget runs out.
+        """
+        max_chars = CHARS_PER_TOKEN * self.max_tokens - 1
+        pieces: List[str] = []
+        words: List[str] = []
+        length = 0
+        for word in sentence.split():
+            while len(word) > max_chars:
+                if words:
+                    pieces.append(" ".join(words))
+                    words, length = [], 0
+                pieces.append(word[:max_chars])
+                word = word[max_chars:]
+            if words and length + 1 + len(word) > max_chars:
+                pieces.append(" ".join(words))
+                words, length = [], 0
+            length += len(word) + (1 if words else 0)
+            words.append(word)
+        if words:
+            pieces.append(" ".join(words))
+        return pieces
+
+    def _add_sentence(self, sentence: str, chunks: List[str]):
+        sentence_tokens = estimate_tokens(sentence)
+        if sentence_tokens > self.max_tokens:
+            for piece in self._split_oversized(sentence):
+                self._add_sentence(piece, chunks)
+            return
+
+        if self._current and self._current_tokens + sentence_tokens > self.max_tokens:
+            chunks.append(" ".join(self._current))
+            overlap = self.overlap_sentences
+            self._current = self._current[-overlap:] if overlap else []
+            self._current_tokens = sum(estimate_tokens(s) for s in self._current)
+            # Overlap never pushes the next chunk over the budget
+            while (
+                self._current
+                and self._current_tokens + sentence_tokens > self.max_tokens
+            ):
+                self._current_tokens -= estimate_tokens(self._current.pop(0))
+        self._current.append(sentence)
+        self._current_tokens += sentence_tokens
+
+    def add(self, text: str) -> List[str]:
+        """
+        Add the next piece of text.
+
+        Returns:
+            List[str]: Chunks completed by this piece
+        """
+        sentences = split_sentences(f"{self._pending} {text}")
+        self._pending = sentences.pop() if sentences else ""
+        chunks: List[str] = []
+        for sentence in sentences:
+            self._add_sentence(sentence, chunks)
+        return chunks
+
+    def finish(self) -> List[str]:
+        """
+        Flush the held-back sentence and the last partial chunk.
+
+        Returns:
+            List[str]: The remaining chunks
+        """
+        chunks: List[str] = []
+        if self._pending:
+            self._add_sentence(self._pending, chunks)
+            self._pending = ""
+        if self._current:
+            chunks.append(" ".join(self._current))
+            self._current = []
+            self._current_tokens = 0
+        return chunks
+
+
+def chunk_text(
+    text: str, max_tokens: int, overlap_sentences: int = 1
+) -> List[str]:
+    """
+    Split text into chunks of whole sentences within a token budget.
+
+    Consecutive chunks share overlap_sentences sentences so a point made
+    across a boundary is not lost, as far as the budget allows. A sentence
+    longer than the budget is split on whitespace, so no chunk exceeds it.
+
+    Args:
+        text: Text to split
+        max_tokens: Token budget per chunk
+        overlap_sentences: Sentences repeated at the start of the next chunk
+
+    Returns:
+        List[str]: Chunks in text order
+    """
+    chunker = StreamingChunker(max_tokens, overlap_sentences)
+    return chunker.add(text) + chunker.finish()
+
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def merge_insights(
+    chunk_results: List[Dict[str, Any]],
+    max_insights: int = 7,
+    similarity_threshold: float = 0.5,
+) -> List[Dict[str, str]]:
+    """
+    Merge per-chunk insights into a deduplicated, ranked list.
+
+    An insight whose content words overlap an earlier one by at least
+    similarity_threshold (Jaccard) is folded into it. Each group scores the
+    sum of 1 / (1 + rank within its chunk) over its members, so points made
+    early and in several chunks come first. Ties keep text order.
+
+    Args:
+        chunk_results: Extraction data per chunk, in text order
+        max_insights: Number of insights to keep
+        similarity_threshold: Jaccard similarity that marks a duplicate
+
+    Returns:
+        List[Dict[str, str]]: Insights with point and type
+    """
+    groups: List[Dict[str, Any]] = []
+    for result in chunk_results:
+        for rank, insight in enumerate(result.get("insights") or []):
+            point = (insight.get("point") or "").strip()
+            if not point:
+                continue
+            terms = frozenset(tokenize(point))
+            weight = 1.0 / (1 + rank)
+
+            for group in groups:
+                if _jaccard(terms, group["terms"]) >= similarity_threshold:
+                    group["score"] += weight
+                    break
+            else:
+                groups.append(
+                    {
+                        "insight": {
+                            "point": point,
+                            "type": insight.get("type") or "fact",
+                        },
+                        "terms": terms,
+                        "score": weight,
+                        "order": len(groups),
+                    }
+                )
+
+    ranked = sorted(groups, key=lambda group: (-group["score"], group["order"]))
+    return [group["insight"] for group in ranked[:max_insights]]
+
+
+def merge_summaries(summaries: List[str], max_words: int = 200) -> str:
+    """
+    Combine per-chunk summaries within a word budget.
+
+    The first sentence of each chunk summary is taken in order, then the
+    remaining sentences, until the budget is used.
+
+    Args:
+        summaries: Summary per chunk, in text order
+        max_words: Word budget
+
+    Returns:
+        str: Combined summary
+    """
+    per_chunk = [split_sentences(summary) for summary in summaries if summary]
+    ordered = [sentences[0] for sentences in per_chunk if sentences]
+    ordered += [s for sentences in per_chunk for s in sentences[1:]]
+
+    parts: List[str] = []
+    words = 0
+    for sentence in ordered:
+        length = len(sentence.split())
+        if parts and words + length > max_words:
+            break
+        parts.append(sentence)
+        words += length
+    return " ".join(parts)
+
+
+def merge_chunk_results(
+    chunk_results: List[Dict[str, Any]],
+    title: Optional[str] = None,
+    max_insights: int = 7,
+) -> Dict[str, Any]:
+    """
+    Reduce per-chunk extraction data into one result.
+
+    Args:
+        chunk_results: Extraction data per chunk, in text order
+        title: Known title, otherwise the first chunk's title
+        max_insights: Number of insights to keep
+
+    Returns:
+        Dict with title, summary and insights
+    """
+    chunk_titles = [r.get("title") for r in chunk_results if r.get("title")]
+    return {
+        "title": title or (chunk_titles[0] if chunk_titles else "Untitled Content"),
+        "summary": merge_summaries([r.get("summary", "") for r in chunk_results]),
+        "insights": merge_insights(chunk_results, max_insights),
+    }
@@ -0,0 +1,158 @@
+"""
+Shared HTTP clients with connection pooling.
+
+Reusing one pooled session keeps TCP/TLS connections alive between calls,
+so repeated lookups against the same hosts skip DNS, TCP and TLS setup.
+An async client is provided for use from the event loop.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger("introspect_agent")
+
+try:
+    import httpx
+
+    HTTPX_AVAILABLE = True
+except ImportError:
+    logger.warning("httpx not installed. Async HTTP calls will use a worker thread.")
+    HTTPX_AVAILABLE = False
+
+# Pool and timeout configuration
+HTTP_POOL_CONNECTIONS = int(os.environ.get("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", "20"))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "3.0"))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "10.0"))
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "2"))
+
+DEFAULT_TIMEOUT: Tuple[float, float] = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+_adapter: Optional[HTTPAdapter] = None
+_sessions: Dict[str, requests.Session] = {}
+_session_lock = threading.Lock()
+
+# Async clients are bound to the event loop they were created on
+_async_clients: Dict[int, Any] = {}
+
+
+def get_session(name: str = "default") -> requests.Session:
+    """
+    Get a pooled requests session, creating it on first use.
+
+    Every session is mounted on the same adapter, so they all share one set
+    of keep-alive connection pools. Headers and cookies are per session:
+    clients that change them, such as the transcript API, get their own
+    name so other callers are unaffected.
+
+    Args:
+        name: Session name
+
+    Returns:
+        A requests.Session with keep-alive connection pools mounted
+    """
+    session = _sessions.get(name)
+    if session is not None:
+        return session
+
+    global _adapter
+    with _session_lock:
+        if _adapter is None:
+            retry = Retry(
+                total=HTTP_MAX_RETRIES,
+                backoff_factor=0.3,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=("GET", "HEAD"),
+            )
+            _adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_CONNECTIONS,
+                pool_maxsize=HTTP_POOL_MAXSIZE,
+                max_retries=retry,
+            )
+        session = _sessions.get(name)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", _adapter)
+            session.mount("http://", _adapter)
+            _sessions[name] = session
+    return session
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """
+    Perform a GET request on the shared session.
+
+    Args:
+        url: URL to fetch
+        **kwargs: Extra arguments for requests; timeout defaults to the pool settings
+
+    Returns:
+        The response
+    """
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    return get_session().get(url, **kwargs)
+
+
+def get_async_client():
+    """
+    Get the pooled async client for the running event loop.
+
+    Returns:
+        An httpx.AsyncClient, or None if httpx is not installed
+    """
+    if not HTTPX_AVAILABLE:
+        return None
+
+    loop_id = id(asyncio.get_running_loop())
+    client = _async_clients.get(loop_id)
+    if client is None or client.is_closed:
+        # Limits go on the transport; the client ignores them when given one
+        transport = httpx.AsyncHTTPTransport(
+            retries=HTTP_MAX_RETRIES,
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_MAXSIZE,
+                max_keepalive_connections=HTTP_POOL_CONNECTIONS,
+            ),
+        )
+        client = httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            follow_redirects=True,
+        )
+        _async_clients[loop_id] = client
+    return client
+
+
+async def aget(url: str, **kwargs):
+    """
+    Perform a GET request without blocking the event loop.
+
+    Uses the pooled httpx client when available, otherwise runs the shared
+    requests session in a worker thread. Both response types expose
+    status_code, headers, text and json().
+
+    Args:
+        url: URL to fetch
+        **kwargs: Extra arguments passed to the underlying client
+
+    Returns:
+        The response
+    """
+    client = get_async_client()
+    if client is not None:
+        return await client.get(url, **kwargs)
+    return await asyncio.to_thread(get, url, **kwargs)
+
+
+async def aclose():
+    """Close the async client bound to the running event loop."""
+    client = _async_clients.pop(id(asyncio.get_running_loop()), None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,391 @@
+"""
+Parallel PDF text extraction.
+
+Large PDFs are split into page ranges that are extracted concurrently in a
+process pool, so a book or slide deck neither blocks a request worker nor
+serializes on the GIL. Pages are assembled in order as ranges complete and
+streamed into the transcript chunker, so chunks are ready as soon as the
+last page arrives. Each document has a page limit and a time limit, which
+workers enforce between pages, and complete results are cached by content
+hash.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache import DiskStore
+from .chunking import StreamingChunker
+
+logger = logging.getLogger("introspect_agent")
+
+try:
+    from pypdf import PdfReader
+
+    PYPDF_AVAILABLE = True
+except ImportError:
+    logger.warning("pypdf not installed. PDF text extraction is unavailable.")
+    PYPDF_AVAILABLE = False
+
+# (document key, reader) of the document this worker process is extracting,
+# reused by the following ranges of the same document
+_worker_reader: Tuple[Optional[str], Any] = (None, None)
+
+
+def _open_reader(path: str):
+    reader = PdfReader(path)
+    if reader.is_encrypted:
+        # Many PDFs are encrypted with an empty user password
+        reader.decrypt("")
+    return reader
+
+
+def extract_page_range(
+    path: str,
+    start: int,
+    end: int,
+    document_key: Optional[str] = None,
+    deadline: Optional[float] = None,
+    release: bool = False,
+) -> List[str]:
+    """
+    Extract the text of pages [start, end) of a PDF.
+
+    Runs in a worker process. With a document_key, the parsed document is
+    kept for the following ranges of the same document, until a range with
+    release set or the deadline.
+
+    Args:
+        path: Path to the PDF file
+        start: First page index
+        end: Page index after the last page
+        document_key: Identifies the document across calls, e.g. its hash
+        deadline: Epoch time after which no further page is started
+        release: Drop the kept document after this range
+
+    Returns:
+        List[str]: Text of each page extracted, in order from start. Fewer
+        than end - start pages when the deadline passed.
+    """
+    global _worker_reader
+    if deadline is not None and time.time() >= deadline:
+        release = True
+        texts = []
+    else:
+        if document_key is None:
+            reader = _open_reader(path)
+        else:
+            if _worker_reader[0] != document_key:
+                # Release the previous document before parsing the next one
+                _worker_reader = (None, None)
+                _worker_reader = (document_key, _open_reader(path))
+            reader = _worker_reader[1]
+
+        texts = []
+        for i in range(start, end):
+            if deadline is not None and time.time() >= deadline:
+                release = True
+                break
+            texts.append(reader.pages[i].extract_text() or "")
+        del reader
+
+    if release and _worker_reader[0] == document_key:
+        _worker_reader = (None, None)
+    return texts
+
+
+class _PageAssembler:
+    """
+    Feeds pages to the chunker in document order as page ranges complete.
+    """
+
+    def __init__(self, chunk_tokens: int, max_chars: int):
+        self.chunker = StreamingChunker(chunk_tokens)
+        self.max_chars = max_chars
+        self.parts: List[str] = []
+        self.chunks: List[str] = []
+        self.chars = 0
+        self.pages_read = 0
+        self._next_page = 0
+        self._waiting: Dict[int, str] = {}
+
+    def _append(self, text: str):
+        text = text.strip()[: self.max_chars - self.chars]
+        if not text:
+            return
+        self.parts.append(text)
+        self.chars += len(text)
+        self.chunks.extend(self.chunker.add(text))
+
+    def add_range(self, start: int, texts: List[str]):
+        """Add the pages of a completed range and flush those now in order."""
+        for offset, text in enumerate(texts):
+            self._waiting[start + offset] = text
+        self.pages_read += len(texts)
+        while self._next_page in self._waiting:
+            self._append(self._waiting.pop(self._next_page))
+            self._next_page += 1
+
+    def finish(self) -> str:
+        """Flush pages stuck behind a missing range and return the text."""
+        for page_index in sorted(self._waiting):
+            self._append(self._waiting[page_index])
+        self._waiting.clear()
+        self.chunks.extend(self.chunker.finish())
+        return "\n\n".join(self.parts)
+
+
+class PdfExtractor:
+    """
+    Extracts PDF text in page ranges on a process pool.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        pages_per_task: int = 8,
+        max_pages: int = 500,
+        timeout_seconds: float = 60.0,
+        chunk_tokens: int = 6000,
+        cache: Optional[DiskStore] = None,
+    ):
+        """
+        Initialize the extractor. The process pool starts on first use.
+
+        Args:
+            workers: Worker processes, defaults to the number of CPUs
+            pages_per_task: Pages extracted per task; documents of at most
+                this many pages are extracted in a thread instead
+            max_pages: Maximum pages read per document
+            timeout_seconds: Time limit per document; workers stop at the next
+                page boundary and pages finished by then are kept
+            chunk_tokens: Token budget of the chunks built from the text
+            cache: Store for complete results, keyed by content hash
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.pages_per_task = max(1, pages_per_task)
+        self.max_pages = max_pages
+        self.timeout_seconds = timeout_seconds
+        self.chunk_tokens = chunk_tokens
+        self.cache = cache
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+        self.documents = 0
+        self.cache_hits = 0
+        self.pages_extracted = 0
+        self.timeouts = 0
+        self.task_errors = 0
+        self.seconds_total = 0.0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # Forking a process that runs an event loop and background
+                # threads can deadlock the child, so workers are spawned
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def _reset_pool(self, pool: ProcessPoolExecutor):
+        """Drop a broken pool so the next document starts a fresh one."""
+        with self._pool_lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _cache_key(self, content_hash: str, max_chars: int) -> str:
+        return f"pdf:{content_hash}:{self.max_pages}:{max_chars}:{self.chunk_tokens}"
+
+    async def extract(
+        self, path: Path, content_hash: str, max_chars: int = 2_000_000
+    ) -> Dict[str, Any]:
+        """
+        Extract the text of a PDF and split it into chunks.
+
+        Args:
+            path: Path to the PDF file
+            content_hash: SHA-256 of the file, the cache key
+            max_chars: Maximum characters of text to keep
+
+        Returns:
+            Dict with text, chunks, pages_total, pages_read, timed_out
+            and cached
+
+        Raises:
+            RuntimeError: If pypdf is not installed
+            ValueError: If the PDF cannot be opened
+        """
+        if not PYPDF_AVAILABLE:
+            raise RuntimeError("pypdf is not installed")
+
+        cache_key = self._cache_key(content_hash, max_chars)
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                self.cache_hits += 1
+                return {**cached, "cached": True}
+
+        started = time.monotonic()
+        try:
+            reader = await asyncio.to_thread(_open_reader, str(path))
+            pages_total = len(reader.pages)
+        except Exception as e:
+            raise ValueError(f"Unreadable PDF: {str(e)}") from e
+        del reader
+
+        page_count = min(pages_total, self.max_pages)
+        ranges = [
+            (start, min(start + self.pages_per_task, page_count))
+            for start in range(0, page_count, self.pages_per_task)
+        ]
+
+        assembler = _PageAssembler(self.chunk_tokens, max_chars)
+        timed_out = await self._extract_ranges(
+            str(path), content_hash, ranges, assembler
+        )
+        text = assembler.finish()
+
+        elapsed = time.monotonic() - started
+        self.documents += 1
+        self.pages_extracted += assembler.pages_read
+        self.seconds_total += elapsed
+        logger.info(
+            f"Extracted {assembler.pages_read}/{pages_total} PDF pages in {elapsed:.2f}s ({len(ranges)} tasks)"
+        )
+
+        result = {
+            "text": text,
+            "chunks": assembler.chunks,
+            "pages_total": pages_total,
+            "pages_read": assembler.pages_read,
+            "timed_out": timed_out,
+        }
+        # Partial results would hide the rest of the document on later uploads
+        complete = not timed_out and assembler.pages_read == page_count
+        if self.cache is not None and complete:
+            await asyncio.to_thread(self.cache.set, cache_key, result)
+        return {**result, "cached": False}
+
+    async def _extract_ranges(
+        self,
+        path: str,
+        document_key: str,
+        ranges: List[Tuple[int, int]],
+        assembler: _PageAssembler,
+    ) -> bool:
+        """
+        Extract page ranges concurrently until the time limit, handing each
+        range to the assembler as soon as it completes.
+
+        Returns:
+            bool: True if the time limit cut extraction short
+        """
+        if not ranges:
+            return False
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout_seconds
+        # Workers run in other processes, so they get the limit as epoch time
+        worker_deadline = time.time() + self.timeout_seconds
+        if len(ranges) == 1:
+            # Not worth a round trip to another process. The reader is not
+            # kept, so the document does not stay in this process's memory.
+            pool = None
+            start, end = ranges[0]
+            futures = {
+                loop.run_in_executor(
+                    None,
+                    extract_page_range,
+                    path,
+                    start,
+                    end,
+                    None,
+                    worker_deadline,
+                ): (start, end)
+            }
+        else:
+            pool = self._get_pool()
+            # A worker taking one of the last ranges gets no further range of
+            # this document, or at worst parses it again, so it lets go of it
+            last_batch = len(ranges) - self.workers
+            futures = {
+                loop.run_in_executor(
+                    pool,
+                    extract_page_range,
+                    path,
+                    start,
+                    end,
+                    document_key,
+                    worker_deadline,
+                    index >= last_batch,
+                ): (start, end)
+                for index, (start, end) in enumerate(ranges)
+            }
+
+        pending = set(futures)
+        try:
+            while pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                for future in done:
+                    start, end = futures[future]
+                    if future.exception() is not None:
+                        self.task_errors += 1
+                        logger.warning(
+                            f"PDF pages {start}-{end - 1} failed: {str(future.exception())}"
+                        )
+                        if pool is not None and isinstance(
+                            future.exception(), BrokenProcessPool
+                        ):
+                            self._reset_pool(pool)
+                        continue
+                    assembler.add_range(start, future.result())
+        finally:
+            # Ranges not yet started are dropped; running ones stop at their
+            # next page and release the document
+            for future in pending:
+                future.cancel()
+
+        if pending:
+            self.timeouts += 1
+            logger.warning(
+                f"PDF extraction hit the {self.timeout_seconds}s limit with {len(pending)} ranges left"
+            )
+            return True
+        return False
+
+    def close(self):
+        """Shut down the worker processes."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return extraction counters."""
+        return {
+            "available": PYPDF_AVAILABLE,
+            "workers": self.workers,
+            "documents": self.documents,
+            "cache_hits": self.cache_hits,
+            "pages_extracted": self.pages_extracted,
+            "timeouts": self.timeouts,
+            "task_errors": self.task_errors,
+            "seconds_total": round(self.seconds_total, 3),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
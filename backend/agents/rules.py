@@ -0,0 +1,300 @@
+"""
+Rule engine for offline transcript analysis.
+
+Rule packs are JSON files describing a kind of content: marker phrases that
+identify each key point, the insight to report when a rule matches, a
+summary template and generic insights used as padding. All markers of all
+packs are compiled into one case-insensitive regex, so a transcript is
+scanned once, whatever the number of packs, rules and markers.
+"""
+
+import json
+import logging
+import math
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("introspect_agent")
+
+
+class RuleMatch:
+    """A marker phrase found in the scanned text."""
+
+    __slots__ = ("pack", "rule_id", "marker", "start", "end")
+
+    def __init__(self, pack: str, rule_id: str, marker: str, start: int, end: int):
+        self.pack = pack
+        self.rule_id = rule_id
+        self.marker = marker
+        self.start = start
+        self.end = end
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rule": self.rule_id,
+            "marker": self.marker,
+            "start": self.start,
+            "end": self.end,
+        }
+
+
+class RulePack:
+    """
+    A set of rules for one kind of content.
+
+    Pack files have the following structure:
+    {
+      "name": "productivity",
+      "description": "What the pack covers",
+      "summary": "Summary template; {title} and {channel} are filled in",
+      "min_matches": 3,
+      "min_share": 0.4,
+      "max_insights": 7,
+      "rules": [
+        {"id": "say-no", "markers": ["say no more often"], "point": "...", "type": "actionable"}
+      ],
+      "generic_insights": [{"point": "...", "type": "fact"}]
+    }
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        """
+        Initialize a pack from its parsed JSON.
+
+        Args:
+            data: Pack definition
+
+        Raises:
+            ValueError: If a required field is missing
+        """
+        try:
+            self.name = data["name"]
+            self.rules = data["rules"]
+        except KeyError as e:
+            raise ValueError(f"Rule pack is missing {e}") from e
+
+        self.description = data.get("description", "")
+        self.summary = data.get("summary", "This video by {channel} covers {title}.")
+        self.min_matches = int(data.get("min_matches", 1))
+        self.min_share = float(data.get("min_share", 0.0))
+        self.max_insights = int(data.get("max_insights", 7))
+        self.generic_insights = data.get("generic_insights", [])
+        for idx, rule in enumerate(self.rules):
+            rule.setdefault("id", f"rule-{idx + 1}")
+            rule.setdefault("type", "fact")
+
+    @property
+    def required_matches(self) -> int:
+        """Distinct rules that must match: min_matches or min_share of the rules."""
+        return max(self.min_matches, math.ceil(self.min_share * len(self.rules)))
+
+    @classmethod
+    def load(cls, path: Path) -> "RulePack":
+        """Load a pack from a JSON file."""
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def build_analysis(
+        self, matches: List[RuleMatch], video_info: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Turn the matches for this pack into extraction data.
+
+        Matched rules are reported in pack order, then generic insights are
+        added until max_insights is reached.
+
+        Args:
+            matches: Matches belonging to this pack
+            video_info: Video metadata
+
+        Returns:
+            Dict with title, summary, insights and the matched positions
+        """
+        title = video_info.get("title", "YouTube Video")
+        channel = video_info.get("author_name", "Unknown Creator")
+
+        matched_ids = {match.rule_id for match in matches}
+        insights = [
+            {"point": rule["point"], "type": rule["type"]}
+            for rule in self.rules
+            if rule["id"] in matched_ids
+        ][: self.max_insights]
+
+        for insight in self.generic_insights:
+            if len(insights) >= self.max_insights:
+                break
+            insights.append(dict(insight))
+
+        return {
+            "title": title,
+            "summary": self.summary.format(title=title, channel=channel),
+            "insights": insights,
+            "rule_pack": self.name,
+            "rule_matches": [match.to_dict() for match in matches],
+        }
+
+
+def _trie_pattern(markers: List[str]) -> str:
+    """
+    Build a regex matching any of the markers, factored as a prefix trie.
+
+    Alternatives that share a prefix share its branch, so at each position
+    the regex engine follows one path instead of trying every marker.
+    Longer continuations are tried first, so the longest marker wins. Spaces
+    in markers match any run of whitespace, and markers only match whole
+    words, so "second thing" does not match inside "second things".
+    """
+    trie: Dict[str, Any] = {}
+    for marker in markers:
+        node = trie
+        for char in marker:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = []
+        for char in sorted((c for c in node if c), reverse=True):
+            atom = r"\s+" if char == " " else re.escape(char)
+            branches.append(atom + build(node[char]))
+        if "" in node:
+            # End of a marker: the shorter match is the last resort
+            branches.append("")
+        if not branches:
+            return ""
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    return r"\b(?:" + build(trie) + r")\b"
+
+
+def _normalize_marker(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+
+class RuleEngine:
+    """
+    Matches text against every loaded rule pack in a single pass.
+    """
+
+    def __init__(self, packs: List[RulePack], default_pack: Optional[str] = None):
+        """
+        Compile the markers of all packs.
+
+        Args:
+            packs: Loaded rule packs
+            default_pack: Name of the pack used when no pack reaches its
+                min_matches, or None to report no match in that case
+        """
+        self.packs = {pack.name: pack for pack in packs}
+        self.default_pack = default_pack if default_pack in self.packs else None
+
+        # Normalized marker -> every (pack, rule id) it identifies
+        self._owners: Dict[str, List[Tuple[str, str]]] = {}
+        for pack in packs:
+            for rule in pack.rules:
+                for marker in rule.get("markers", []):
+                    owners = self._owners.setdefault(_normalize_marker(marker), [])
+                    owners.append((pack.name, rule["id"]))
+
+        # Markers are lowercase, so lowercased text can be matched without
+        # IGNORECASE, which is several times faster. The IGNORECASE variant
+        # covers text whose length changes when lowercased.
+        self._pattern = None
+        self._pattern_ignorecase = None
+        if self._owners:
+            pattern = _trie_pattern(list(self._owners))
+            self._pattern = re.compile(pattern)
+            self._pattern_ignorecase = re.compile(pattern, re.IGNORECASE)
+
+    @classmethod
+    def from_directory(
+        cls, directory: Path, default_pack: Optional[str] = None
+    ) -> "RuleEngine":
+        """
+        Load every *.json pack in a directory. Invalid packs are skipped.
+
+        Args:
+            directory: Directory holding pack files
+            default_pack: Name of the fallback pack
+
+        Returns:
+            RuleEngine: The compiled engine
+        """
+        packs = []
+        for path in sorted(Path(directory).glob("*.json")):
+            try:
+                packs.append(RulePack.load(path))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping rule pack {path.name}: {e}")
+        logger.info(f"Loaded {len(packs)} rule pack(s) from {directory}")
+        return cls(packs, default_pack)
+
+    def scan(self, text: str) -> List[RuleMatch]:
+        """
+        Find every marker occurrence in one pass over the text.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            List[RuleMatch]: Matches in text order, one per owning rule
+        """
+        if self._pattern is None:
+            return []
+
+        # One lowercase copy keeps match positions valid if lengths agree
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            found_iter = self._pattern.finditer(lowered)
+        else:
+            found_iter = self._pattern_ignorecase.finditer(text)
+
+        matches = []
+        for found in found_iter:
+            marker = _normalize_marker(found.group(0))
+            for pack, rule_id in self._owners.get(marker, ()):
+                matches.append(
+                    RuleMatch(pack, rule_id, marker, found.start(), found.end())
+                )
+        return matches
+
+    def match(self, text: str) -> Tuple[Optional[RulePack], List[RuleMatch]]:
+        """
+        Pick the pack that best describes the text.
+
+        The pack with the most distinct matched rules wins, provided it
+        reaches its required_matches (min_matches, or min_share of its rules
+        if that is more). Otherwise the default pack is used, if any.
+
+        Args:
+            text: Text to analyze
+
+        Returns:
+            Tuple of (pack or None, matches belonging to that pack)
+        """
+        by_pack: Dict[str, List[RuleMatch]] = {}
+        for found in self.scan(text):
+            by_pack.setdefault(found.pack, []).append(found)
+
+        best, best_rules = None, 0
+        for name, pack_matches in by_pack.items():
+            distinct = len({found.rule_id for found in pack_matches})
+            required = self.packs[name].required_matches
+            if distinct >= required and distinct > best_rules:
+                best, best_rules = name, distinct
+
+        if best is None:
+            best = self.default_pack
+        if best is None:
+            return None, []
+        return self.packs[best], by_pack.get(best, [])
+
+    def stats(self) -> Dict[str, Any]:
+        """Return loaded pack and marker counts."""
+        return {
+            "packs": sorted(self.packs),
+            "default_pack": self.default_pack,
+            "markers": len(self._owners),
+        }
@@ -0,0 +1,111 @@
+"""
+Single-flight coalescing for duplicate in-flight work.
+
+Concurrent callers asking for the same key share one execution: the first
+caller runs the work and every caller that arrives while it is in flight
+waits for the same result (or exception). If the caller running the work is
+cancelled, its followers start over and one of them takes over the work.
+"""
+
+import asyncio
+import concurrent.futures
+import copy
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+logger = logging.getLogger("introspect_agent")
+
+
+class _LeaderCancelled(Exception):
+    """Set on a shared future when the caller running the work was cancelled."""
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single execution.
+
+    In-flight calls are tracked with thread-safe futures, so callers running
+    on different threads or event loops are coalesced as well.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.retries = 0
+
+    async def do(
+        self, key: str, fn: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """
+        Run fn once for all concurrent callers with the same key.
+
+        Args:
+            key: Identifier of the work being done
+            fn: Zero-argument coroutine function performing the work
+
+        Returns:
+            Tuple of (result, shared) where shared is True if this caller
+            waited on another caller's execution
+
+        Raises:
+            Whatever exception the shared execution raised
+        """
+        while True:
+            with self._lock:
+                future = self._in_flight.get(key)
+                is_leader = future is None
+                if is_leader:
+                    future = concurrent.futures.Future()
+                    self._in_flight[key] = future
+                    self.executions += 1
+                else:
+                    self.coalesced += 1
+
+            if is_leader:
+                break
+
+            logger.debug(f"Coalescing with in-flight call for {key}")
+            try:
+                # Shield so one follower being cancelled doesn't cancel the others
+                result = await asyncio.shield(asyncio.wrap_future(future))
+            except _LeaderCancelled:
+                # The leader's cancellation is not ours: start over, so the
+                # first follower back becomes the new leader
+                self.retries += 1
+                continue
+            return copy.deepcopy(result), True
+
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            self._finish(key)
+            future.set_exception(_LeaderCancelled(key))
+            raise
+        except BaseException as e:
+            self._finish(key)
+            self.errors += 1
+            future.set_exception(e)
+            raise
+        else:
+            self._finish(key)
+            future.set_result(copy.deepcopy(result))
+            return result, False
+
+    def _finish(self, key: str):
+        """Stop tracking a key so later callers start a fresh execution."""
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return coalescing counters."""
+        return {
+            "in_flight": len(self._in_flight),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "retries": self.retries,
+        }
@@ -0,0 +1,412 @@
+"""
+Content source registry and router.
+
+Every resource is routed once to the source that handles it: YouTube
+videos, web articles, uploads by file type, or anything else as plain text.
+URL sources contribute a pattern to one compiled matcher, so routing is a
+single regex match whatever the number of sources. Each source declares
+its extraction cache key, time limit and concurrency limit, and keeps its
+own counters.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from .article_utils import canonical_url
+
+logger = logging.getLogger("introspect_agent")
+
+T = TypeVar("T")
+
+# Per-source limits for the whole extraction of one resource. A timeout of 0
+# means no limit; a concurrency of 0 means unlimited.
+SOURCE_YOUTUBE_TIMEOUT = float(os.environ.get("SOURCE_YOUTUBE_TIMEOUT", "0"))
+SOURCE_YOUTUBE_CONCURRENCY = int(os.environ.get("SOURCE_YOUTUBE_CONCURRENCY", "0"))
+SOURCE_ARTICLE_TIMEOUT = float(os.environ.get("SOURCE_ARTICLE_TIMEOUT", "0"))
+SOURCE_ARTICLE_CONCURRENCY = int(os.environ.get("SOURCE_ARTICLE_CONCURRENCY", "8"))
+SOURCE_PDF_UPLOAD_TIMEOUT = float(os.environ.get("SOURCE_PDF_UPLOAD_TIMEOUT", "0"))
+SOURCE_PDF_UPLOAD_CONCURRENCY = int(
+    os.environ.get("SOURCE_PDF_UPLOAD_CONCURRENCY", "2")
+)
+SOURCE_TEXT_UPLOAD_TIMEOUT = float(os.environ.get("SOURCE_TEXT_UPLOAD_TIMEOUT", "0"))
+SOURCE_TEXT_UPLOAD_CONCURRENCY = int(
+    os.environ.get("SOURCE_TEXT_UPLOAD_CONCURRENCY", "4")
+)
+SOURCE_TEXT_TIMEOUT = float(os.environ.get("SOURCE_TEXT_TIMEOUT", "0"))
+SOURCE_TEXT_CONCURRENCY = int(os.environ.get("SOURCE_TEXT_CONCURRENCY", "0"))
+
+# Any YouTube host, with the video ID when the URL names one. Short links
+# carry the ID directly after the host, other hosts after a known prefix.
+YOUTUBE_PATTERN = (
+    r"(?:https?://)?(?:[\w-]+\.)*"
+    r"(?:(?P<youtube_short>youtu\.be)|youtube(?:-nocookie)?\.com)(?::\d+)?"
+    r"(?:/(?(youtube_short)|"
+    r"(?:(?:watch/?)?\?(?:[^#\s]*?&)?v=|(?:embed|shorts|live|v|e)/))"
+    r"(?P<video_id>[0-9A-Za-z_-]{11})(?![0-9A-Za-z_-]))?"
+    r"(?:[/?#&]\S*)?"
+)
+
+ARTICLE_PATTERN = r"https?://[^\s/?#]+(?:[/?#]\S*)?"
+
+
+class SourceMatch:
+    """A resource routed to its source."""
+
+    __slots__ = ("source", "resource", "params")
+
+    def __init__(
+        self, source: "ContentSource", resource: str, params: Dict[str, str]
+    ):
+        self.source = source
+        self.resource = resource
+        self.params = params
+
+    @property
+    def key(self) -> str:
+        """Source key identifying the content, used in extraction cache keys."""
+        # Uploaded content is identified by its bytes, whatever the source
+        content_hash = self.params.get("content_hash")
+        if content_hash:
+            return f"upload:{content_hash}"
+        return self.source.source_key(self)
+
+
+class ContentSource:
+    """
+    A kind of content with its own cache key, time limit and concurrency.
+
+    The base class handles anything no other source matches, keyed by the
+    resource as given.
+    """
+
+    # Regex matching the whole resource, or None for non-URL sources. Named
+    # groups must be unique across sources and are passed on as params.
+    pattern: Optional[str] = None
+    # Title of the placeholder extraction reported on failure
+    error_title = "Content Access Error"
+    # What the content is called in extraction prompts
+    content_noun = "text"
+
+    def __init__(
+        self, name: str, timeout_seconds: float = 0.0, max_concurrency: int = 0
+    ):
+        """
+        Initialize the source.
+
+        Args:
+            name: Source name, used in routing and metrics
+            timeout_seconds: Time limit per extraction, 0 for none
+            max_concurrency: Extractions running at once, 0 for unlimited
+        """
+        self.name = name
+        self.timeout_seconds = timeout_seconds
+        self.max_concurrency = max_concurrency
+
+        # asyncio primitives belong to one event loop, so the semaphore is
+        # created on first use and replaced if the loop changes
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop = None
+
+        self.routed = 0
+        self.extractions = 0
+        self.active = 0
+        self.queued = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.seconds_total = 0.0
+
+    def source_key(self, match: SourceMatch) -> str:
+        """Identify the content behind a matched resource."""
+        return f"url:{match.resource}"
+
+    def _get_semaphore(self) -> Optional[asyncio.Semaphore]:
+        if self.max_concurrency <= 0:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def run(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run an extraction within this source's limits.
+
+        Time spent waiting for a concurrency slot does not count towards
+        the time limit.
+
+        Args:
+            fn: Zero-argument coroutine function performing the extraction
+
+        Returns:
+            The extraction result
+
+        Raises:
+            asyncio.TimeoutError: If the extraction exceeds the time limit
+        """
+        semaphore = self._get_semaphore()
+        if semaphore is None:
+            return await self._run_timed(fn)
+
+        if semaphore.locked():
+            self.queued += 1
+        async with semaphore:
+            return await self._run_timed(fn)
+
+    async def _run_timed(self, fn: Callable[[], Awaitable[T]]) -> T:
+        self.extractions += 1
+        self.active += 1
+        started = time.monotonic()
+        try:
+            if self.timeout_seconds > 0:
+                return await asyncio.wait_for(fn(), self.timeout_seconds)
+            return await fn()
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.active -= 1
+            self.seconds_total += time.monotonic() - started
+
+    def stats(self) -> Dict[str, Any]:
+        """Return routing and extraction counters."""
+        return {
+            "timeout_seconds": self.timeout_seconds,
+            "max_concurrency": self.max_concurrency,
+            "routed": self.routed,
+            "extractions": self.extractions,
+            "active": self.active,
+            "queued": self.queued,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "seconds_total": round(self.seconds_total, 3),
+        }
+
+
+class YouTubeSource(ContentSource):
+    """YouTube videos, keyed by video ID."""
+
+    pattern = YOUTUBE_PATTERN
+    error_title = "YouTube Video Access Error"
+    content_noun = "YouTube transcript"
+
+    def source_key(self, match: SourceMatch) -> str:
+        video_id = match.params.get("video_id")
+        if video_id:
+            return f"youtube:{video_id}"
+        return f"url:{match.resource}"
+
+
+class ArticleSource(ContentSource):
+    """Web pages, keyed by canonical URL."""
+
+    pattern = ARTICLE_PATTERN
+    content_noun = "web article"
+
+    def source_key(self, match: SourceMatch) -> str:
+        return f"url:{canonical_url(match.resource)}"
+
+
+class UploadSource(ContentSource):
+    """Uploaded files of some MIME types, keyed by content hash."""
+
+    error_title = "Content Processing Error"
+    content_noun = "uploaded document"
+
+    def __init__(self, name: str, mime_types: Tuple[str, ...], **limits):
+        """
+        Initialize the source.
+
+        Args:
+            name: Source name
+            mime_types: MIME types of the uploads this source handles
+            **limits: timeout_seconds and max_concurrency
+        """
+        super().__init__(name, **limits)
+        self.mime_types = mime_types
+
+
+class SourceRouter:
+    """
+    Routes resources to registered sources with one compiled matcher.
+    """
+
+    def __init__(self, sources: List[ContentSource], fallback: ContentSource):
+        """
+        Register sources in priority order.
+
+        Args:
+            sources: Sources tried in order; URL sources by pattern and
+                upload sources by MIME type
+            fallback: Source for resources no other source matches
+        """
+        self.fallback = fallback
+        self.sources: Dict[str, ContentSource] = {}
+        self._url_sources: List[ContentSource] = []
+        self._upload_sources: Dict[str, ContentSource] = {}
+        self._pattern: Optional[re.Pattern] = None
+        for source in sources:
+            self.register(source)
+        self.register(fallback)
+
+    def register(self, source: ContentSource):
+        """
+        Add a source after those already registered.
+
+        Args:
+            source: Source to add
+
+        Raises:
+            ValueError: If a source with the same name is registered
+        """
+        if source.name in self.sources:
+            raise ValueError(f"Source already registered: {source.name}")
+        self.sources[source.name] = source
+
+        if isinstance(source, UploadSource):
+            for mime_type in source.mime_types:
+                self._upload_sources.setdefault(mime_type, source)
+        if source.pattern is not None:
+            self._url_sources.append(source)
+            # Each source's pattern is wrapped in a group named after its
+            # position, so the matching source is found by group name
+            self._pattern = re.compile(
+                "|".join(
+                    f"(?P<source_{index}>{url_source.pattern})"
+                    for index, url_source in enumerate(self._url_sources)
+                ),
+                re.IGNORECASE,
+            )
+
+    def match(self, resource: str) -> SourceMatch:
+        """
+        Find the source of a URL or other resource name.
+
+        Args:
+            resource: URL or resource name
+
+        Returns:
+            SourceMatch: The matched source, or the fallback source
+        """
+        resource = (resource or "").strip()
+        found = self._pattern.fullmatch(resource) if self._pattern else None
+        if found is None:
+            return SourceMatch(self.fallback, resource, {})
+
+        index = int(found.lastgroup.rsplit("_", 1)[1])
+        params = {
+            name: value
+            for name, value in found.groupdict().items()
+            if value is not None and not name.startswith("source_")
+        }
+        return SourceMatch(self._url_sources[index], resource, params)
+
+    def route(self, resource: str) -> SourceMatch:
+        """
+        Match a resource that is about to be extracted, counting it
+        against its source.
+
+        Args:
+            resource: URL or resource name
+
+        Returns:
+            SourceMatch: The matched source, or the fallback source
+        """
+        match = self.match(resource)
+        match.source.routed += 1
+        return match
+
+    def route_upload(
+        self, mime_type: Optional[str], content_hash: str, title: str = ""
+    ) -> SourceMatch:
+        """
+        Find the source of an uploaded file.
+
+        Args:
+            mime_type: Detected MIME type of the upload
+            content_hash: SHA-256 of the uploaded content
+            title: Document title, kept as the resource name
+
+        Returns:
+            SourceMatch: The matched upload source, or the fallback source
+        """
+        source = self.upload_source(mime_type)
+        source.routed += 1
+        return SourceMatch(source, title, {"content_hash": content_hash})
+
+    def upload_source(self, mime_type: Optional[str]) -> ContentSource:
+        """
+        Return the source handling uploads of a MIME type, without routing.
+
+        Args:
+            mime_type: Detected MIME type of the upload
+
+        Returns:
+            ContentSource: The upload source, or the fallback source
+        """
+        return self._upload_sources.get(mime_type or "", self.fallback)
+
+    def get(self, name: str) -> Optional[ContentSource]:
+        """Return a registered source by name."""
+        return self.sources.get(name)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters of every source."""
+        return {name: source.stats() for name, source in self.sources.items()}
+
+
+def youtube_video_id(url: str) -> Optional[str]:
+    """
+    Return the video ID of a YouTube URL.
+
+    Args:
+        url: URL to inspect
+
+    Returns:
+        The video ID, or None if the URL does not name a YouTube video
+    """
+    match = source_router.match(url)
+    if not isinstance(match.source, YouTubeSource):
+        return None
+    return match.params.get("video_id")
+
+
+# Global router
+source_router = SourceRouter(
+    [
+        YouTubeSource(
+            "youtube",
+            timeout_seconds=SOURCE_YOUTUBE_TIMEOUT,
+            max_concurrency=SOURCE_YOUTUBE_CONCURRENCY,
+        ),
+        ArticleSource(
+            "article",
+            timeout_seconds=SOURCE_ARTICLE_TIMEOUT,
+            max_concurrency=SOURCE_ARTICLE_CONCURRENCY,
+        ),
+        UploadSource(
+            "pdf_upload",
+            ("application/pdf",),
+            timeout_seconds=SOURCE_PDF_UPLOAD_TIMEOUT,
+            max_concurrency=SOURCE_PDF_UPLOAD_CONCURRENCY,
+        ),
+        UploadSource(
+            "text_upload",
+            ("text/plain", "text/markdown", "text/html"),
+            timeout_seconds=SOURCE_TEXT_UPLOAD_TIMEOUT,
+            max_concurrency=SOURCE_TEXT_UPLOAD_CONCURRENCY,
+        ),
+    ],
+    fallback=ContentSource(
+        "text",
+        timeout_seconds=SOURCE_TEXT_TIMEOUT,
+        max_concurrency=SOURCE_TEXT_CONCURRENCY,
+    ),
+)
@@ -0,0 +1,368 @@
+"""
+Offline extractive summarizer.
+
+Builds a title, summary and insights from the transcript itself, so useful
+results can be served without any model call. Sentences are weighted with
+sparse TF-IDF, linked by cosine similarity into a graph that keeps only
+each sentence's strongest neighbours, and ranked by TextRank centrality.
+Only sentences sharing a term are compared. Scoring is vectorized with
+NumPy when it is installed, with a pure-Python fallback otherwise.
+"""
+
+import logging
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger("introspect_agent")
+
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    logger.warning("numpy not installed. Offline summarizer will use pure Python.")
+    NUMPY_AVAILABLE = False
+
+STOPWORDS = frozenset(
+    """
+    a about above actually after again against all also am an and any are as
+    at basically be because been before being below between both but by can
+    could did do does doing don down during each even every few for from
+    further get gets going gonna got guys had has have having he her here hers
+    him his how i if in into is it its itself just kind know like literally
+    lot me mean more most my no nor not now of off okay on once one only or
+    other our out over own pretty really right same say see she so some
+    something sort stuff such than that the their them then there these they
+    thing things think this those through to too um uh under until up us very
+    want was way we well were what when where which while who whom why will
+    with would yeah you your yours
+    """.split()
+)
+
+ACTIONABLE_PATTERN = re.compile(
+    r"^(?:so\s+)?(?:try|start|stop|make|avoid|focus|use|remember|keep|write|"
+    r"ask|take|build|don't|do not|never|always)\b|\b(?:you should|you need to|"
+    r"you have to|you must|make sure)\b",
+    re.IGNORECASE,
+)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'A-Z0-9])")
+_WORD = re.compile(r"[a-z][a-z'\-]+")
+
+
+def split_sentences(text: str, window_words: int = 25) -> List[str]:
+    """
+    Split text into sentences.
+
+    Auto-generated captions often have no punctuation; in that case the text
+    is cut into windows of window_words words instead.
+
+    Args:
+        text: Text to split
+        window_words: Window size for unpunctuated text
+
+    Returns:
+        List[str]: Sentences in text order
+    """
+    text = " ".join(text.split())
+    sentences = [s.strip() for s in _SENTENCE_END.split(text) if s.strip()]
+
+    words = text.split()
+    if words and len(words) / max(1, len(sentences)) > 3 * window_words:
+        sentences = [
+            " ".join(words[i : i + window_words])
+            for i in range(0, len(words), window_words)
+        ]
+    return sentences
+
+
+def tokenize(sentence: str) -> List[str]:
+    """Lowercase content words of a sentence, without stopwords."""
+    return [w for w in _WORD.findall(sentence.lower()) if w not in STOPWORDS]
+
+
+def _tfidf_csr(tokens: Sequence[List[str]]):
+    """
+    Return L2-normalized TF-IDF rows in CSR form.
+
+    Returns:
+        Tuple of (indptr, indices, data, rows): row i holds the term ids
+        indices[indptr[i]:indptr[i + 1]] with weights data[...], and rows
+        gives the sentence of every stored entry
+    """
+    n = len(tokens)
+    vocab: Dict[str, int] = {}
+    ids = np.array(
+        [vocab.setdefault(token, len(vocab)) for words in tokens for token in words],
+        dtype=np.intp,
+    )
+    lengths = np.array([len(sentence) for sentence in tokens], dtype=np.intp)
+    width = max(1, len(vocab))
+
+    # One entry per (sentence, term), sorted by sentence and then term
+    cells, counts = np.unique(
+        np.repeat(np.arange(n, dtype=np.intp), lengths) * width + ids,
+        return_counts=True,
+    )
+    rows, indices = np.divmod(cells, width)
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=n))))
+
+    df = np.bincount(indices, minlength=len(vocab))
+    idf = np.log((1 + n) / (1 + df)) + 1
+    data = np.log1p(counts.astype(np.float64)) * idf[indices]
+    norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=n))
+    data /= np.where(norms == 0, 1, norms)[rows]
+    return indptr, indices, data, rows
+
+
+def _textrank_numpy(
+    tokens: Sequence[List[str]],
+    top_k: int,
+    damping: float,
+    iterations: int,
+    block_rows: int = 256,
+):
+    """
+    Return (scores, similarity function) using vectorized NumPy.
+
+    TF-IDF is kept in CSR form. The similarities of block_rows sentences at
+    a time are accumulated through an inverted index into one block_rows x n
+    buffer, so only pairs of sentences sharing a term are multiplied, as in
+    the pure-Python path, and nothing larger than one block is held. Only
+    each sentence's top_k neighbours are kept as graph edges.
+    """
+    n = len(tokens)
+    indptr, indices, data, rows = _tfidf_csr(tokens)
+
+    # Inverted index: the sentences and weights of each term, by term id
+    order = np.argsort(indices, kind="stable")
+    postings_ptr = np.concatenate(([0], np.cumsum(np.bincount(indices))))
+    postings_rows, postings_data = rows[order], data[order]
+
+    k = min(top_k, n - 1)
+    sources, targets, edge_weights = [], [], []
+    for start in range(0, n if k > 0 else 0, block_rows):
+        stop = min(n, start + block_rows)
+        low, high = indptr[start], indptr[stop]
+        entry_cols = indices[low:high]
+        first = postings_ptr[entry_cols]
+        lengths = postings_ptr[entry_cols + 1] - first
+
+        # Pair every entry of the block with every posting of its term and
+        # accumulate the products into the block's rows of similarities
+        positions = np.arange(lengths.sum()) + np.repeat(
+            first - (np.cumsum(lengths) - lengths), lengths
+        )
+        cells = np.repeat((rows[low:high] - start) * n, lengths)
+        cells += postings_rows[positions]
+        products = np.repeat(data[low:high], lengths) * postings_data[positions]
+        size = stop - start
+        block = np.bincount(cells, weights=products, minlength=size * n)
+        block = block.reshape(size, n)
+        local = np.arange(size)
+        block[local, start + local] = 0
+
+        # Keep each sentence's top_k neighbours
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        weight = np.take_along_axis(block, top, axis=1).ravel()
+        kept = weight > 0
+        sources.append(np.repeat(start + local, k)[kept])
+        targets.append(top.ravel()[kept])
+        edge_weights.append(weight[kept])
+
+    if sources:
+        source = np.concatenate(sources)
+        target = np.concatenate(targets)
+        weight = np.concatenate(edge_weights)
+    else:
+        source = target = np.zeros(0, dtype=np.intp)
+        weight = np.zeros(0)
+
+    # Symmetrize; both directions of an edge carry the same cosine
+    keys, first = np.unique(
+        np.concatenate([source * n + target, target * n + source]),
+        return_index=True,
+    )
+    weight = np.concatenate([weight, weight])[first]
+    source, target = keys // n, keys % n
+
+    out_degree = np.bincount(source, weights=weight, minlength=n)
+    share = weight / np.where(out_degree == 0, 1, out_degree)[source]
+
+    scores = np.full(n, 1.0 / n)
+    teleport = (1 - damping) / n
+    for _ in range(iterations):
+        updated = teleport + damping * np.bincount(
+            target, weights=share * scores[source], minlength=n
+        )
+        if np.abs(updated - scores).sum() < 1e-6:
+            scores = updated
+            break
+        scores = updated
+
+    def similarity(i: int, j: int) -> float:
+        a = slice(indptr[i], indptr[i + 1])
+        b = slice(indptr[j], indptr[j + 1])
+        _, in_a, in_b = np.intersect1d(
+            indices[a], indices[b], assume_unique=True, return_indices=True
+        )
+        return float(data[a][in_a] @ data[b][in_b])
+
+    return scores.tolist(), similarity
+
+
+def _textrank_python(
+    tokens: Sequence[List[str]], top_k: int, damping: float, iterations: int
+):
+    """Return (scores, similarity function) in pure Python."""
+    n = len(tokens)
+    df = Counter(token for sentence_tokens in tokens for token in set(sentence_tokens))
+    vectors = []
+    for sentence_tokens in tokens:
+        vector = {
+            token: math.log1p(count) * (math.log((1 + n) / (1 + df[token])) + 1)
+            for token, count in Counter(sentence_tokens).items()
+        }
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        vectors.append({token: v / norm for token, v in vector.items()})
+
+    # Inverted index so only sentences sharing a term are compared
+    postings: Dict[str, List[int]] = {}
+    for i, vector in enumerate(vectors):
+        for token in vector:
+            postings.setdefault(token, []).append(i)
+
+    neighbours: List[Dict[int, float]] = []
+    for i, vector in enumerate(vectors):
+        sims: Dict[int, float] = {}
+        for token, weight in vector.items():
+            for j in postings[token]:
+                if j != i:
+                    sims[j] = sims.get(j, 0.0) + weight * vectors[j][token]
+        top = sorted(sims.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        neighbours.append(dict(top))
+
+    graph: List[Dict[int, float]] = [dict() for _ in range(n)]
+    for i, top in enumerate(neighbours):
+        for j, weight in top.items():
+            graph[i][j] = max(graph[i].get(j, 0.0), weight)
+            graph[j][i] = max(graph[j].get(i, 0.0), weight)
+
+    out_degree = [sum(edges.values()) for edges in graph]
+    scores = [1.0 / n] * n
+    teleport = (1 - damping) / n
+    for _ in range(iterations):
+        updated = [teleport] * n
+        for i, edges in enumerate(graph):
+            if out_degree[i] == 0:
+                continue
+            share = damping * scores[i] / out_degree[i]
+            for j, weight in edges.items():
+                updated[j] += share * weight
+        converged = sum(abs(a - b) for a, b in zip(updated, scores)) < 1e-6
+        scores = updated
+        if converged:
+            break
+
+    def similarity(i: int, j: int) -> float:
+        return sum(w * vectors[j].get(t, 0.0) for t, w in vectors[i].items())
+
+    return scores, similarity
+
+
+def _insight_type(sentence: str) -> str:
+    if '"' in sentence or "“" in sentence:
+        return "quote"
+    if ACTIONABLE_PATTERN.search(sentence):
+        return "actionable"
+    return "fact"
+
+
+def summarize(
+    text: str,
+    title: Optional[str] = None,
+    channel: Optional[str] = None,
+    max_insights: int = 7,
+    summary_words: int = 200,
+    top_k: int = 10,
+    damping: float = 0.85,
+    iterations: int = 50,
+    redundancy_threshold: float = 0.5,
+) -> Dict[str, Any]:
+    """
+    Build extraction data from a transcript without a model.
+
+    Args:
+        text: Transcript or document text
+        title: Known title, otherwise derived from the top keywords
+        channel: Author or channel name for the summary
+        max_insights: Maximum number of insights
+        summary_words: Word budget for the summary
+        top_k: Neighbours kept per sentence in the similarity graph
+        damping: TextRank damping factor
+        iterations: Maximum TextRank iterations
+        redundancy_threshold: Similarity above which a sentence counts as a
+            repeat of one already selected
+
+    Returns:
+        Dict with title, summary and insights
+    """
+    sentences = split_sentences(text)
+    tokens = [tokenize(sentence) for sentence in sentences]
+    candidates = [i for i, t in enumerate(tokens) if len(t) >= 3]
+
+    term_counts = Counter(token for sentence in tokens for token in sentence)
+    keywords = [word for word, _ in term_counts.most_common(5)]
+    title = title or (
+        " ".join(keywords[:3]).title() if keywords else "Untitled Content"
+    )
+
+    if not candidates:
+        return {
+            "title": title,
+            "summary": "The content was too short to summarize.",
+            "insights": [],
+        }
+
+    candidate_tokens = [tokens[i] for i in candidates]
+    textrank = _textrank_numpy if NUMPY_AVAILABLE else _textrank_python
+    scores, similarity = textrank(candidate_tokens, top_k, damping, iterations)
+
+    ranked = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)
+
+    # Highest-ranked sentences that do not repeat one already chosen
+    selected: List[int] = []
+    for i in ranked:
+        if all(similarity(i, j) < redundancy_threshold for j in selected):
+            selected.append(i)
+        if len(selected) >= max_insights:
+            break
+
+    insights = [
+        {
+            "point": sentences[candidates[i]],
+            "type": _insight_type(sentences[candidates[i]]),
+        }
+        for i in sorted(selected)
+    ]
+
+    summary_parts: List[str] = []
+    words = 0
+    for i in sorted(selected[: max(1, max_insights // 2)]):
+        sentence = sentences[candidates[i]]
+        if summary_parts and words + len(sentence.split()) > summary_words:
+            break
+        summary_parts.append(sentence)
+        words += len(sentence.split())
+
+    lead = f"Key points from {channel}" if channel else "Key points"
+    if keywords:
+        lead += f" on {', '.join(keywords[:3])}"
+
+    return {
+        "title": title,
+        "summary": f"{lead}: " + " ".join(summary_parts),
+        "insights": insights,
+    }
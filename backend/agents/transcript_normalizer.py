@@ -0,0 +1,297 @@
+"""
+Transcript normalization before text is sent to a model.
+
+Auto-generated captions repeat themselves: rolling captions re-send the end
+of the previous line, lines are repeated verbatim, and non-speech markers
+and filler words are mixed in. The normalizer cleans caption fragments in a
+single streaming pass with bounded state, optionally trims the result to a
+token budget, and counts the tokens saved.
+"""
+
+import re
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List
+
+from .chunking import CHARS_PER_TOKEN, estimate_tokens_for_chars
+
+# Bracketed or parenthesized non-speech annotations, and music notes
+NON_SPEECH_PATTERN = re.compile(
+    r"\[[^\]]{0,40}\]|\((?:music|applause|laughter|laughs|inaudible|silence|"
+    r"cheering|crosstalk|background noise)[^)]{0,20}\)|[♪♫]+",
+    re.IGNORECASE,
+)
+
+FILLER_WORDS = frozenset(
+    ["um", "umm", "uh", "uhh", "uhm", "erm", "er", "hmm", "mm", "mhm", "ah"]
+)
+
+# Words that are doubled in correct speech ("had had", "that that"), so a
+# repeat of them is not a stutter
+GRAMMATICAL_REPEATS = frozenset(
+    ["had", "that", "is", "was", "do", "does", "did", "can", "will"]
+)
+
+TRIM_STRATEGIES = ("head", "tail", "uniform")
+
+_PUNCTUATION = re.compile(r"[^\w']+")
+
+
+def _key(word: str) -> str:
+    """Comparison form of a word: lowercase without punctuation."""
+    return _PUNCTUATION.sub("", word.lower())
+
+
+class TranscriptNormalizer:
+    """
+    Streaming caption cleanup with an optional token budget.
+
+    Per-call state is local to normalize(), so one instance can serve
+    concurrent requests; only the aggregate counters are shared.
+    """
+
+    def __init__(
+        self,
+        strip_non_speech: bool = True,
+        strip_fillers: bool = True,
+        max_overlap_words: int = 20,
+        min_overlap_words: int = 3,
+        ngram_size: int = 6,
+        dedupe_window_words: int = 400,
+        token_budget: int = 0,
+        trim_strategy: str = "uniform",
+    ):
+        """
+        Initialize the normalizer.
+
+        Args:
+            strip_non_speech: Remove [Music]-style markers
+            strip_fillers: Remove filler words and stuttered repeats
+            max_overlap_words: Longest caption overlap looked for between fragments
+            min_overlap_words: Shortest overlap removed between fragments whose
+                cues do not overlap in time; shorter ones are usually speech
+            ngram_size: Word n-gram size used to detect repeated lines
+            dedupe_window_words: How far back repeated n-grams are remembered
+            token_budget: Maximum estimated tokens of output, 0 for no limit
+            trim_strategy: "head", "tail" or "uniform" sampling when over budget
+
+        Raises:
+            ValueError: If trim_strategy is unknown
+        """
+        if trim_strategy not in TRIM_STRATEGIES:
+            raise ValueError(f"Unknown trim strategy: {trim_strategy}")
+
+        self.strip_non_speech = strip_non_speech
+        self.strip_fillers = strip_fillers
+        self.max_overlap_words = max_overlap_words
+        self.min_overlap_words = max(1, min_overlap_words)
+        self.ngram_size = ngram_size
+        self.dedupe_window_words = dedupe_window_words
+        self.token_budget = token_budget
+        self.trim_strategy = trim_strategy
+
+        self._lock = threading.Lock()
+        self.totals = {
+            "requests": 0,
+            "tokens_in": 0,
+            "tokens_out": 0,
+            "fragments_in": 0,
+            "fragments_dropped": 0,
+            "overlap_words": 0,
+            "non_speech_markers": 0,
+            "filler_words": 0,
+            "trimmed_tokens": 0,
+        }
+
+    def _clean_words(self, text: str, counts: Dict[str, int]) -> List[str]:
+        """Strip markers, fillers and stutters from one fragment's text."""
+        if self.strip_non_speech:
+            text, markers = NON_SPEECH_PATTERN.subn(" ", text)
+            counts["non_speech_markers"] += markers
+
+        words = text.split()
+        if not self.strip_fillers:
+            return words
+
+        cleaned: List[str] = []
+        for word in words:
+            key = _key(word)
+            if key in FILLER_WORDS:
+                counts["filler_words"] += 1
+                continue
+            # "the the" stutters, but not "had had"
+            if (
+                cleaned
+                and key
+                and key not in GRAMMATICAL_REPEATS
+                and key == _key(cleaned[-1])
+            ):
+                counts["filler_words"] += 1
+                continue
+            cleaned.append(word)
+        return cleaned
+
+    @staticmethod
+    def _overlap(tail: Deque[str], keys: List[str], min_size: int) -> int:
+        """
+        Length of the longest suffix of the tail words that prefixes keys,
+        or 0 if it is shorter than min_size.
+        """
+        limit = min(len(tail), len(keys))
+        recent = list(tail)
+        for size in range(limit, min_size - 1, -1):
+            if recent[-size:] == keys[:size]:
+                return size
+        return 0
+
+    @staticmethod
+    def _cue_end(fragment: Dict[str, Any]):
+        try:
+            return float(fragment["start"]) + float(fragment.get("duration") or 0)
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def normalize(self, fragments: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Clean caption fragments into transcript text.
+
+        Args:
+            fragments: Caption fragments with a "text" field, in order
+
+        Returns:
+            Dict with the normalized "text" and per-call "stats"
+        """
+        counts = {key: 0 for key in self.totals if key != "requests"}
+        segments: List[str] = []
+        chars_in = 0
+        previous_end = None
+
+        # Bounded state: the last words, for overlaps, and the n-grams of
+        # the last dedupe_window_words words, for repeats
+        tail: Deque[str] = deque(maxlen=self.max_overlap_words)
+        last_ngram: Deque[str] = deque(maxlen=self.ngram_size)
+        ngram_window: Deque[tuple] = deque()
+        ngram_counts: Dict[tuple, int] = {}
+
+        def remember(keys: List[str]):
+            for key in keys:
+                tail.append(key)
+                last_ngram.append(key)
+                if len(last_ngram) == self.ngram_size:
+                    ngram = tuple(last_ngram)
+                    ngram_window.append(ngram)
+                    ngram_counts[ngram] = ngram_counts.get(ngram, 0) + 1
+                    if len(ngram_window) > self.dedupe_window_words:
+                        old = ngram_window.popleft()
+                        ngram_counts[old] -= 1
+                        if not ngram_counts[old]:
+                            del ngram_counts[old]
+
+        for fragment in fragments:
+            text = fragment.get("text") or ""
+            counts["fragments_in"] += 1
+            chars_in += len(text) + 1
+
+            words = self._clean_words(text, counts)
+            keys = [_key(word) for word in words]
+
+            # Rolling captions repeat the end of the previous line. Cues that
+            # overlap in time are rolling captions, so any repeat is dropped;
+            # otherwise a short repeat is more likely real speech.
+            start = fragment.get("start")
+            rolling = (
+                previous_end is not None
+                and isinstance(start, (int, float))
+                and start < previous_end
+            )
+            overlap = self._overlap(
+                tail, keys, 1 if rolling else self.min_overlap_words
+            )
+            previous_end = self._cue_end(fragment)
+            if overlap:
+                counts["overlap_words"] += overlap
+                words, keys = words[overlap:], keys[overlap:]
+
+            # A line whose every n-gram was just said is a repeat
+            if len(keys) >= self.ngram_size and all(
+                tuple(keys[i : i + self.ngram_size]) in ngram_counts
+                for i in range(len(keys) - self.ngram_size + 1)
+            ):
+                words = []
+
+            if not words:
+                counts["fragments_dropped"] += 1
+                continue
+
+            segments.append(" ".join(words))
+            remember(keys)
+
+        segments, trimmed = self._apply_budget(segments)
+        text = " ".join(segments)
+        # Tokens are estimated once per text, not per fragment
+        counts["tokens_in"] = (
+            estimate_tokens_for_chars(chars_in - 1) if chars_in else 0
+        )
+        counts["tokens_out"] = estimate_tokens_for_chars(len(text)) if text else 0
+        counts["trimmed_tokens"] = trimmed
+
+        with self._lock:
+            self.totals["requests"] += 1
+            for key, value in counts.items():
+                self.totals[key] += value
+
+        counts["tokens_saved"] = max(0, counts["tokens_in"] - counts["tokens_out"])
+        return {"text": text, "stats": counts}
+
+    def _apply_budget(self, segments: List[str]):
+        """
+        Trim segments to the token budget.
+
+        Returns:
+            Tuple of (kept segments, estimated tokens removed)
+        """
+        # Sizes in characters, counting the joining space, so the budget
+        # matches the estimate of the joined text
+        sizes = [len(segment) + 1 for segment in segments]
+        total = sum(sizes)
+        budget = self.token_budget * CHARS_PER_TOKEN
+        if not self.token_budget or total <= budget:
+            return segments, 0
+
+        if self.trim_strategy == "head":
+            kept, used = [], 0
+            for segment, size in zip(segments, sizes):
+                if used + size > budget:
+                    break
+                kept.append(segment)
+                used += size
+        elif self.trim_strategy == "tail":
+            kept, used = [], 0
+            for segment, size in zip(reversed(segments), reversed(sizes)):
+                if used + size > budget:
+                    break
+                kept.append(segment)
+                used += size
+            kept.reverse()
+        else:
+            # Evenly spaced segments across the whole transcript, in order
+            ratio = budget / total
+            kept, used, credit = [], 0, 0.0
+            for segment, size in zip(segments, sizes):
+                credit += ratio
+                if credit >= 1.0 and used + size <= budget:
+                    kept.append(segment)
+                    used += size
+                    credit -= 1.0
+
+        return kept, (total - used) // CHARS_PER_TOKEN
+
+    def stats(self) -> Dict[str, Any]:
+        """Return aggregate counters across all calls."""
+        with self._lock:
+            totals = dict(self.totals)
+        totals["tokens_saved"] = max(0, totals["tokens_in"] - totals["tokens_out"])
+        totals["token_budget"] = self.token_budget
+        totals["trim_strategy"] = self.trim_strategy
+        return totals
+
@@ -0,0 +1,316 @@
+"""
+Persistent store for YouTube transcripts.
+
+Transcripts never change for a given video and language, so once fetched
+they are kept on disk as zlib-compressed JSON blobs. An index file maps
+(video_id, language) to its blob, so lookups never scan the directory.
+Changes to the index are appended to a journal and folded into the index
+file once the journal grows, so a store or an access costs one small append.
+The store is size-capped and evicts the least recently used transcripts.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger("introspect_agent")
+
+INDEX_FILENAME = "index.json"
+JOURNAL_FILENAME = "index.log"
+
+# Keys become file names, so only well-formed IDs and language codes are stored
+VIDEO_ID_PATTERN = re.compile(r"[0-9A-Za-z_-]{11}")
+LANGUAGE_PATTERN = re.compile(r"[A-Za-z]{2,3}(?:-[0-9A-Za-z]{1,8})*")
+
+# Fold the journal into the index file after this many records, or after as
+# many records as there are entries if that is more
+MIN_JOURNAL_RECORDS = 256
+
+
+def is_valid_video_id(video_id: str) -> bool:
+    """Check whether a string is a well-formed YouTube video ID."""
+    return bool(VIDEO_ID_PATTERN.fullmatch(video_id or ""))
+
+
+class TranscriptStore:
+    """
+    Size-capped on-disk transcript store with a JSON index.
+
+    Each transcript is stored as the list of caption fragments returned by
+    the transcript API, so the raw data can be re-processed later with
+    different prompts, models or normalization.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Initialize the store.
+
+        Args:
+            directory: Directory holding the blobs and the index file
+            max_bytes: Maximum total size of compressed blobs in bytes
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._total_bytes = 0
+        self._journal_records = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load_index()
+
+    @staticmethod
+    def _key(video_id: str, language: str) -> str:
+        return f"{video_id}:{language}"
+
+    @staticmethod
+    def _is_valid(video_id: str, language: str) -> bool:
+        return is_valid_video_id(video_id) and bool(
+            LANGUAGE_PATTERN.fullmatch(language or "")
+        )
+
+    def _load_index(self):
+        """
+        Read the index file and replay the journal on top of it.
+
+        Entries whose blob has gone missing are dropped. A torn last journal
+        line, left by a crash mid-append, ends the replay.
+        """
+        index_path = self.directory.joinpath(INDEX_FILENAME)
+        entries: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(index_path, "r") as f:
+                entries = json.load(f).get("entries", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Transcript store index unreadable, starting empty: {e}")
+
+        try:
+            with open(self.directory.joinpath(JOURNAL_FILENAME), "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    self._journal_records += 1
+                    key = record["key"]
+                    if record["op"] == "put":
+                        entries[key] = record["entry"]
+                    elif record["op"] == "touch" and key in entries:
+                        entries[key]["last_access"] = record["at"]
+                    elif record["op"] == "remove":
+                        entries.pop(key, None)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Transcript store journal unreadable: {e}")
+
+        for key, entry in entries.items():
+            if self.directory.joinpath(entry["file"]).exists():
+                self._index[key] = entry
+                self._total_bytes += entry["bytes"]
+
+    def _save_index(self):
+        """
+        Atomically write the index file and empty the journal.
+
+        Caller must hold the lock. Journal records are idempotent, so a crash
+        between the two steps only replays records the index already holds.
+        """
+        index_path = self.directory.joinpath(INDEX_FILENAME)
+        tmp_path = index_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"entries": self._index}, f)
+        os.replace(tmp_path, index_path)
+        open(self.directory.joinpath(JOURNAL_FILENAME), "w").close()
+        self._journal_records = 0
+
+    def _append(self, record: Dict[str, Any]):
+        """Append a record to the journal. Caller must hold the lock."""
+        with open(self.directory.joinpath(JOURNAL_FILENAME), "a") as f:
+            f.write(json.dumps(record) + "\n")
+        self._journal_records += 1
+        if self._journal_records >= max(MIN_JOURNAL_RECORDS, len(self._index)):
+            self._save_index()
+
+    def get(self, video_id: str, language: str = "en") -> Optional[List[Dict]]:
+        """
+        Return the stored caption fragments for a video, or None if not stored.
+
+        Args:
+            video_id: The YouTube video ID
+            language: Transcript language code
+
+        Returns:
+            List of caption fragments or None
+        """
+        key = self._key(video_id, language)
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            entry["last_access"] = time.time()
+            blob_path = self.directory.joinpath(entry["file"])
+            # Persist the access so eviction order survives a restart
+            try:
+                self._append({"op": "touch", "key": key, "at": entry["last_access"]})
+            except OSError as e:
+                logger.warning(f"Failed to record transcript access for {key}: {e}")
+
+        try:
+            with open(blob_path, "rb") as f:
+                fragments = json.loads(zlib.decompress(f.read()))
+        except (OSError, ValueError, zlib.error) as e:
+            logger.warning(f"Dropping unreadable transcript blob for {key}: {e}")
+            with self._lock:
+                self._remove(key)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return fragments
+
+    def put(self, video_id: str, fragments: List[Dict], language: str = "en"):
+        """
+        Store the caption fragments for a video.
+
+        Args:
+            video_id: The YouTube video ID
+            fragments: Caption fragments as returned by the transcript API
+            language: Transcript language code
+
+        Raises:
+            ValueError: If the video ID or language code is malformed
+        """
+        if not self._is_valid(video_id, language):
+            raise ValueError(f"Invalid transcript key: {video_id!r}, {language!r}")
+
+        key = self._key(video_id, language)
+        blob = zlib.compress(json.dumps(fragments).encode("utf-8"), 6)
+        filename = f"{video_id}.{language}.json.z"
+        blob_path = self.directory.joinpath(filename)
+        tmp_path = blob_path.with_suffix(".tmp")
+
+        with self._lock:
+            with open(tmp_path, "wb") as f:
+                f.write(blob)
+            os.replace(tmp_path, blob_path)
+
+            old = self._index.get(key)
+            if old is not None:
+                self._total_bytes -= old["bytes"]
+
+            now = time.time()
+            entry = {
+                "file": filename,
+                "bytes": len(blob),
+                "created": now,
+                "last_access": now,
+            }
+            self._index[key] = entry
+            self._total_bytes += len(blob)
+            self._append({"op": "put", "key": key, "entry": entry})
+            self._evict_over_budget()
+
+    def contains(self, video_id: str, language: str = "en") -> bool:
+        """Check whether a transcript is stored without reading it."""
+        return self._key(video_id, language) in self._index
+
+    def _remove(self, key: str):
+        """Remove a blob and its index entry. Caller must hold the lock."""
+        entry = self._index.pop(key, None)
+        if entry is None:
+            return
+        self._total_bytes -= entry["bytes"]
+        self._append({"op": "remove", "key": key})
+        try:
+            self.directory.joinpath(entry["file"]).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _evict_over_budget(self):
+        """Evict least recently used transcripts until under budget."""
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        by_access = sorted(
+            self._index.items(), key=lambda item: item[1]["last_access"]
+        )
+        for key, _ in by_access:
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._remove(key)
+            self.evictions += 1
+
+    def prefetch(
+        self,
+        video_ids: Iterable[str],
+        fetch: Callable[[str], Optional[List[Dict]]],
+        language: str = "en",
+        max_workers: int = 4,
+    ) -> Dict[str, bool]:
+        """
+        Fetch and store transcripts for many videos at once.
+
+        Videos already in the store and malformed video IDs are skipped.
+
+        Args:
+            video_ids: Video IDs to prefetch
+            fetch: Function returning the caption fragments for a video ID
+            language: Transcript language code
+            max_workers: Number of concurrent fetches
+
+        Returns:
+            Mapping of video ID to whether its transcript is now stored
+        """
+        video_ids = [
+            video_id
+            for video_id in dict.fromkeys(video_ids)
+            if self._is_valid(video_id, language)
+        ]
+        results = {
+            video_id: True
+            for video_id in video_ids
+            if self.contains(video_id, language)
+        }
+        missing = [video_id for video_id in video_ids if video_id not in results]
+
+        def fetch_one(video_id: str) -> bool:
+            try:
+                fragments = fetch(video_id)
+            except Exception as e:
+                logger.warning(f"Prefetch failed for {video_id}: {str(e)}")
+                return False
+            if not fragments:
+                return False
+            self.put(video_id, fragments, language)
+            return True
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                for video_id, stored in zip(missing, pool.map(fetch_one, missing)):
+                    results[video_id] = stored
+
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Return store counters."""
+        return {
+            "entries": len(self._index),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
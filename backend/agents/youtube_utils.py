@@ -3,13 +3,77 @@ YouTube utilities for transcript extraction and content processing.
 This module provides backup functionality when the primary Agno YouTube tools fail.
 """
 
+import asyncio
 import logging
-import re
-import requests
+import os
 from typing import Optional, Dict, List, Any, Union, Tuple
 
+from . import http_client
+from .cache import NegativeCache, TTLCache, storage_dir
+from .sources import youtube_video_id
+from .transcript_normalizer import TranscriptNormalizer
+from .transcript_store import TranscriptStore, is_valid_video_id
+
 logger = logging.getLogger("introspect_agent")
 
+# oEmbed metadata rarely changes, so repeat lookups are served from memory
+VIDEO_INFO_CACHE_TTL_SECONDS = int(
+    os.environ.get("VIDEO_INFO_CACHE_TTL_SECONDS", "3600")
+)
+_video_info_cache = TTLCache(
+    max_entries=1024, ttl_seconds=VIDEO_INFO_CACHE_TTL_SECONDS
+)
+
+# Transcripts are immutable per video and language, so keep them on disk
+TRANSCRIPT_LANGUAGE = os.environ.get("TRANSCRIPT_LANGUAGE", "en")
+TRANSCRIPT_STORE_MAX_BYTES = int(
+    os.environ.get("TRANSCRIPT_STORE_MAX_BYTES", str(512 * 1024 * 1024))
+)
+transcript_store = TranscriptStore(
+    storage_dir.joinpath("transcripts"), max_bytes=TRANSCRIPT_STORE_MAX_BYTES
+)
+
+# Caption cleanup before transcripts reach the model. The store keeps the raw
+# fragments, so normalization settings can change without refetching.
+TRANSCRIPT_NORMALIZE = os.environ.get("TRANSCRIPT_NORMALIZE", "true").lower() == "true"
+transcript_normalizer = TranscriptNormalizer(
+    token_budget=int(os.environ.get("TRANSCRIPT_TOKEN_BUDGET", "0")),
+    trim_strategy=os.environ.get("TRANSCRIPT_TRIM_STRATEGY", "uniform").lower(),
+)
+
+# Remember videos that recently failed so repeat requests fail fast. TTLs are
+# short and per error class: captions can be enabled and videos restored.
+unavailable_videos = NegativeCache(
+    ttls={
+        "TranscriptsDisabled": float(
+            os.environ.get("NEGATIVE_CACHE_TTL_TRANSCRIPTS_DISABLED", "3600")
+        ),
+        "NoTranscriptFound": float(
+            os.environ.get("NEGATIVE_CACHE_TTL_NO_TRANSCRIPT_FOUND", "1800")
+        ),
+        "VideoUnavailable": float(
+            os.environ.get("NEGATIVE_CACHE_TTL_VIDEO_UNAVAILABLE", "900")
+        ),
+    },
+    default_ttl_seconds=600,
+)
+# Failures that concern one transcript language; the others concern the whole
+# video and are remembered for every language
+LANGUAGE_ERRORS = ("NoTranscriptFound",)
+
+
+def _record_unavailable(video_id: str, language: str, error_class: str, message: str):
+    """Remember a transcript failure under the video or the video and language."""
+    key = f"{video_id}:{language}" if error_class in LANGUAGE_ERRORS else video_id
+    unavailable_videos.record(key, error_class, message)
+
+
+def _known_failure(video_id: str, language: str) -> Optional[Dict[str, str]]:
+    """Return a remembered failure of the video, or of its transcript in a language."""
+    return unavailable_videos.get(video_id) or unavailable_videos.get(
+        f"{video_id}:{language}"
+    )
+
 try:
     from youtube_transcript_api import YouTubeTranscriptApi
     from youtube_transcript_api._errors import (
@@ -42,27 +106,23 @@ def extract_video_id(youtube_url: str) -> Optional[str]:
     if not youtube_url:
         return None
 
-    # Common YouTube URL patterns
-    patterns = [
-        r"(?:v=|\/)([0-9A-Za-z_-]{11}).*",  # Standard and shortened URLs
-        r"(?:embed\/)([0-9A-Za-z_-]{11})",  # Embedded videos
-        r"(?:watch\?v=)([0-9A-Za-z_-]{11})",  # Standard watch URLs
-        r"(?:youtu\.be\/)([0-9A-Za-z_-]{11})",  # Short URLs
-    ]
+    video_id = youtube_video_id(youtube_url)
+    if video_id is None:
+        logger.warning(f"Could not extract video ID from URL: {youtube_url}")
+    return video_id
 
-    for pattern in patterns:
-        match = re.search(pattern, youtube_url)
-        if match:
-            return match.group(1)
 
-    logger.warning(f"Could not extract video ID from URL: {youtube_url}")
-    return None
+def _oembed_url(video_id: str) -> str:
+    return f"https://www.youtube.com/oembed?url=https://www.youtube.com/watch?v={video_id}&format=json"
 
 
 def get_video_info(video_id: str) -> Dict[str, Any]:
     """
     Fetch basic information about a YouTube video.
 
+    Uses the shared pooled HTTP session and serves repeat lookups from a
+    short-lived in-memory cache.
+
     Args:
         video_id: The YouTube video ID
 
@@ -75,16 +135,21 @@ def get_video_info(video_id: str) -> Dict[str, Any]:
         logger.warning("Cannot get video info: No video ID provided")
         return default_info
 
+    cached = _video_info_cache.get(video_id)
+    if cached is not None:
+        return cached
+
     try:
         # Use the oEmbed API to get basic video information
-        oembed_url = f"https://www.youtube.com/oembed?url=https://www.youtube.com/watch?v={video_id}&format=json"
+        oembed_url = _oembed_url(video_id)
         logger.debug(f"Fetching video info from: {oembed_url}")
 
-        response = requests.get(oembed_url, timeout=10)
+        response = http_client.get(oembed_url)
 
         if response.status_code == 200:
             data = response.json()
             logger.debug(f"Successfully retrieved video info for {video_id}")
+            _video_info_cache.set(video_id, data)
             return data
         else:
             logger.warning(
@@ -96,12 +161,55 @@ def get_video_info(video_id: str) -> Dict[str, Any]:
         return default_info
 
 
-def get_transcript(youtube_url: str) -> Optional[str]:
+async def aget_video_info(video_id: str) -> Dict[str, Any]:
+    """
+    Fetch basic information about a YouTube video without blocking the event loop.
+
+    Args:
+        video_id: The YouTube video ID
+
+    Returns:
+        Dictionary containing video information
+    """
+    default_info = {"title": "Unknown YouTube Video", "author_name": "Unknown"}
+
+    if not video_id:
+        logger.warning("Cannot get video info: No video ID provided")
+        return default_info
+
+    cached = _video_info_cache.get(video_id)
+    if cached is not None:
+        return cached
+
+    try:
+        response = await http_client.aget(_oembed_url(video_id))
+
+        if response.status_code == 200:
+            data = response.json()
+            _video_info_cache.set(video_id, data)
+            return data
+        else:
+            logger.warning(
+                f"Failed to get video info for {video_id}. Status code: {response.status_code}"
+            )
+            return default_info
+    except Exception as e:
+        logger.exception(f"Error fetching video info: {str(e)}")
+        return default_info
+
+
+def get_transcript(
+    youtube_url: str,
+    video_info: Optional[Dict[str, Any]] = None,
+    language: str = TRANSCRIPT_LANGUAGE,
+) -> Optional[str]:
     """
     Get the transcript for a YouTube video.
 
     Args:
         youtube_url: The URL of the YouTube video
+        video_info: Already-fetched video info, to avoid a second lookup
+        language: Transcript language code
 
     Returns:
         The video transcript as a string, or None if no transcript is available
@@ -111,27 +219,44 @@ def get_transcript(youtube_url: str) -> Optional[str]:
         logger.error(f"Could not extract video ID from URL: {youtube_url}")
         return None
 
+    known_failure = _known_failure(video_id, language)
+    if known_failure is not None:
+        logger.info(
+            f"Skipping transcript fetch for {video_id}: recently failed with {known_failure['error_class']}"
+        )
+        return None
+
     # Try to get transcript using youtube_transcript_api if available
     if YOUTUBE_TRANSCRIPT_API_AVAILABLE:
         try:
             logger.debug(f"Attempting to get transcript for video {video_id}")
-            transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
+            transcript_list = get_transcript_fragments(video_id, language)
 
             if not transcript_list:
                 logger.warning(f"Empty transcript list returned for video {video_id}")
                 return None
 
             # Combine all transcript pieces into a single string
-            transcript_text = " ".join(
-                [item.get("text", "") for item in transcript_list if item.get("text")]
-            )
+            if TRANSCRIPT_NORMALIZE:
+                normalized = transcript_normalizer.normalize(transcript_list)
+                transcript_text = normalized["text"]
+                stats = normalized["stats"]
+                logger.info(
+                    f"Normalized transcript for {video_id}: ~{stats['tokens_in']} -> "
+                    f"~{stats['tokens_out']} tokens ({stats['tokens_saved']} saved)"
+                )
+            else:
+                transcript_text = " ".join(
+                    item.get("text", "") for item in transcript_list if item.get("text")
+                )
 
             if not transcript_text.strip():
                 logger.warning(f"Empty transcript text for video {video_id}")
                 return None
 
             # Get video info for context
-            video_info = get_video_info(video_id)
+            if video_info is None:
+                video_info = get_video_info(video_id)
 
             # Create a formatted transcript with video title and content
             formatted_transcript = f"Title: {video_info.get('title', 'Unknown')}\n"
@@ -145,10 +270,15 @@ def get_transcript(youtube_url: str) -> Optional[str]:
             )
             return formatted_transcript
 
-        except (TranscriptsDisabled, NoTranscriptFound) as e:
+        except TranscriptsDisabled as e:
+            logger.warning(f"No transcript available for video {video_id}: {str(e)}")
+            _record_unavailable(video_id, language, "TranscriptsDisabled", str(e))
+        except NoTranscriptFound as e:
             logger.warning(f"No transcript available for video {video_id}: {str(e)}")
-        except VideoUnavailable:
+            _record_unavailable(video_id, language, "NoTranscriptFound", str(e))
+        except VideoUnavailable as e:
             logger.warning(f"Video {video_id} is unavailable")
+            _record_unavailable(video_id, language, "VideoUnavailable", str(e))
         except Exception as e:
             logger.exception(f"Error fetching transcript for {video_id}: {str(e)}")
 
@@ -156,6 +286,102 @@ def get_transcript(youtube_url: str) -> Optional[str]:
     return None
 
 
+def get_known_unavailable(
+    youtube_url: str, language: str = TRANSCRIPT_LANGUAGE
+) -> Optional[Dict[str, str]]:
+    """
+    Check whether a video recently failed with a transcript access error.
+
+    Args:
+        youtube_url: The URL of the YouTube video
+        language: Transcript language code
+
+    Returns:
+        Dict with error_class and message if the video is known to be
+        unavailable, otherwise None
+    """
+    video_id = extract_video_id(youtube_url)
+    if not video_id:
+        return None
+    return _known_failure(video_id, language)
+
+
+def _fetch_transcript_fragments(
+    video_id: str, language: str = TRANSCRIPT_LANGUAGE
+) -> List[Dict[str, Any]]:
+    """Download the caption fragments for a video from YouTube."""
+    # The transcript API sets its own headers (Accept-Language) on the session
+    # it is given, so it gets a session of its own on the shared pool
+    return (
+        YouTubeTranscriptApi(http_client=http_client.get_session("youtube_transcript"))
+        .fetch(video_id, languages=[language])
+        .to_raw_data()
+    )
+
+
+def get_transcript_fragments(
+    video_id: str, language: str = TRANSCRIPT_LANGUAGE
+) -> List[Dict[str, Any]]:
+    """
+    Get the caption fragments for a video, from the transcript store if possible.
+
+    Args:
+        video_id: The YouTube video ID
+        language: Transcript language code
+
+    Returns:
+        List of fragments with text, start and duration
+
+    Raises:
+        The transcript API's errors when the transcript cannot be fetched
+    """
+    fragments = transcript_store.get(video_id, language)
+    if fragments is not None:
+        logger.debug(f"Transcript store hit for video {video_id}")
+        return fragments
+
+    fragments = _fetch_transcript_fragments(video_id, language)
+    if fragments:
+        try:
+            transcript_store.put(video_id, fragments, language)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to store transcript for {video_id}: {e}")
+    return fragments
+
+
+def prefetch_transcripts(
+    youtube_urls: List[str], language: str = TRANSCRIPT_LANGUAGE, max_workers: int = 4
+) -> Dict[str, bool]:
+    """
+    Fetch and store transcripts for many videos ahead of time.
+
+    Args:
+        youtube_urls: YouTube URLs or bare video IDs
+        language: Transcript language code
+        max_workers: Number of concurrent downloads
+
+    Returns:
+        Mapping of video ID to whether its transcript is now stored
+    """
+    if not YOUTUBE_TRANSCRIPT_API_AVAILABLE:
+        logger.warning("Cannot prefetch transcripts: youtube_transcript_api missing")
+        return {}
+
+    video_ids = []
+    for url in youtube_urls:
+        video_id = url if is_valid_video_id(url) else extract_video_id(url)
+        if video_id is None:
+            logger.warning(f"Skipping prefetch of {url!r}: no video ID")
+            continue
+        video_ids.append(video_id)
+    return transcript_store.prefetch(
+        video_ids,
+        lambda video_id: _fetch_transcript_fragments(video_id, language),
+        language=language,
+        max_workers=max_workers,
+    )
+
+
 def validate_youtube_content(content: Optional[str]) -> Tuple[bool, str]:
     """
     Validate YouTube content to ensure it's usable.
@@ -206,10 +432,40 @@ def process_youtube_content(youtube_url: str) -> Dict[str, Any]:
     video_info = get_video_info(video_id)
     logger.debug(f"Video info retrieved: {video_info.get('title', 'Unknown')}")
 
-    # Get transcript
-    transcript = get_transcript(youtube_url)
+    # Get transcript, reusing the video info fetched above
+    transcript = get_transcript(youtube_url, video_info)
+    return _youtube_content_result(video_info, transcript)
+
+
+async def aprocess_youtube_content(youtube_url: str) -> Dict[str, Any]:
+    """
+    Process YouTube content without blocking the event loop.
+
+    The video info comes from the async HTTP client; the transcript API is
+    synchronous, so it runs in a worker thread.
+
+    Args:
+        youtube_url: The URL of the YouTube video
+
+    Returns:
+        Dictionary with video info and transcript
+    """
+    logger.info(f"Processing YouTube content from: {youtube_url}")
+
+    video_id = extract_video_id(youtube_url)
+    if not video_id:
+        logger.error(f"Invalid YouTube URL: {youtube_url}")
+        return {"error": True, "message": "Invalid YouTube URL", "content": None}
+
+    video_info = await aget_video_info(video_id)
+    transcript = await asyncio.to_thread(get_transcript, youtube_url, video_info)
+    return _youtube_content_result(video_info, transcript)
+
 
-    # Validate transcript
+def _youtube_content_result(
+    video_info: Dict[str, Any], transcript: Optional[str]
+) -> Dict[str, Any]:
+    """Validate a fetched transcript and build the processing result."""
     is_valid, error_message = validate_youtube_content(transcript)
     if not is_valid:
         logger.error(f"Invalid transcript: {error_message}")
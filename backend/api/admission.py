@@ -0,0 +1,250 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional
+
+from fastapi import HTTPException, Request
+
+from .rate_limiter import rate_limiter
+
+
+class AdmissionController:
+    """
+    Admission control for expensive endpoints.
+
+    Limits the number of requests doing work at once and holds the rest in a
+    bounded FIFO queue. Requests are shed with a fast 503 when the queue is
+    full, when they wait longer than max_wait_seconds, or when queueing delay
+    has stayed above target_delay_seconds for a whole interval (CoDel-style),
+    which signals a standing queue that will not drain on its own.
+
+    All state is touched from the event loop only, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 16,
+        max_queue: int = 64,
+        target_delay_seconds: float = 1.0,
+        interval_seconds: float = 5.0,
+        max_wait_seconds: float = 30.0,
+    ):
+        """
+        Initialize the admission controller.
+
+        Args:
+            max_in_flight: Maximum number of requests doing work at once
+            max_queue: Maximum number of requests waiting for a slot
+            target_delay_seconds: Acceptable standing queueing delay
+            interval_seconds: How long the delay may exceed the target before shedding
+            max_wait_seconds: Hard cap on how long a request may wait
+        """
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.target_delay_seconds = target_delay_seconds
+        self.interval_seconds = interval_seconds
+        self.max_wait_seconds = max_wait_seconds
+
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        # CoDel state: when the queueing delay first exceeded the target
+        self._above_target_since: Optional[float] = None
+        self.dropping = False
+
+        # Gauges and counters
+        self.admitted = 0
+        self.shed: Dict[str, int] = {
+            "queue_full": 0,
+            "queue_timeout": 0,
+            "codel": 0,
+            "client_disconnected": 0,
+        }
+        self.last_wait_seconds = 0.0
+        self.wait_seconds_ewma = 0.0
+        self.wait_seconds_max = 0.0
+        self.service_seconds_ewma = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _retry_after(self) -> int:
+        """Estimate how many seconds until a slot is likely to be free."""
+        service = self.service_seconds_ewma or 1.0
+        backlog = (self.queue_depth + 1) / max(1, self.max_in_flight)
+        return max(1, math.ceil(service * backlog))
+
+    def _reject(self, reason: str):
+        """Count a shed request and raise a 503 with Retry-After."""
+        self.shed[reason] += 1
+        retry_after = self._retry_after()
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "Server overloaded",
+                "message": "The server is handling too many requests. Please retry shortly.",
+                "reason": reason,
+            },
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    def _record_wait(self, wait_seconds: float):
+        self.last_wait_seconds = wait_seconds
+        self.wait_seconds_ewma = 0.8 * self.wait_seconds_ewma + 0.2 * wait_seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+
+    def _should_drop(self, wait_seconds: float, now: float) -> bool:
+        """
+        CoDel drop decision for a request leaving the queue.
+
+        Shed only once the queueing delay has stayed above target for a full
+        interval; short bursts that drain quickly are never shed.
+        """
+        if wait_seconds < self.target_delay_seconds:
+            self._above_target_since = None
+            self.dropping = False
+            return False
+
+        if self._above_target_since is None:
+            self._above_target_since = now
+            return False
+
+        if now - self._above_target_since >= self.interval_seconds:
+            self.dropping = True
+
+        return self.dropping
+
+    async def acquire(self):
+        """
+        Wait for a work slot.
+
+        Raises:
+            HTTPException: 503 if the request is shed
+        """
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            self._record_wait(0.0)
+            self._should_drop(0.0, time.monotonic())
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self._reject("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        enqueued_at = time.monotonic()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            self._reject("queue_timeout")
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+
+        # The releasing request handed its slot to us
+        now = time.monotonic()
+        wait_seconds = now - enqueued_at
+        self._record_wait(wait_seconds)
+
+        if self._should_drop(wait_seconds, now):
+            self.release()
+            self._reject("codel")
+
+        self.admitted += 1
+
+    def _abandon(self, waiter: asyncio.Future):
+        """Stop waiting; pass the slot on if it was granted concurrently."""
+        if waiter.done() and not waiter.cancelled():
+            self.release()
+            return
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self):
+        """Hand the slot to the next waiter, or free it."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, request: Optional[Request] = None):
+        """
+        Hold a work slot for the duration of the block.
+
+        If a request is given, work is skipped when the client has already
+        disconnected while queued.
+        """
+        await self.acquire()
+        started_at = time.monotonic()
+        try:
+            if request is not None and await request.is_disconnected():
+                self._reject("client_disconnected")
+            yield
+        finally:
+            elapsed = time.monotonic() - started_at
+            self.service_seconds_ewma = (
+                0.8 * self.service_seconds_ewma + 0.2 * elapsed
+                if self.service_seconds_ewma
+                else elapsed
+            )
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue gauges and shedding counters."""
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "dropping": self.dropping,
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "wait_seconds_last": round(self.last_wait_seconds, 4),
+            "wait_seconds_ewma": round(self.wait_seconds_ewma, 4),
+            "wait_seconds_max": round(self.wait_seconds_max, 4),
+            "service_seconds_ewma": round(self.service_seconds_ewma, 4),
+        }
+
+
+# Global admission controller instance
+admission_controller = AdmissionController(
+    max_in_flight=int(os.environ.get("ADMISSION_MAX_IN_FLIGHT", "16")),
+    max_queue=int(os.environ.get("ADMISSION_MAX_QUEUE", "64")),
+    target_delay_seconds=float(os.environ.get("ADMISSION_TARGET_DELAY", "1.0")),
+    interval_seconds=float(os.environ.get("ADMISSION_INTERVAL", "5.0")),
+    max_wait_seconds=float(os.environ.get("ADMISSION_MAX_WAIT", "30.0")),
+)
+
+
+async def admit_request(request: Request):
+    """
+    Dependency that holds an admission slot while the endpoint runs.
+
+    Runs after check_rate_limit, so rate-limited clients never take a queue
+    slot. A shed request did no work, so its up-front charge is refunded.
+
+    Raises:
+        HTTPException: 503 with Retry-After if the request is shed
+    """
+    admitted = False
+    try:
+        async with admission_controller.slot(request):
+            admitted = True
+            yield
+    except HTTPException:
+        if not admitted:
+            await rate_limiter.asettle(request, [])
+        raise
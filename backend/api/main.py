@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, HttpUrl
@@ -9,6 +10,7 @@ from pathlib import Path
 # Add the parent directory to sys.path to import the agents module
 sys.path.append(str(Path(__file__).parent.parent))
 from agents.agent import IntrospectAgent
+from agents import http_client
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -17,6 +19,12 @@ app = FastAPI(
     version="0.1.0",
 )
 
+# Oversized uploads are rejected while they arrive, before multipart parsing.
+# Added before CORS, so its 413 responses still carry the CORS headers.
+from .uploads import UploadSizeLimitMiddleware, upload_ingestor
+
+app.add_middleware(UploadSizeLimitMiddleware, ingestor=upload_ingestor)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -34,26 +42,19 @@ introspect_agent = IntrospectAgent()
 @app.middleware("http")
 async def add_rate_limit_headers(request: Request, call_next):
     """
-    Middleware to add rate limit headers to all responses.
+    Middleware to add rate limit headers to rate limited responses.
+
+    Headers are rendered from the snapshot check_rate_limit stored on the
+    request; routes without a rate limit are passed through untouched.
     """
     # Import here to avoid circular imports
-    from .rate_limiter import rate_limiter
+    from .rate_limiter import rate_limit_headers
 
     response = await call_next(request)
 
-    # Add rate limit headers to response
-    try:
-        remaining = rate_limiter.get_remaining_requests(request)
-        reset_time = rate_limiter.get_reset_time(request)
-
-        response.headers["X-RateLimit-Limit"] = str(rate_limiter.max_requests)
-        response.headers["X-RateLimit-Remaining"] = str(remaining)
-
-        if reset_time:
-            response.headers["X-RateLimit-Reset"] = str(int(reset_time.timestamp()))
-    except Exception:
-        # If there's any error getting rate limit info, don't fail the request
-        pass
+    result = getattr(request.state, "rate_limit", None)
+    if result is not None:
+        response.headers.update(rate_limit_headers(result))
 
     return response
 
@@ -90,6 +91,27 @@ async def root():
     return {"message": "Welcome to Introspect AI API"}
 
 
+@app.on_event("shutdown")
+async def close_http_clients():
+    """Close pooled HTTP connections on shutdown."""
+    await http_client.aclose()
+
+
+@app.on_event("shutdown")
+async def flush_artifacts():
+    """Write out queued artifacts on shutdown."""
+    if introspect_agent.artifacts is not None:
+        await asyncio.to_thread(introspect_agent.artifacts.close)
+
+
+@app.on_event("shutdown")
+async def stop_upload_workers():
+    """Stop the upload extraction threads and PDF worker processes."""
+    from .uploads import upload_ingestor
+
+    upload_ingestor.close()
+
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
@@ -0,0 +1,565 @@
+"""
+Storage backends for the rate limiter.
+
+Each store keeps one theoretical arrival time (TAT, epoch seconds) per
+client and applies the GCRA check-and-increment atomically. The memory
+store is per process. The SQLite store shares state between workers on
+one host. The network store shares it between hosts through any key-value
+service that supports compare-and-set.
+
+Stores that wait on disk locks or the network set blocking = True, so
+callers on an event loop know to run them in a thread.
+"""
+
+import heapq
+import importlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class RateLimitStore:
+    """
+    Interface for rate limiter state.
+
+    Times are in seconds. A client that is not stored, or whose TAT has
+    passed, has its full quota available.
+    """
+
+    name = "base"
+    # Whether calls may wait on locks held by other processes or on the network
+    blocking = False
+
+    @staticmethod
+    def _gcra(
+        stored_tat: Optional[float], now: float, increment: float, limit: float
+    ) -> Tuple[bool, float]:
+        """
+        Apply one GCRA step.
+
+        Returns:
+            Tuple of (allowed, tat) where tat is the value to keep for the client
+        """
+        tat = max(stored_tat if stored_tat is not None else now, now)
+        new_tat = tat + increment
+        if new_tat - now > limit:
+            return False, tat
+        return True, new_tat
+
+    def consume(
+        self, client_id: str, now: float, increment: float, limit: float
+    ) -> Tuple[bool, float]:
+        """
+        Atomically charge a client if the charge fits within the limit.
+
+        Args:
+            client_id: Client identifier
+            now: Current time
+            increment: Seconds to add to the client's TAT
+            limit: Maximum distance of the TAT from now
+
+        Returns:
+            Tuple of (allowed, tat) with the client's TAT after the call
+        """
+        raise NotImplementedError
+
+    def refund(self, client_id: str, now: float, decrement: float) -> float:
+        """
+        Atomically move a client's TAT back, but never before now.
+
+        Returns:
+            The client's TAT after the call
+        """
+        raise NotImplementedError
+
+    def get(self, client_id: str, now: float) -> float:
+        """Return a client's TAT, or now if it has its full quota."""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        """Return store gauges and counters."""
+        return {"backend": self.name}
+
+
+class _Stripe:
+    """
+    One shard of the in-memory state, guarded by its own lock.
+
+    A min-heap of (tat, client_id) lets idle clients be dropped without
+    scanning every record.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tats: Dict[str, float] = {}
+        self.expiry_heap: List[Tuple[float, str]] = []
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """
+    Per-process store.
+
+    State is split into lock stripes by client-id hash, so concurrent
+    requests from different clients rarely contend. Expiry is driven by a
+    per-stripe min-heap of TATs, which keeps each check O(log n) amortized.
+
+    Memory is bounded: at most max_clients are tracked. When a stripe is
+    full after idle clients are dropped, the client with the earliest TAT
+    is evicted. That client has the most quota left anyway, so eviction
+    forgives as little usage as possible.
+    """
+
+    name = "memory"
+
+    def __init__(self, stripes: int = 16, max_clients: int = 100_000):
+        """
+        Initialize the store.
+
+        Args:
+            stripes: Number of independently locked shards of client state
+            max_clients: Hard cap on the number of tracked clients
+        """
+        self.stripes = [_Stripe() for _ in range(max(1, stripes))]
+        self.max_clients_per_stripe = max(
+            1, math.ceil(max_clients / len(self.stripes))
+        )
+        self.evictions = 0
+
+    def _stripe_for(self, client_id: str) -> _Stripe:
+        """Return the stripe that owns a client's state."""
+        return self.stripes[hash(client_id) % len(self.stripes)]
+
+    def _cleanup_expired_entries(self, stripe: _Stripe, now: float):
+        """
+        Remove idle clients from a stripe. Caller must hold the stripe lock.
+
+        A client whose TAT has passed has its full quota back, which is the
+        same as not being tracked. Heap entries left behind by later TAT
+        changes no longer match the record and are simply discarded.
+        """
+        heap = stripe.expiry_heap
+        while heap and heap[0][0] <= now:
+            tat, client_id = heapq.heappop(heap)
+            if stripe.tats.get(client_id) == tat:
+                del stripe.tats[client_id]
+
+    def _evict_oldest(self, stripe: _Stripe):
+        """Evict the client with the earliest TAT. Caller must hold the lock."""
+        heap = stripe.expiry_heap
+        while heap:
+            tat, client_id = heapq.heappop(heap)
+            if stripe.tats.get(client_id) == tat:
+                del stripe.tats[client_id]
+                self.evictions += 1
+                return
+
+    def _set_tat(self, stripe: _Stripe, client_id: str, tat: float):
+        """Store a client's TAT, enforcing the cap. Caller must hold the lock."""
+        if (
+            client_id not in stripe.tats
+            and len(stripe.tats) >= self.max_clients_per_stripe
+        ):
+            self._evict_oldest(stripe)
+
+        stripe.tats[client_id] = tat
+        heapq.heappush(stripe.expiry_heap, (tat, client_id))
+
+    def consume(
+        self, client_id: str, now: float, increment: float, limit: float
+    ) -> Tuple[bool, float]:
+        stripe = self._stripe_for(client_id)
+        with stripe.lock:
+            self._cleanup_expired_entries(stripe, now)
+            allowed, tat = self._gcra(
+                stripe.tats.get(client_id), now, increment, limit
+            )
+            if allowed:
+                self._set_tat(stripe, client_id, tat)
+            return allowed, tat
+
+    def refund(self, client_id: str, now: float, decrement: float) -> float:
+        stripe = self._stripe_for(client_id)
+        with stripe.lock:
+            tat = stripe.tats.get(client_id, now)
+            if decrement > 0 and tat > now:
+                tat = max(now, tat - decrement)
+                self._set_tat(stripe, client_id, tat)
+            return max(tat, now)
+
+    def get(self, client_id: str, now: float) -> float:
+        stripe = self._stripe_for(client_id)
+        with stripe.lock:
+            return max(stripe.tats.get(client_id, now), now)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "clients": sum(len(stripe.tats) for stripe in self.stripes),
+            "max_clients": self.max_clients_per_stripe * len(self.stripes),
+            "evictions": self.evictions,
+        }
+
+
+class SQLiteRateLimitStore(RateLimitStore):
+    """
+    Store shared by all worker processes on one host.
+
+    Uses a SQLite database in WAL mode, so readers never block the writer
+    and each check is a short BEGIN IMMEDIATE transaction. Each thread keeps
+    its own connection. Idle clients are purged periodically, and the
+    clients with the earliest TATs are dropped when over max_clients.
+    """
+
+    name = "sqlite"
+    blocking = True
+
+    def __init__(
+        self,
+        path: Path,
+        max_clients: int = 100_000,
+        busy_timeout_ms: int = 1000,
+        purge_every: int = 1000,
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            path: Database file shared by the workers
+            max_clients: Cap on the number of stored clients
+            busy_timeout_ms: How long to wait for another worker's write lock
+            purge_every: Number of writes between purges of idle clients
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_clients = max_clients
+        self.busy_timeout_ms = busy_timeout_ms
+        self.purge_every = purge_every
+        self._local = threading.local()
+        self._writes = 0
+        self.purged = 0
+
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            "client_id TEXT PRIMARY KEY, tat REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS rate_limits_tat ON rate_limits (tat)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; transactions are opened explicitly
+            conn = sqlite3.connect(
+                str(self.path),
+                timeout=self.busy_timeout_ms / 1000,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+        return conn
+
+    def _read_tat(self, conn: sqlite3.Connection, client_id: str) -> Optional[float]:
+        row = conn.execute(
+            "SELECT tat FROM rate_limits WHERE client_id = ?", (client_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _write_tat(self, conn: sqlite3.Connection, client_id: str, tat: float):
+        conn.execute(
+            "INSERT INTO rate_limits (client_id, tat) VALUES (?, ?) "
+            "ON CONFLICT (client_id) DO UPDATE SET tat = excluded.tat",
+            (client_id, tat),
+        )
+        self._writes += 1
+
+    def _purge(self, conn: sqlite3.Connection, now: float):
+        """Drop idle clients, then the earliest TATs if over the cap."""
+        deleted = conn.execute(
+            "DELETE FROM rate_limits WHERE tat <= ?", (now,)
+        ).rowcount
+        excess = (
+            conn.execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+            - self.max_clients
+        )
+        if excess > 0:
+            deleted += conn.execute(
+                "DELETE FROM rate_limits WHERE client_id IN ("
+                "SELECT client_id FROM rate_limits ORDER BY tat LIMIT ?)",
+                (excess,),
+            ).rowcount
+        self.purged += max(0, deleted)
+
+    def consume(
+        self, client_id: str, now: float, increment: float, limit: float
+    ) -> Tuple[bool, float]:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            allowed, tat = self._gcra(
+                self._read_tat(conn, client_id), now, increment, limit
+            )
+            if allowed:
+                self._write_tat(conn, client_id, tat)
+                if self._writes % self.purge_every == 0:
+                    self._purge(conn, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, tat
+
+    def refund(self, client_id: str, now: float, decrement: float) -> float:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tat = self._read_tat(conn, client_id)
+            if tat is None:
+                tat = now
+            elif decrement > 0 and tat > now:
+                tat = max(now, tat - decrement)
+                self._write_tat(conn, client_id, tat)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return max(tat, now)
+
+    def get(self, client_id: str, now: float) -> float:
+        tat = self._read_tat(self._connection(), client_id)
+        return max(tat if tat is not None else now, now)
+
+    def stats(self) -> Dict[str, Any]:
+        clients = (
+            self._connection()
+            .execute("SELECT COUNT(*) FROM rate_limits")
+            .fetchone()[0]
+        )
+        return {
+            "backend": self.name,
+            "path": str(self.path),
+            "clients": clients,
+            "max_clients": self.max_clients,
+            "purged": self.purged,
+        }
+
+
+class KVClient:
+    """
+    Minimal interface a network key-value service must provide.
+
+    Values carry a version that changes on every write, which is all a
+    compare-and-set needs. Redis (WATCH/MULTI or a Lua script), etcd and
+    memcached (gets/cas) can all implement it.
+    """
+
+    def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        """Return (value, version) for a key, or None if it does not exist."""
+        raise NotImplementedError
+
+    def compare_and_set(
+        self, key: str, expected_version: Any, value: float, ttl_seconds: float
+    ) -> bool:
+        """
+        Write a value only if the key is still at expected_version.
+
+        expected_version None means the key must not exist. The key expires
+        after ttl_seconds.
+
+        Returns:
+            True if the write happened
+        """
+        raise NotImplementedError
+
+
+class LocalKVClient(KVClient):
+    """
+    In-process stand-in for a network key-value service.
+
+    Implements the same compare-and-set semantics, so the network store can
+    be exercised without running a server. It shares nothing between
+    processes, so it is never picked by default.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> (value, version, expires_at)
+        self._data: Dict[str, Tuple[float, int, float]] = {}
+        self._version = 0
+
+    def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, version, expires_at = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+            return value, version
+
+    def compare_and_set(
+        self, key: str, expected_version: Any, value: float, ttl_seconds: float
+    ) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[2] <= time.time():
+                entry = None
+            current_version = entry[1] if entry is not None else None
+            if current_version != expected_version:
+                return False
+            self._version += 1
+            self._data[key] = (value, self._version, time.time() + ttl_seconds)
+            return True
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class NetworkRateLimitStore(RateLimitStore):
+    """
+    Store shared by every node through a key-value service.
+
+    Each update is an optimistic read followed by compare-and-set, retried
+    when another node wrote in between. Keys expire once the client's TAT
+    has passed, so the service holds only clients with quota in use.
+    """
+
+    name = "network"
+    blocking = True
+
+    def __init__(
+        self, client: KVClient, key_prefix: str = "ratelimit:", max_retries: int = 8
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            client: Key-value service client
+            key_prefix: Prefix for the keys this store writes
+            max_retries: Compare-and-set attempts before giving up
+        """
+        self.client = client
+        self.key_prefix = key_prefix
+        self.max_retries = max_retries
+        self.conflicts = 0
+
+    def _update(self, client_id: str, now: float, step) -> Tuple[bool, float]:
+        """
+        Apply step(stored_tat) -> (write, result, tat) with compare-and-set.
+
+        Raises:
+            RuntimeError: if contention persists past max_retries
+        """
+        key = self.key_prefix + client_id
+        for _ in range(self.max_retries):
+            entry = self.client.get(key)
+            stored, version = entry if entry is not None else (None, None)
+            write, result, tat = step(stored)
+            if not write:
+                return result, tat
+            if self.client.compare_and_set(key, version, tat, max(1.0, tat - now)):
+                return result, tat
+            self.conflicts += 1
+        raise RuntimeError(f"Rate limit update for {client_id} kept conflicting")
+
+    def consume(
+        self, client_id: str, now: float, increment: float, limit: float
+    ) -> Tuple[bool, float]:
+        def step(stored):
+            allowed, tat = self._gcra(stored, now, increment, limit)
+            return allowed, allowed, tat
+
+        return self._update(client_id, now, step)
+
+    def refund(self, client_id: str, now: float, decrement: float) -> float:
+        def step(stored):
+            if stored is None or decrement <= 0 or stored <= now:
+                return False, None, max(stored or now, now)
+            return True, None, max(now, stored - decrement)
+
+        return self._update(client_id, now, step)[1]
+
+    def get(self, client_id: str, now: float) -> float:
+        entry = self.client.get(self.key_prefix + client_id)
+        return max(entry[0] if entry is not None else now, now)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "conflicts": self.conflicts}
+
+
+def load_kv_client(spec: str) -> KVClient:
+    """
+    Build a key-value client from a "module:factory" specification.
+
+    Args:
+        spec: Import path of a callable returning a KVClient
+
+    Returns:
+        KVClient: The client returned by the factory
+
+    Raises:
+        ValueError: If the specification is malformed or the factory is missing
+    """
+    module_name, _, attribute = spec.partition(":")
+    if not module_name or not attribute:
+        raise ValueError(f"Expected 'module:factory', got: {spec!r}")
+    try:
+        factory = getattr(importlib.import_module(module_name), attribute)
+    except (ImportError, AttributeError) as e:
+        raise ValueError(f"Cannot load KV client factory {spec!r}: {e}") from e
+    return factory()
+
+
+def create_store(
+    backend: str, max_clients: int = 100_000, kv_client: Optional[KVClient] = None
+) -> RateLimitStore:
+    """
+    Create the store selected by name.
+
+    Args:
+        backend: "memory", "sqlite" or "network"
+        max_clients: Cap on the number of tracked clients
+        kv_client: Key-value client for the network store. Defaults to the
+            factory named by RATE_LIMIT_KV_CLIENT ("module:factory").
+
+    Returns:
+        RateLimitStore: The configured store
+
+    Raises:
+        ValueError: If the backend name is unknown, or the network store has
+            no key-value client
+    """
+    if backend == "memory":
+        return MemoryRateLimitStore(max_clients=max_clients)
+
+    if backend == "sqlite":
+        from agents.cache import storage_dir
+
+        path = os.environ.get(
+            "RATE_LIMIT_SQLITE_PATH", str(storage_dir.joinpath("rate_limits.sqlite3"))
+        )
+        return SQLiteRateLimitStore(Path(path), max_clients=max_clients)
+
+    if backend == "network":
+        if kv_client is None:
+            spec = os.environ.get("RATE_LIMIT_KV_CLIENT", "")
+            if not spec:
+                # A per-process stand-in would silently stop sharing state
+                raise ValueError(
+                    "The network rate limit backend needs a KV client: pass "
+                    "kv_client or set RATE_LIMIT_KV_CLIENT=module:factory"
+                )
+            kv_client = load_kv_client(spec)
+        return NetworkRateLimitStore(kv_client)
+
+    raise ValueError(f"Unknown rate limit backend: {backend}")
@@ -1,109 +1,292 @@
-from typing import Dict, Optional
-from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
 from fastapi import HTTPException, Request
-import threading
+import asyncio
+import ipaddress
+import math
+import os
+import time
 
+from .rate_limit_store import MemoryRateLimitStore, RateLimitStore, create_store
 
-class RateLimiter:
+# Proxies whose X-Forwarded-For / X-Real-IP headers are believed. Defaults to
+# loopback and private ranges, where our reverse proxy and containers live.
+DEFAULT_TRUSTED_PROXIES = "127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16"
+
+
+# Units charged up front per route. /api/process runs both LLM hops.
+DEFAULT_ROUTE_COSTS = "/api/extract=1,/api/personalize=1,/api/process=2"
+
+# Units actually spent per hop outcome, settled after the work is done
+DEFAULT_OUTCOME_COSTS = "full=1,cache_hit=0.25,coalesced=0.25,failed=0"
+
+
+def parse_costs(spec: str) -> Dict[str, float]:
+    """
+    Parse a "name=cost,name=cost" specification.
+
+    Args:
+        spec: Comma-separated name=cost pairs
+
+    Returns:
+        Dict[str, float]: Cost per name
     """
-    Basic in-memory rate limiter that tracks requests per IP address.
+    costs = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        name, cost = item.split("=", 1)
+        costs[name.strip()] = float(cost)
+    return costs
+
+
+class RateLimitResult:
+    """Outcome of a rate limit check for one client."""
+
+    __slots__ = ("allowed", "remaining", "reset_at", "retry_after")
+
+    def __init__(
+        self,
+        allowed: bool,
+        remaining: int,
+        reset_at: Optional[float],
+        retry_after: float,
+    ):
+        self.allowed = allowed
+        self.remaining = remaining
+        # Epoch seconds at which the full quota is available again
+        self.reset_at = reset_at
+        self.retry_after = retry_after
+
+    @property
+    def reset_time(self) -> Optional[datetime]:
+        return datetime.fromtimestamp(self.reset_at) if self.reset_at else None
+
 
-    For production use, consider using Redis or a database for persistence
-    and distributed rate limiting across multiple server instances.
+class RateLimiter:
+    """
+    Rate limiter that tracks weighted requests per client IP address.
+
+    Uses the generic cell rate algorithm (GCRA): a client's quota of
+    max_requests units per window replenishes continuously, one unit every
+    window / max_requests seconds, and the only state kept per client is its
+    theoretical arrival time (TAT). Requests are weighted: each route has an
+    up-front cost, and the charge is settled down after the work is done
+    when it was served from a cache or shared with an in-flight request.
+
+    State lives in a pluggable store (see rate_limit_store): per process in
+    memory, shared between workers through SQLite, or shared between nodes
+    through a key-value service with compare-and-set. Use the SQLite or
+    network store when running several workers or hosts.
+
+    Forwarding headers are only honoured when the direct peer is a trusted
+    proxy, so clients cannot mint unlimited identities by spoofing
+    X-Forwarded-For.
     """
 
-    def __init__(self, max_requests: int = 5, window_hours: int = 24):
+    def __init__(
+        self,
+        max_requests: int = 5,
+        window_hours: int = 24,
+        stripes: int = 16,
+        max_clients: int = 100_000,
+        store: Optional[RateLimitStore] = None,
+        trusted_proxies: Optional[List[str]] = None,
+        route_costs: Optional[Dict[str, float]] = None,
+        outcome_costs: Optional[Dict[str, float]] = None,
+    ):
         """
         Initialize rate limiter.
 
         Args:
             max_requests: Maximum number of requests allowed per window
             window_hours: Time window in hours for rate limiting
+            stripes: Number of independently locked shards of client state
+            max_clients: Hard cap on the number of tracked clients
+            store: State backend (defaults to a striped in-memory store)
+            trusted_proxies: IPs or CIDR ranges of proxies allowed to set
+                forwarding headers (defaults to loopback and private ranges)
+            route_costs: Units charged up front per route path
+            outcome_costs: Units actually spent per hop outcome
         """
         self.max_requests = max_requests
         self.window_hours = window_hours
-        self.requests: Dict[str, Dict] = {}
-        self.lock = threading.Lock()
+        self.window_seconds = int(window_hours * 3600)
+        # Seconds for one unit of quota to replenish
+        self.emission_interval = self.window_seconds / max_requests
+        self.store = (
+            store
+            if store is not None
+            else MemoryRateLimitStore(stripes=stripes, max_clients=max_clients)
+        )
+        self.trusted_proxies = [
+            ipaddress.ip_network(proxy.strip(), strict=False)
+            for proxy in (
+                trusted_proxies
+                if trusted_proxies is not None
+                else DEFAULT_TRUSTED_PROXIES.split(",")
+            )
+            if proxy.strip()
+        ]
+        self.route_costs = (
+            route_costs
+            if route_costs is not None
+            else parse_costs(DEFAULT_ROUTE_COSTS)
+        )
+        self.outcome_costs = (
+            outcome_costs
+            if outcome_costs is not None
+            else parse_costs(DEFAULT_OUTCOME_COSTS)
+        )
+        self.refunded_units = 0.0
+
+    def _is_trusted_proxy(self, address) -> bool:
+        return any(address in network for network in self.trusted_proxies)
+
+    @staticmethod
+    def _parse_ip(value: str):
+        try:
+            return ipaddress.ip_address(value.strip())
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _client_key(address) -> str:
+        """
+        Canonical client key for an address.
+
+        IPv6 clients usually control a whole /64, so they are grouped by it.
+        """
+        if address.version == 6:
+            return str(ipaddress.ip_network(f"{address}/64", strict=False))
+        return str(address)
 
     def _get_client_id(self, request: Request) -> str:
         """
         Get client identifier from request.
         Uses IP address as the identifier.
+
+        Forwarding headers are only used when the direct peer is a trusted
+        proxy. X-Forwarded-For is then read right to left, skipping trusted
+        hops, so the first untrusted address is the client.
         """
+        peer_host = request.client.host if request.client else None
+        peer = self._parse_ip(peer_host) if peer_host else None
+        if peer is None:
+            return peer_host or "unknown"
+
+        if not self._is_trusted_proxy(peer):
+            return self._client_key(peer)
+
         # Try to get real IP from headers (for reverse proxy setups)
         forwarded_for = request.headers.get("X-Forwarded-For")
         if forwarded_for:
-            # Take the first IP in case of multiple proxies
-            return forwarded_for.split(",")[0].strip()
-
-        real_ip = request.headers.get("X-Real-IP")
-        if real_ip:
-            return real_ip
+            client = peer
+            for hop in reversed(forwarded_for.split(",")):
+                address = self._parse_ip(hop)
+                if address is None:
+                    # Malformed entry: don't trust anything further left
+                    break
+                client = address
+                if not self._is_trusted_proxy(address):
+                    break
+            return self._client_key(client)
+
+        real_ip = self._parse_ip(request.headers.get("X-Real-IP") or "")
+        if real_ip is not None:
+            return self._client_key(real_ip)
 
         # Fallback to direct client IP
-        return request.client.host if request.client else "unknown"
+        return self._client_key(peer)
+
+    def cost_for_route(self, path: str) -> float:
+        """
+        Get the up-front cost of a request path.
+
+        Paths are matched by suffix so a deployment root path does not matter.
+        Unknown paths cost one unit.
+        """
+        for route, cost in self.route_costs.items():
+            if path.endswith(route):
+                return cost
+        return 1.0
+
+    def cost_for_outcomes(self, outcomes: List[str]) -> float:
+        """Get the units actually spent by a request's hop outcomes."""
+        return sum(self.outcome_costs.get(outcome, 1.0) for outcome in outcomes)
+
+    def _result(
+        self, tat: float, now: float, allowed: bool, cost: float
+    ) -> RateLimitResult:
+        """Describe a client's state given its TAT."""
+        used = max(0.0, tat - now)
+        remaining = max(
+            0, math.floor((self.window_seconds - used) / self.emission_interval)
+        )
+        retry_after = 0.0
+        if not allowed:
+            retry_after = max(
+                0.0, tat + cost * self.emission_interval - self.window_seconds - now
+            )
+        return RateLimitResult(
+            allowed=allowed,
+            remaining=remaining,
+            reset_at=tat if tat > now else None,
+            retry_after=retry_after,
+        )
+
+    def consume(self, client_id: str, cost: float = 1.0) -> RateLimitResult:
+        """
+        Charge a client for a request if it has enough quota.
+
+        Args:
+            client_id: Client identifier
+            cost: Units to charge
 
-    def _cleanup_expired_entries(self):
-        """Remove expired entries from the requests dictionary."""
-        current_time = datetime.now()
-        expired_keys = []
+        Returns:
+            RateLimitResult: Whether the request is allowed and the state after it
+        """
+        now = time.time()
+        allowed, tat = self.store.consume(
+            client_id, now, cost * self.emission_interval, self.window_seconds
+        )
+        return self._result(tat, now, allowed, cost)
 
-        for client_id, data in self.requests.items():
-            if current_time - data["window_start"] > timedelta(hours=self.window_hours):
-                expired_keys.append(client_id)
+    def peek(self, client_id: str) -> RateLimitResult:
+        """Get a client's state without charging it."""
+        now = time.time()
+        tat = self.store.get(client_id, now)
+        return self._result(tat, now, tat - now < self.window_seconds, 0.0)
+
+    def refund(self, client_id: str, units: float) -> RateLimitResult:
+        """
+        Give back units charged for work that turned out cheaper.
 
-        for key in expired_keys:
-            del self.requests[key]
+        Args:
+            client_id: Client identifier
+            units: Units to give back
+
+        Returns:
+            RateLimitResult: The client's state after the refund
+        """
+        now = time.time()
+        tat = self.store.refund(client_id, now, units * self.emission_interval)
+        if units > 0:
+            self.refunded_units += units
+        return self._result(tat, now, True, 0.0)
 
-    def is_allowed(self, request: Request) -> bool:
+    def is_allowed(self, request: Request, cost: float = 1.0) -> bool:
         """
         Check if the request is allowed based on rate limiting rules.
 
         Args:
             request: FastAPI Request object
+            cost: Units to charge for the request
 
         Returns:
             bool: True if request is allowed, False otherwise
         """
-        client_id = self._get_client_id(request)
-        current_time = datetime.now()
-
-        with self.lock:
-            # Clean up expired entries
-            self._cleanup_expired_entries()
-
-            # Check if client exists in our tracking
-            if client_id not in self.requests:
-                # First request from this client
-                self.requests[client_id] = {
-                    "count": 1,
-                    "window_start": current_time,
-                    "last_request": current_time,
-                }
-                return True
-
-            client_data = self.requests[client_id]
-
-            # Check if we're still within the same window
-            if current_time - client_data["window_start"] <= timedelta(
-                hours=self.window_hours
-            ):
-                # Same window - check if limit exceeded
-                if client_data["count"] >= self.max_requests:
-                    return False
-                else:
-                    # Increment count and update last request time
-                    client_data["count"] += 1
-                    client_data["last_request"] = current_time
-                    return True
-            else:
-                # New window - reset counter
-                self.requests[client_id] = {
-                    "count": 1,
-                    "window_start": current_time,
-                    "last_request": current_time,
-                }
-                return True
+        return self.consume(self._get_client_id(request), cost).allowed
 
     def get_remaining_requests(self, request: Request) -> int:
         """
@@ -113,28 +296,13 @@ class RateLimiter:
             request: FastAPI Request object
 
         Returns:
-            int: Number of remaining requests
+            int: Number of remaining single-unit requests
         """
-        client_id = self._get_client_id(request)
-        current_time = datetime.now()
-
-        with self.lock:
-            if client_id not in self.requests:
-                return self.max_requests
-
-            client_data = self.requests[client_id]
-
-            # Check if window has expired
-            if current_time - client_data["window_start"] > timedelta(
-                hours=self.window_hours
-            ):
-                return self.max_requests
-
-            return max(0, self.max_requests - client_data["count"])
+        return self.peek(self._get_client_id(request)).remaining
 
     def get_reset_time(self, request: Request) -> Optional[datetime]:
         """
-        Get the time when the rate limit will reset for a client.
+        Get the time when the full quota is available again for a client.
 
         Args:
             request: FastAPI Request object
@@ -142,18 +310,84 @@ class RateLimiter:
         Returns:
             datetime: When the rate limit resets, or None if no limit applied
         """
-        client_id = self._get_client_id(request)
+        return self.peek(self._get_client_id(request)).reset_time
+
+    def settle(self, request: Request, outcomes: List[str]):
+        """
+        Settle the up-front charge of a request against what it actually spent.
+
+        Unused units are refunded; a request is never charged more than its
+        up-front cost. The snapshot in request.state.rate_limit is updated, so
+        response headers show the settled quota.
+
+        Args:
+            request: FastAPI Request object charged by check_rate_limit
+            outcomes: Outcome of each upstream hop the request ran
+        """
+        charged = getattr(request.state, "rate_limit_cost", None)
+        if charged is None:
+            return
+        request.state.rate_limit_cost = None
+        # The up-front charge is the most a request pays; outcomes costing
+        # more than the route (say, a retried hop) are not charged on top
+        request.state.rate_limit = self.refund(
+            request.state.rate_limit_client,
+            max(0.0, charged - self.cost_for_outcomes(outcomes)),
+        )
+
+    async def asettle(self, request: Request, outcomes: List[str]):
+        """
+        Settle a request's charge from async code.
+
+        Stores that wait on disk locks or the network are run in a thread,
+        so the event loop is never blocked by another worker's transaction.
+
+        Args:
+            request: FastAPI Request object charged by check_rate_limit
+            outcomes: Outcome of each upstream hop the request ran
+        """
+        if self.store.blocking:
+            await asyncio.to_thread(self.settle, request, outcomes)
+        else:
+            self.settle(request, outcomes)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return limiter gauges and counters."""
+        return {
+            **self.store.stats(),
+            "refunded_units": round(self.refunded_units, 2),
+        }
 
-        with self.lock:
-            if client_id not in self.requests:
-                return None
+    async def astats(self) -> Dict[str, Any]:
+        """
+        Return limiter gauges and counters from async code.
 
-            client_data = self.requests[client_id]
-            return client_data["window_start"] + timedelta(hours=self.window_hours)
+        Stores that count clients on disk or over the network are queried in
+        a thread, so a metrics scrape never blocks the event loop.
+        """
+        if self.store.blocking:
+            return await asyncio.to_thread(self.stats)
+        return self.stats()
 
 
 # Global rate limiter instance
-rate_limiter = RateLimiter(max_requests=5, window_hours=24)
+rate_limiter = RateLimiter(
+    max_requests=5,
+    window_hours=24,
+    store=create_store(
+        os.environ.get("RATE_LIMIT_BACKEND", "memory").lower(),
+        max_clients=int(os.environ.get("RATE_LIMIT_MAX_CLIENTS", "100000")),
+    ),
+    trusted_proxies=os.environ.get(
+        "RATE_LIMIT_TRUSTED_PROXIES", DEFAULT_TRUSTED_PROXIES
+    ).split(","),
+    route_costs=parse_costs(
+        os.environ.get("RATE_LIMIT_ROUTE_COSTS", DEFAULT_ROUTE_COSTS)
+    ),
+    outcome_costs=parse_costs(
+        os.environ.get("RATE_LIMIT_OUTCOME_COSTS", DEFAULT_OUTCOME_COSTS)
+    ),
+)
 
 
 def check_rate_limit(request: Request):
@@ -161,36 +395,58 @@ def check_rate_limit(request: Request):
     Dependency function to check rate limits.
     Raises HTTPException if rate limit is exceeded.
 
+    Charges the route's up-front cost; routes settle it with
+    rate_limiter.settle once they know what the work actually cost. The
+    decision is stored in request.state.rate_limit so response headers can
+    be rendered without consulting the limiter again.
+
     Args:
         request: FastAPI Request object
 
     Raises:
         HTTPException: 429 status if rate limit exceeded
     """
-    if not rate_limiter.is_allowed(request):
-        remaining = rate_limiter.get_remaining_requests(request)
-        reset_time = rate_limiter.get_reset_time(request)
-
-        error_detail = {
-            "error": "Rate limit exceeded",
-            "message": f"Maximum {rate_limiter.max_requests} requests allowed per {rate_limiter.window_hours} hours",
-            "remaining_requests": remaining,
-            "reset_time": reset_time.isoformat() if reset_time else None,
-        }
+    client_id = rate_limiter._get_client_id(request)
+    cost = rate_limiter.cost_for_route(request.url.path)
+    result = rate_limiter.consume(client_id, cost)
+    request.state.rate_limit = result
+    request.state.rate_limit_client = client_id
+    if result.allowed:
+        request.state.rate_limit_cost = cost
+        return
+
+    reset_time = result.reset_time
+    error_detail = {
+        "error": "Rate limit exceeded",
+        "message": f"Maximum {rate_limiter.max_requests} requests allowed per {rate_limiter.window_hours} hours",
+        "remaining_requests": result.remaining,
+        "reset_time": reset_time.isoformat() if reset_time else None,
+    }
+
+    raise HTTPException(
+        status_code=429,
+        detail=error_detail,
+        headers={
+            **rate_limit_headers(result),
+            "Retry-After": str(max(1, math.ceil(result.retry_after))),
+        },
+    )
+
+
+def rate_limit_headers(result: RateLimitResult) -> Dict[str, str]:
+    """
+    Render the X-RateLimit-* headers for a rate limit snapshot.
 
-        raise HTTPException(
-            status_code=429,
-            detail=error_detail,
-            headers={
-                "X-RateLimit-Limit": str(rate_limiter.max_requests),
-                "X-RateLimit-Remaining": str(remaining),
-                "X-RateLimit-Reset": (
-                    str(int(reset_time.timestamp())) if reset_time else "0"
-                ),
-                "Retry-After": (
-                    str(int((reset_time - datetime.now()).total_seconds()))
-                    if reset_time
-                    else "86400"
-                ),
-            },
-        )
+    Args:
+        result: Snapshot stored by check_rate_limit
+
+    Returns:
+        Dict[str, str]: Header names and values
+    """
+    headers = {
+        "X-RateLimit-Limit": str(rate_limiter.max_requests),
+        "X-RateLimit-Remaining": str(result.remaining),
+    }
+    if result.reset_at:
+        headers["X-RateLimit-Reset"] = str(int(result.reset_at))
+    return headers
@@ -1,10 +1,6 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request, Depends
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 import json
-import io
-from concurrent.futures import ThreadPoolExecutor
-import asyncio
-import functools
 
 # Import models from models.py
 from .models import (
@@ -21,16 +17,30 @@ from .main import introspect_agent
 # Import rate limiter
 from .rate_limiter import check_rate_limit, rate_limiter
 
-# Create a thread pool executor
-executor = ThreadPoolExecutor()
+# Import admission control
+from .admission import admission_controller, admit_request
+
+# Import upload ingestion
+from .uploads import upload_ingestor
 
 router = APIRouter(prefix="/api", tags=["introspect"])
 
 
-# Helper function to run sync functions in a thread
-def run_in_threadpool(func, *args, **kwargs):
-    loop = asyncio.get_event_loop()
-    return loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+async def _extract(
+    document: Optional[Dict[str, Any]], youtube_url: Optional[str]
+) -> Tuple[Dict[str, Any], str]:
+    """Run the extraction hop for an ingested upload or a YouTube URL."""
+    if document is not None:
+        source_info = {
+            "title": document["title"],
+            "filename": document["filename"],
+            "mime_type": document["mime_type"],
+        }
+        return await introspect_agent.extract_text_with_outcome_async(
+            document["text"], source_info, document["sha256"], document["chunks"]
+        )
+
+    return await introspect_agent.extract_key_points_with_outcome_async(youtube_url)
 
 
 @router.post("/extract", response_model=ExtractedData)
@@ -39,36 +49,31 @@ async def extract_content(
     file: Optional[UploadFile] = File(None),
     youtube_url: Optional[str] = Form(None),
     _: None = Depends(check_rate_limit),
+    __: None = Depends(admit_request),
 ):
     """
     Extract insights from content (file or YouTube URL).
 
+    Uploaded files may be plain text, Markdown, HTML or PDF.
     Returns structured data with title, summary and key insights.
-    Rate limited to 5 requests per 24 hours per IP address.
+    Rate limited to 5 units per 24 hours per IP address; cached results cost less,
+    failed requests are refunded.
     """
-    if not file and not youtube_url:
-        raise HTTPException(
-            status_code=400,
-            detail="No content provided. Please upload a file or provide a YouTube URL.",
-        )
-
+    # Outcomes of the hops that finished; whatever else was charged is refunded
+    outcomes: List[str] = []
     try:
-        # Process based on content type
-        if file:
-            # Read file content
-            file_content = await file.read()
-            content = file.filename
-
-            # In a complete implementation, we would process different file types
-            # For now, we'll just pass the filename to the agent
-        else:
-            # Process YouTube URL
-            content = youtube_url
+        if not file and not youtube_url:
+            raise HTTPException(
+                status_code=400,
+                detail="No content provided. Please upload a file or provide a YouTube URL.",
+            )
 
-        # Run the agent in a separate thread to avoid asyncio issues
-        extracted_json = await run_in_threadpool(
-            introspect_agent.extract_key_points, content
-        )
+        # Uploads are streamed to disk and their text extracted before any model call
+        document = await upload_ingestor.ingest(file) if file else None
+
+        # Await the agent directly on the server's event loop
+        extracted_json, outcome = await _extract(document, youtube_url)
+        outcomes.append(outcome)
 
         # Parse JSON string to dict
         # If extracted_json is already a dict, we don't need to parse it
@@ -79,10 +84,14 @@ async def extract_content(
         extracted_data = json.loads(extracted_json)
         return extracted_data
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error extracting content: {str(e)}"
         )
+    finally:
+        await rate_limiter.asettle(request, outcomes)
 
 
 @router.post("/personalize", response_model=PromptResponse)
@@ -90,11 +99,14 @@ async def personalize_content(
     request: Request,
     personalize_request: PersonalizeRequest,
     _: None = Depends(check_rate_limit),
+    __: None = Depends(admit_request),
 ):
     """
     Generate a personalized prompt from extracted insights and user context.
-    Rate limited to 5 requests per 24 hours per IP address.
+    Rate limited to 5 units per 24 hours per IP address; cached prompts cost less,
+    failed requests are refunded.
     """
+    outcomes: List[str] = []
     try:
         # Convert extracted data to dict if it's not already
         if isinstance(personalize_request.extracted_data, dict):
@@ -102,12 +114,12 @@ async def personalize_content(
         else:
             extracted_data = personalize_request.extracted_data.dict()
 
-        # Run the agent in a separate thread to avoid asyncio issues
-        prompt = await run_in_threadpool(
-            introspect_agent.generate_prompt,
+        # Await the agent directly on the server's event loop
+        prompt, outcome = await introspect_agent.generate_prompt_with_outcome_async(
             extracted_data=extracted_data,
             user_context=personalize_request.user_context.dict(),
         )
+        outcomes.append(outcome)
 
         return {"prompt": prompt}
 
@@ -115,6 +127,8 @@ async def personalize_content(
         raise HTTPException(
             status_code=500, detail=f"Error personalizing content: {str(e)}"
         )
+    finally:
+        await rate_limiter.asettle(request, outcomes)
 
 
 @router.post("/process", response_model=ProcessResponse)
@@ -126,29 +140,24 @@ async def process_content(
     goals: str = Form(""),
     background: str = Form(""),
     _: None = Depends(check_rate_limit),
+    __: None = Depends(admit_request),
 ):
     """
     Combined endpoint that extracts insights and generates a personalized prompt in one call.
-    Rate limited to 5 requests per 24 hours per IP address.
+    Costs 2 of the 5 units per 24 hours per IP address, less when cached; a failed
+    hop is refunded.
     """
-    if not file and not youtube_url:
-        raise HTTPException(
-            status_code=400,
-            detail="No content provided. Please upload a file or provide a YouTube URL.",
-        )
-
+    # Outcomes of the hops that finished; whatever else was charged is refunded
+    outcomes: List[str] = []
     try:
-        # Process based on content type
-        if file:
-            # Read file content
-            file_content = await file.read()
-            content = file.filename
-
-            # In a complete implementation, we would process different file types
-            # For now, we'll just pass the filename to the agent
-        else:
-            # Process YouTube URL
-            content = youtube_url
+        if not file and not youtube_url:
+            raise HTTPException(
+                status_code=400,
+                detail="No content provided. Please upload a file or provide a YouTube URL.",
+            )
+
+        # Uploads are streamed to disk and their text extracted before any model call
+        document = await upload_ingestor.ingest(file) if file else None
 
         # Create user context
         user_context = {
@@ -157,28 +166,33 @@ async def process_content(
             "background": background,
         }
 
-        # Extract insights using our helper function
-        extracted_data = await run_in_threadpool(
-            introspect_agent.extract_key_points, content
-        )
+        # Extract insights
+        extracted_data, extract_outcome = await _extract(document, youtube_url)
+        outcomes.append(extract_outcome)
 
         # Handle both dict and string cases
         if not isinstance(extracted_data, dict):
             extracted_data = json.loads(extracted_data)
 
-        # Generate prompt using our helper function
-        prompt = await run_in_threadpool(
-            introspect_agent.generate_prompt,
-            extracted_data=extracted_data,
-            user_context=user_context,
+        # Generate personalized prompt
+        prompt, prompt_outcome = (
+            await introspect_agent.generate_prompt_with_outcome_async(
+                extracted_data=extracted_data,
+                user_context=user_context,
+            )
         )
+        outcomes.append(prompt_outcome)
 
         return {"extracted_data": extracted_data, "prompt": prompt}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error processing content: {str(e)}"
         )
+    finally:
+        await rate_limiter.asettle(request, outcomes)
 
 
 @router.get("/rate-limit-status")
@@ -188,13 +202,28 @@ async def get_rate_limit_status(request: Request):
 
     Returns information about remaining requests and reset time.
     """
-    remaining = rate_limiter.get_remaining_requests(request)
-    reset_time = rate_limiter.get_reset_time(request)
+    status = rate_limiter.peek(rate_limiter._get_client_id(request))
+    request.state.rate_limit = status
+    reset_time = status.reset_time
 
     return {
         "max_requests": rate_limiter.max_requests,
         "window_hours": rate_limiter.window_hours,
-        "remaining_requests": remaining,
+        "remaining_requests": status.remaining,
         "reset_time": reset_time.isoformat() if reset_time else None,
-        "is_limited": remaining == 0,
+        "is_limited": status.remaining == 0,
+    }
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """
+    Get cache, pipeline, admission control, rate limiter and upload counters
+    for monitoring.
+    """
+    return {
+        **introspect_agent.get_stats(),
+        "admission": admission_controller.stats(),
+        "rate_limiter": await rate_limiter.astats(),
+        "uploads": upload_ingestor.stats(),
     }
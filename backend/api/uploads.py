@@ -0,0 +1,604 @@
+"""
+Streaming ingestion of uploaded files.
+
+The multipart body is parsed and spooled by the framework before a route
+runs, so the size cap is enforced earlier, by UploadSizeLimitMiddleware,
+while the body is received. Uploads are then copied in fixed-size chunks
+to a temporary file off the event loop, with an incremental SHA-256 used
+as the cache key, so the request never holds the whole file in memory.
+The content type is sniffed from the first bytes rather than trusted from
+the client. Text is extracted from plain text, Markdown and HTML files in a
+bounded thread pool off the event loop, and from PDFs page range by page
+range on a process pool, within the time and concurrency limits of the
+upload's content source. The temporary file is removed as soon as the text
+is extracted.
+"""
+
+import asyncio
+import codecs
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+
+from agents.agent import EXTRACT_CHUNK_TOKENS
+from agents.cache import DiskStore, storage_dir
+from agents.pdf_extract import PYPDF_AVAILABLE, PdfExtractor
+from agents.sources import source_router
+
+logger = logging.getLogger("introspect_agent")
+
+MIME_TEXT = "text/plain"
+MIME_MARKDOWN = "text/markdown"
+MIME_HTML = "text/html"
+MIME_PDF = "application/pdf"
+MIME_UNKNOWN = "application/octet-stream"
+
+SUPPORTED_TYPES = (MIME_TEXT, MIME_MARKDOWN, MIME_HTML, MIME_PDF)
+
+MARKDOWN_EXTENSIONS = (".md", ".markdown", ".mdown", ".mkd")
+
+# Bytes kept from the start of the upload for content sniffing
+SNIFF_BYTES = 4096
+
+# Routes accepting file uploads, matched by suffix like route costs
+UPLOAD_PATHS = ("/api/extract", "/api/process")
+
+# Room for multipart boundaries, part headers and the other form fields
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+_HTML_MARKERS = (b"<!doctype html", b"<html", b"<head", b"<body")
+
+
+def sniff_mime_type(head: bytes, filename: Optional[str] = None) -> str:
+    """
+    Determine the content type of an upload from its first bytes.
+
+    The client's declared type is ignored. The file extension is only used
+    to tell Markdown from plain text.
+
+    Args:
+        head: First bytes of the file
+        filename: Original file name
+
+    Returns:
+        str: One of SUPPORTED_TYPES, or MIME_UNKNOWN
+    """
+    if head.startswith(b"%PDF-"):
+        return MIME_PDF
+
+    start = head.lstrip(codecs.BOM_UTF8).lstrip().lower()
+    if start.startswith(_HTML_MARKERS) or (
+        start.startswith(b"<") and b"<html" in start[:1024]
+    ):
+        return MIME_HTML
+
+    if b"\x00" in head:
+        return MIME_UNKNOWN
+    try:
+        # Not final: the head may end in the middle of a character
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError:
+        return MIME_UNKNOWN
+
+    if filename and filename.lower().endswith(MARKDOWN_EXTENSIONS):
+        return MIME_MARKDOWN
+    return MIME_TEXT
+
+
+class _TextCollector:
+    """Accumulates extracted text up to a character budget."""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.parts: List[str] = []
+        self.chars = 0
+
+    @property
+    def full(self) -> bool:
+        return self.chars >= self.max_chars
+
+    def add(self, text: str):
+        if not text or self.full:
+            return
+        text = text[: self.max_chars - self.chars]
+        self.parts.append(text)
+        self.chars += len(text)
+
+    def text(self) -> str:
+        # Collapse runs of blank lines and trailing spaces left by markup
+        text = "".join(self.parts)
+        text = re.sub(r"[ \t]+\n", "\n", text)
+        return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+class _HTMLTextParser(HTMLParser):
+    """Collects visible text from HTML, one line per block element."""
+
+    SKIPPED_TAGS = frozenset(
+        ["script", "style", "noscript", "template", "svg", "head", "nav", "footer"]
+    )
+    BLOCK_TAGS = frozenset(
+        """
+        p div br li ul ol tr section article header h1 h2 h3 h4 h5 h6
+        blockquote pre
+        """.split()
+    )
+
+    def __init__(self, collector: _TextCollector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self.collector.add("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self.BLOCK_TAGS:
+            self.collector.add("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth and data.strip():
+            self.collector.add(" ".join(data.split()) + " ")
+
+
+_MARKDOWN_RULES = [
+    (re.compile(r"^\s{0,3}(?:#{1,6}\s+|>\s?|[-*+]\s+|\d+[.)]\s+)"), ""),
+    (re.compile(r"^\s*(?:```|~~~).*$"), ""),
+    (re.compile(r"!\[([^\]]*)\]\([^)]*\)"), r"\1"),
+    (re.compile(r"\[([^\]]+)\]\([^)]*\)"), r"\1"),
+    (re.compile(r"(\*\*|__|\*|_|`)(\S(?:.*?\S)?)\1"), r"\2"),
+    (re.compile(r"<[^>]+>"), ""),
+]
+
+
+def _strip_markdown(line: str) -> str:
+    for pattern, replacement in _MARKDOWN_RULES:
+        line = pattern.sub(replacement, line)
+    return line
+
+
+def _read_text(path: Path, chunk_bytes: int):
+    """Yield decoded text of a file in chunks, replacing invalid bytes."""
+    with open(path, "r", encoding="utf-8-sig", errors="replace", newline=None) as f:
+        while True:
+            chunk = f.read(chunk_bytes)
+            if not chunk:
+                return
+            yield chunk
+
+
+def extract_text(
+    path: Path, mime_type: str, max_chars: int, chunk_bytes: int = 64 * 1024
+) -> str:
+    """
+    Extract plain text from a spooled text, Markdown or HTML upload.
+
+    Files are read incrementally and reading stops once max_chars
+    characters have been collected, so memory use is bounded by the text
+    budget rather than the file size. PDFs are handled by PdfExtractor.
+
+    Args:
+        path: Path to the spooled file
+        mime_type: Sniffed content type
+        max_chars: Maximum characters of text to return
+        chunk_bytes: Read size
+
+    Returns:
+        str: Extracted text
+
+    Raises:
+        HTTPException: 415 if the type is unsupported
+    """
+    collector = _TextCollector(max_chars)
+
+    if mime_type == MIME_HTML:
+        parser = _HTMLTextParser(collector)
+        for chunk in _read_text(path, chunk_bytes):
+            parser.feed(chunk)
+            if collector.full:
+                break
+        parser.close()
+
+    elif mime_type == MIME_MARKDOWN:
+        pending = ""
+        for chunk in _read_text(path, chunk_bytes):
+            lines = (pending + chunk).split("\n")
+            pending = lines.pop()
+            for line in lines:
+                collector.add(_strip_markdown(line) + "\n")
+            if collector.full:
+                break
+        collector.add(_strip_markdown(pending))
+
+    elif mime_type == MIME_TEXT:
+        for chunk in _read_text(path, chunk_bytes):
+            collector.add(chunk)
+            if collector.full:
+                break
+
+    else:
+        raise HTTPException(
+            status_code=415,
+            detail="Unsupported file type. Upload a text, Markdown, HTML or PDF file.",
+        )
+
+    return collector.text()
+
+
+class UploadIngestor:
+    """
+    Spools uploads to disk and extracts their text in a worker pool.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 20 * 1024 * 1024,
+        max_chars: int = 2_000_000,
+        chunk_bytes: int = 64 * 1024,
+        workers: int = 2,
+        spool_dir: Optional[str] = None,
+        pdf_extractor: Optional[PdfExtractor] = None,
+    ):
+        """
+        Initialize the ingestor.
+
+        Args:
+            max_bytes: Largest accepted upload; larger ones are rejected with 413
+            max_chars: Maximum characters of text extracted per upload
+            chunk_bytes: Size of each read from the upload stream
+            workers: Threads extracting text from non-PDF uploads at once
+            spool_dir: Directory for temporary files, or None for the system default
+            pdf_extractor: Extractor for PDF uploads, or None to reject PDFs
+        """
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self.pdf_extractor = pdf_extractor if PYPDF_AVAILABLE else None
+        self.chunk_bytes = chunk_bytes
+        self.spool_dir = spool_dir
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="upload-extract"
+        )
+
+        self._lock = threading.Lock()
+        self.accepted = 0
+        self.bytes_ingested = 0
+        self.chars_extracted = 0
+        self.by_type: Dict[str, int] = {}
+        self.rejected: Dict[str, int] = {
+            "too_large": 0,
+            "empty": 0,
+            "unsupported_type": 0,
+            "no_text": 0,
+            "unreadable": 0,
+            "timeout": 0,
+        }
+
+    def count_rejection(self, reason: str):
+        """Count an upload rejected for the given reason."""
+        with self._lock:
+            self.rejected[reason] += 1
+
+    def _reject(self, reason: str, status_code: int, detail: str):
+        self.count_rejection(reason)
+        raise HTTPException(status_code=status_code, detail=detail)
+
+    def too_large_detail(self) -> str:
+        """Error message for uploads over max_bytes."""
+        limit_mb = self.max_bytes // (1024 * 1024)
+        return f"File too large. The maximum upload size is {limit_mb} MB."
+
+    def _too_large(self):
+        self._reject("too_large", 413, self.too_large_detail())
+
+    @staticmethod
+    def _write_chunk(out, digest, chunk: bytes):
+        digest.update(chunk)
+        out.write(chunk)
+
+    async def spool(self, file: UploadFile) -> Dict[str, Any]:
+        """
+        Copy an upload to a temporary file in chunks.
+
+        Hashing and writing run in a worker thread, so the event loop never
+        waits on the disk. The request body was already capped while it
+        was received; max_bytes is checked again for the file itself.
+
+        Args:
+            file: Uploaded file
+
+        Returns:
+            Dict with path, size, sha256 and head (first bytes)
+
+        Raises:
+            HTTPException: 413 if the upload exceeds max_bytes, 400 if it is empty
+        """
+        # The multipart parser already knows the size; reject without copying
+        if file.size is not None and file.size > self.max_bytes:
+            self._too_large()
+
+        digest = hashlib.sha256()
+        head = b""
+        size = 0
+        fd, name = tempfile.mkstemp(prefix="upload-", dir=self.spool_dir)
+        path = Path(name)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = await file.read(self.chunk_bytes)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        self._too_large()
+                    if len(head) < SNIFF_BYTES:
+                        head += chunk[: SNIFF_BYTES - len(head)]
+                    await asyncio.to_thread(self._write_chunk, out, digest, chunk)
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+
+        if not size:
+            path.unlink(missing_ok=True)
+            self._reject("empty", 400, "The uploaded file is empty.")
+
+        return {"path": path, "size": size, "sha256": digest.hexdigest(), "head": head}
+
+    async def ingest(self, file: UploadFile) -> Dict[str, Any]:
+        """
+        Spool an upload, sniff its type and extract its text.
+
+        Args:
+            file: Uploaded file
+
+        Returns:
+            Dict with filename, title, mime_type, size, sha256 and text, plus
+            the prebuilt chunks and page counts for PDFs
+
+        Raises:
+            HTTPException: 400, 413, 415 or 422 if the upload is rejected, 504
+                if extraction exceeds the source's time limit
+        """
+        spooled = await self.spool(file)
+        path = spooled["path"]
+        try:
+            mime_type = sniff_mime_type(spooled["head"], file.filename)
+            if mime_type not in SUPPORTED_TYPES:
+                self._reject(
+                    "unsupported_type",
+                    415,
+                    "Unsupported file type. Upload a text, Markdown, HTML or PDF file.",
+                )
+            if mime_type == MIME_PDF and self.pdf_extractor is None:
+                self._reject(
+                    "unsupported_type",
+                    415,
+                    "PDF uploads are not supported on this server.",
+                )
+
+            # Extraction counts against the same per-source limits as the
+            # model call, so a burst of PDFs cannot saturate the workers
+            source = source_router.upload_source(mime_type)
+            try:
+                text, chunks, pdf_info = await source.run(
+                    lambda: self._extract(
+                        path, mime_type, spooled["sha256"], file.filename
+                    )
+                )
+            except asyncio.TimeoutError:
+                self._reject(
+                    "timeout", 504, "Reading the uploaded file took too long."
+                )
+        finally:
+            path.unlink(missing_ok=True)
+
+        if not text.strip():
+            self._reject(
+                "no_text", 422, "No text could be extracted from the uploaded file."
+            )
+
+        with self._lock:
+            self.accepted += 1
+            self.bytes_ingested += spooled["size"]
+            self.chars_extracted += len(text)
+            self.by_type[mime_type] = self.by_type.get(mime_type, 0) + 1
+
+        logger.info(
+            f"Ingested upload {file.filename!r} ({mime_type}, {spooled['size']} bytes, {len(text)} chars)"
+        )
+        filename = file.filename or "upload"
+        return {
+            "filename": filename,
+            "title": Path(filename).stem or "Uploaded Document",
+            "mime_type": mime_type,
+            "size": spooled["size"],
+            "sha256": spooled["sha256"],
+            "text": text,
+            "chunks": chunks,
+            "pdf": pdf_info,
+        }
+
+    async def _extract(
+        self, path: Path, mime_type: str, content_hash: str, filename: Optional[str]
+    ) -> Tuple[str, Optional[List[str]], Optional[Dict[str, Any]]]:
+        """
+        Extract the text of a spooled upload.
+
+        Returns:
+            Tuple of the text, the prebuilt chunks and the page counts, the
+            last two only for PDFs
+
+        Raises:
+            HTTPException: 422 if a PDF cannot be read
+        """
+        if mime_type != MIME_PDF:
+            loop = asyncio.get_running_loop()
+            text = await loop.run_in_executor(
+                self._executor,
+                extract_text,
+                path,
+                mime_type,
+                self.max_chars,
+                self.chunk_bytes,
+            )
+            return text, None, None
+
+        try:
+            pdf = await self.pdf_extractor.extract(path, content_hash, self.max_chars)
+        except ValueError as e:
+            logger.warning(f"Rejected PDF upload {filename!r}: {e}")
+            self._reject("unreadable", 422, "The uploaded PDF could not be read.")
+        pdf_info = {
+            key: pdf[key]
+            for key in ("pages_total", "pages_read", "timed_out", "cached")
+        }
+        return pdf["text"], pdf["chunks"], pdf_info
+
+    def close(self):
+        """Shut down the extraction thread pool and PDF worker processes."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self.pdf_extractor is not None:
+            self.pdf_extractor.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return ingestion counters."""
+        with self._lock:
+            return {
+                "accepted": self.accepted,
+                "bytes_ingested": self.bytes_ingested,
+                "chars_extracted": self.chars_extracted,
+                "by_type": dict(self.by_type),
+                "rejected": dict(self.rejected),
+                "max_bytes": self.max_bytes,
+                "workers": self.workers,
+                "pdf": self.pdf_extractor.stats() if self.pdf_extractor else None,
+            }
+
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware rejecting oversized uploads while they are received.
+
+    The framework parses and spools the whole multipart body before the
+    route and its rate limit and admission dependencies run, so a limit
+    checked in the route would only cap a copy of a body already received
+    and written to disk. Requests to the upload routes that declare a larger
+    Content-Length are rejected before any of the body is read; other bodies
+    are counted as they arrive and cut off with a 413 at the limit.
+    """
+
+    def __init__(self, app, ingestor: "UploadIngestor", paths=UPLOAD_PATHS):
+        """
+        Initialize the middleware.
+
+        Args:
+            app: ASGI application to wrap
+            ingestor: Ingestor whose max_bytes is enforced and counters updated
+            paths: Route paths accepting uploads, matched by suffix
+        """
+        self.app = app
+        self.ingestor = ingestor
+        self.paths = tuple(paths)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope.get("method") != "POST"
+            or not scope["path"].endswith(self.paths)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.ingestor.max_bytes + MULTIPART_OVERHEAD_BYTES
+        declared = dict(scope.get("headers") or []).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            await self._reject(send)
+            return
+
+        received = 0
+        rejected = False
+        started = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Answer now; the app only sees the client go away
+                    rejected = True
+                    if not started:
+                        await self._reject(send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            if rejected:
+                return
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not rejected:
+                raise
+
+    async def _reject(self, send):
+        self.ingestor.count_rejection("too_large")
+        body = json.dumps({"detail": self.ingestor.too_large_detail()}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"connection", b"close"),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+# PDF text is extracted on a process pool and cached by content hash
+pdf_extractor = PdfExtractor(
+    workers=int(os.environ.get("PDF_EXTRACT_WORKERS", "0")) or None,
+    pages_per_task=int(os.environ.get("PDF_PAGES_PER_TASK", "8")),
+    max_pages=int(os.environ.get("UPLOAD_MAX_PDF_PAGES", "200")),
+    timeout_seconds=float(os.environ.get("PDF_EXTRACT_TIMEOUT", "60")),
+    chunk_tokens=EXTRACT_CHUNK_TOKENS,
+    cache=DiskStore(
+        storage_dir.joinpath("pdf_text"),
+        max_bytes=int(
+            os.environ.get("PDF_TEXT_CACHE_MAX_BYTES", str(256 * 1024 * 1024))
+        ),
+    ),
+)
+
+# Global upload ingestor instance
+upload_ingestor = UploadIngestor(
+    max_bytes=int(os.environ.get("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024))),
+    max_chars=int(os.environ.get("UPLOAD_MAX_TEXT_CHARS", "2000000")),
+    workers=int(os.environ.get("UPLOAD_EXTRACT_WORKERS", "2")),
+    spool_dir=os.environ.get("UPLOAD_SPOOL_DIR") or None,
+    pdf_extractor=pdf_extractor,
+)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test script for admission control.
+
+Drives the admission dependency directly with stand-in requests and checks
+queueing, shedding, and that shed requests get their rate limit charge
+back. No server or API keys needed.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fastapi import HTTPException
+
+from api.admission import admission_controller, admit_request
+from api.rate_limiter import check_rate_limit, rate_limiter
+
+
+def check(condition: bool, label: str):
+    print(f"{'✅' if condition else '❌'} {label}")
+    if not condition:
+        raise AssertionError(label)
+
+
+def make_request(client_ip: str, disconnected: bool = False):
+    async def is_disconnected():
+        return disconnected
+
+    return SimpleNamespace(
+        client=SimpleNamespace(host=client_ip),
+        headers={},
+        url=SimpleNamespace(path="/api/extract"),
+        state=SimpleNamespace(),
+        is_disconnected=is_disconnected,
+    )
+
+
+async def enter(request):
+    """Run both route dependencies; return the admission generator."""
+    check_rate_limit(request)
+    admission = admit_request(request)
+    await admission.__anext__()
+    return admission
+
+
+async def shed_status(request) -> int:
+    try:
+        admission = await enter(request)
+    except HTTPException as e:
+        return e.status_code
+    await admission.aclose()
+    return 200
+
+
+def remaining(request) -> int:
+    return rate_limiter.peek(rate_limiter._get_client_id(request)).remaining
+
+
+async def check_admission():
+    admission_controller.max_in_flight = 1
+    admission_controller.max_queue = 1
+    admission_controller.max_wait_seconds = 0.2
+
+    # One request holds the only slot
+    holder = make_request("198.51.100.1")
+    holding = await enter(holder)
+    check(admission_controller.in_flight == 1, "First request is admitted")
+
+    queued = make_request("198.51.100.2")
+    waiting = asyncio.create_task(enter(queued))
+    await asyncio.sleep(0.01)
+    check(admission_controller.queue_depth == 1, "Second request waits in the queue")
+
+    full = make_request("198.51.100.3")
+    check(await shed_status(full) == 503, "Request beyond the queue is shed")
+    check(remaining(full) == rate_limiter.max_requests, "Queue-full shed is refunded")
+
+    try:
+        await waiting
+        timed_out = False
+    except HTTPException as e:
+        timed_out = e.status_code == 503
+    check(timed_out, "Queued request is shed after max_wait_seconds")
+    check(
+        remaining(queued) == rate_limiter.max_requests,
+        "Queue-timeout shed is refunded",
+    )
+
+    await holding.aclose()
+    check(admission_controller.in_flight == 0, "Slot is released after the request")
+
+    gone = make_request("198.51.100.4", disconnected=True)
+    check(await shed_status(gone) == 503, "Disconnected client is skipped")
+    check(
+        remaining(gone) == rate_limiter.max_requests,
+        "Disconnected client is refunded",
+    )
+
+    served = make_request("198.51.100.5")
+    check(await shed_status(served) == 200, "Request is admitted when idle")
+    check(
+        remaining(served) == rate_limiter.max_requests - 1,
+        "Admitted request keeps its charge until settled",
+    )
+    print(admission_controller.stats())
+
+
+def main():
+    print("🧪 Testing admission control")
+    print("=" * 50)
+    asyncio.run(check_admission())
+    print("\n🎉 All admission tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Test script for the extraction pipeline of IntrospectAgent.
+
+The model is replaced by stand-in agents, so these checks cover the
+pipeline's own behavior (hedging, validation, fast paths) without API keys
+or network access.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Keep the artifacts written by the agent out of the source tree
+os.environ.setdefault("ARTIFACTS_DIR", tempfile.mkdtemp(prefix="artifacts-"))
+
+import agents.agent as agent_module
+from agents.agent import IntrospectAgent
+
+VALID_DATA = {
+    "title": "Deep Work",
+    "summary": "Focus without distraction produces better work in less time.",
+    "insights": [
+        {"point": f"Insight {index}", "type": "actionable"} for index in range(5)
+    ],
+}
+
+
+def check(condition: bool, label: str):
+    print(f"{'✅' if condition else '❌'} {label}")
+    if not condition:
+        raise AssertionError(label)
+
+
+class StandInAgent:
+    """Extraction agent that answers after a delay and records cancellation."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.runs = 0
+        self.cancelled = False
+        self.unwound = False
+
+    async def arun(self, prompt: str):
+        self.runs += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        finally:
+            self.unwound = True
+        return SimpleNamespace(content='{"title": "tool", "insights": []}')
+
+
+def check_validation():
+    agent = IntrospectAgent()
+    check(agent._is_valid_extraction(VALID_DATA), "Complete extraction is valid")
+    check(
+        agent._is_valid_extraction({**VALID_DATA, "title": "Trial and Error"}),
+        "Titles mentioning errors are still valid content",
+    )
+    placeholder = agent._create_default_extraction_data(
+        "Content Access Error", "Could not read the page."
+    )
+    check(
+        not agent._is_valid_extraction(placeholder),
+        "Error placeholders are rejected by their flag",
+    )
+    check(
+        not agent._is_valid_extraction({**VALID_DATA, "raw_transcript": "..."}),
+        "Direct transcript analysis is not cached",
+    )
+
+
+async def check_hedging():
+    agent = IntrospectAgent()
+    built = []
+
+    def build():
+        # The first agent serves the slow tool path, later ones the backup
+        built.append(StandInAgent(delay=5 if not built else 0.01))
+        return built[-1]
+
+    async def backup(resource_url: str):
+        backup_agent = agent._build_extract_agent()
+        await backup_agent.arun(resource_url)
+        return dict(VALID_DATA)
+
+    agent._build_extract_agent = build
+    agent._try_backup_youtube_extraction = backup
+    agent_module.EXTRACT_HEDGE_MODE = "immediate"
+
+    data = await agent._hedged_youtube_extraction("https://youtu.be/dQw4w9WgXcQ")
+    check(data["title"] == "Deep Work", "Valid backup result wins the hedge")
+    check(
+        len(built) == 2 and built[0] is not built[1],
+        "Each hedged path runs on its own agent",
+    )
+    check(
+        built[0].cancelled and built[0].unwound,
+        "Losing path is cancelled and awaited before returning",
+    )
+
+
+class RecordingAgent:
+    """Extraction agent that records its prompts and answers with VALID_DATA."""
+
+    prompts = []
+
+    async def arun(self, prompt: str):
+        self.prompts.append(prompt)
+        return SimpleNamespace(content=json.dumps(VALID_DATA))
+
+
+async def check_prompt_sources():
+    agent = IntrospectAgent()
+    agent._build_extract_agent = RecordingAgent
+    agent._build_structured_extract_agent = RecordingAgent
+
+    data, _ = await agent.extract_text_with_outcome_async(
+        "Deep work is rare and valuable. " * 20,
+        {"title": "Essay", "mime_type": "application/pdf"},
+        uuid.uuid4().hex,
+    )
+    prompts = RecordingAgent.prompts
+    check(data["title"] == "Deep Work", "Uploaded text is extracted")
+    check(
+        prompts
+        and "uploaded document" in prompts[0]
+        and not any("YouTube" in prompt for prompt in prompts),
+        "Uploads are not prompted as YouTube transcripts",
+    )
+
+
+async def check_known_unavailable():
+    from agents import youtube_utils
+
+    agent = IntrospectAgent()
+    url = "https://www.youtube.com/watch?v=aqz-KE-bpKQ"
+    youtube_utils._record_unavailable(
+        "aqz-KE-bpKQ", youtube_utils.TRANSCRIPT_LANGUAGE, "TranscriptsDisabled", ""
+    )
+    try:
+        data, outcome = await agent.extract_key_points_with_outcome_async(url)
+    finally:
+        youtube_utils.unavailable_videos.delete("aqz-KE-bpKQ")
+    check(
+        data.get("error") is True and outcome == agent_module.OUTCOME_CACHE_HIT,
+        "Known-unavailable videos are answered as a cache hit",
+    )
+
+
+async def check_failed_outcome():
+    agent = IntrospectAgent()
+    placeholder = agent._create_default_extraction_data("Error", "No transcript")
+
+    async def run():
+        return placeholder
+
+    _, outcome = await agent._cached_extraction(f"test:{uuid.uuid4()}", "error", run)
+    check(
+        outcome == agent_module.OUTCOME_FAILED,
+        "Placeholder extractions are reported as failed",
+    )
+
+
+async def main():
+    print("🧪 Testing extraction pipeline")
+    print("=" * 50)
+    check_validation()
+    await check_hedging()
+    await check_prompt_sources()
+    await check_known_unavailable()
+    await check_failed_outcome()
+    print("\n🎉 All pipeline tests passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Test script for web article fetching and extraction.
+
+Serves a few pages from a local HTTP stand-in and checks main-text
+extraction, the byte cap and timeout, caching by canonical URL,
+ETag / Last-Modified revalidation, and that redirects and non-public
+addresses are refused, including hosts whose DNS answer changes between the
+check and the connection. No network access or API keys needed.
+"""
+
+import asyncio
+import socket
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agents import http_client
+from agents.article_utils import (
+    ArticleFetcher,
+    canonical_url,
+    extract_article,
+    is_public_address,
+)
+from agents.cache import DiskStore
+
+PARAGRAPH = (
+    "Deep work is the ability to focus without distraction on a cognitively "
+    "demanding task, and it produces results in less time, with more quality."
+)
+
+ARTICLE_HTML = f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+  <title>Deep Work | Example Blog</title>
+  <meta property="og:title" content="Why Deep Work Matters">
+  <meta name="author" content="Jane Writer">
+  <script>var tracking = "should not appear";</script>
+</head>
+<body>
+  <nav><a href="/">Home</a> <a href="/about">About</a> <a href="/blog">Blog</a></nav>
+  <div class="sidebar-menu"><p>Subscribe to our newsletter for weekly updates!</p></div>
+  <article class="post-content">
+    <h1>Why Deep Work Matters</h1>
+    <p>{PARAGRAPH}</p>
+    <p>Schedule every minute of your day, and batch shallow work such as email
+       into fixed blocks, so that long stretches remain for focused effort.</p>
+    <p>Embrace boredom: resisting the urge to check your phone in idle moments
+       trains the attention you need for concentration, again and again.</p>
+  </article>
+  <div id="comments"><p>Great post, thanks for sharing this with everyone!</p></div>
+  <footer><p>Copyright 2025 Example Blog. All rights reserved.</p></footer>
+</body>
+</html>
+"""
+
+LAST_MODIFIED = "Wed, 21 May 2025 10:00:00 GMT"
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Local stand-in for article hosts."""
+
+    etag = '"v1"'
+    hits = {}
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        StandIn.hits[path] = StandIn.hits.get(path, 0) + 1
+
+        if path == "/article":
+            if self.headers.get("If-None-Match") == StandIn.etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self._send(ARTICLE_HTML.encode(), "text/html; charset=utf-8", StandIn.etag)
+        elif path == "/dated":
+            if self.headers.get("If-Modified-Since") == LAST_MODIFIED:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self._send(ARTICLE_HTML.encode(), "text/html", last_modified=LAST_MODIFIED)
+        elif path == "/big":
+            padding = f"<p>{PARAGRAPH}</p>" * 20000
+            page = ARTICLE_HTML.replace("</article>", padding + "</article>")
+            self._send(page.encode(), "text/html")
+        elif path == "/slow":
+            time.sleep(2)
+            self._send(ARTICLE_HTML.encode(), "text/html")
+        elif path == "/redirect":
+            self._redirect("/article")
+        elif path == "/loop":
+            self._redirect("/loop")
+        elif path == "/internal":
+            # Points at another loopback address, as a rebinding host might
+            port = self.server.server_address[1]
+            self._redirect(f"http://127.0.0.2:{port}/article")
+        elif path == "/image":
+            self._send(b"\x89PNG\r\n\x1a\n" + b"\x00" * 1024, "image/png")
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    def _redirect(self, location):
+        self.send_response(302)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _send(self, body, content_type, etag=None, last_modified=None):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        if last_modified:
+            self.send_header("Last-Modified", last_modified)
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def check(condition: bool, label: str):
+    print(f"{'✅' if condition else '❌'} {label}")
+    if not condition:
+        raise AssertionError(label)
+
+
+def check_extraction():
+    article = extract_article(ARTICLE_HTML)
+    text = article["text"]
+    check(PARAGRAPH in text, "Main paragraphs are extracted")
+    check("Embrace boredom" in text, "All article paragraphs are kept")
+    check("newsletter" not in text, "Sidebar is removed")
+    check("Great post" not in text, "Comments are removed")
+    check(
+        "Copyright" not in text and "tracking" not in text,
+        "Footer and scripts are removed",
+    )
+    check(article["title"] == "Why Deep Work Matters", "Title comes from og:title")
+    check(article["byline"] == "Jane Writer", "Byline comes from the author meta tag")
+
+
+def check_canonical_url():
+    check(
+        canonical_url("HTTPS://Example.com:443/post?utm_source=x&b=2&a=1#top")
+        == "https://example.com/post?a=1&b=2",
+        "Canonical URL drops tracking parameters, default port and fragment",
+    )
+
+
+async def check_fetching(base_url: str):
+    store = DiskStore(Path(tempfile.mkdtemp()).joinpath("articles"))
+    fetcher = ArticleFetcher(
+        cache=store,
+        max_bytes=256 * 1024,
+        timeout_seconds=0.5,
+        fresh_seconds=60,
+        allow_private_hosts=True,
+    )
+
+    first = await fetcher.fetch(f"{base_url}/article?utm_source=newsletter")
+    check(
+        not first["error"] and first["cache"] == "miss",
+        "First fetch extracts the article",
+    )
+    check(
+        first["article_info"]["title"] == "Why Deep Work Matters",
+        "Article title is reported",
+    )
+
+    second = await fetcher.fetch(f"{base_url}/article")
+    check(second["cache"] == "fresh", "Same canonical URL is served fresh from cache")
+    check(StandIn.hits["/article"] == 1, "Fresh cache hit makes no request")
+
+    fetcher.fresh_seconds = 0
+    third = await fetcher.fetch(f"{base_url}/article")
+    check(third["cache"] == "revalidated", "Stale entry is revalidated with ETag (304)")
+    check(
+        third["content"] == first["content"], "Revalidated entry keeps the article text"
+    )
+
+    await fetcher.fetch(f"{base_url}/dated")
+    dated = await fetcher.fetch(f"{base_url}/dated")
+    check(
+        dated["cache"] == "revalidated", "Stale entry is revalidated with Last-Modified"
+    )
+
+    StandIn.etag = '"v2"'
+    changed = await fetcher.fetch(f"{base_url}/article")
+    check(
+        changed["cache"] == "miss" and fetcher.modified == 1,
+        "Changed page is refetched",
+    )
+
+    big = await fetcher.fetch(f"{base_url}/big")
+    check(
+        not big["error"] and big["article_info"]["truncated"],
+        "Oversized page is cut at the byte cap and still extracted",
+    )
+
+    started = time.monotonic()
+    slow = await fetcher.fetch(f"{base_url}/slow")
+    check(
+        slow["error"] and time.monotonic() - started < 1.5,
+        "Slow page fails at the timeout",
+    )
+
+    image = await fetcher.fetch(f"{base_url}/image")
+    check(
+        image["error"] and "content type" in image["message"],
+        "Non-HTML page is rejected",
+    )
+
+    missing = await fetcher.fetch(f"{base_url}/missing")
+    check(missing["error"] and "404" in missing["message"], "HTTP errors are reported")
+
+    print(fetcher.stats())
+
+
+class LoopbackOnlyFetcher(ArticleFetcher):
+    """Treats 127.0.0.1 as public so the stand-in can play a public host."""
+
+    def _address_allowed(self, address: str) -> bool:
+        return address == "127.0.0.1"
+
+
+async def check_address_checks(base_url: str):
+    check(is_public_address("93.184.216.34"), "Public addresses are allowed")
+    check(
+        not any(
+            is_public_address(address)
+            for address in (
+                "127.0.0.1",
+                "10.1.2.3",
+                "192.168.0.1",
+                "169.254.169.254",
+                "::1",
+                "fd00::1",
+                "::ffff:127.0.0.1",
+                "0.0.0.0",
+            )
+        ),
+        "Loopback, private, link-local and unspecified addresses are refused",
+    )
+
+    strict = ArticleFetcher(timeout_seconds=1)
+    hits = StandIn.hits.get("/article", 0)
+    loopback = await strict.fetch(f"{base_url}/article")
+    metadata = await strict.fetch("http://169.254.169.254/latest/meta-data/")
+    check(
+        loopback["error"] and metadata["error"] and strict.errors["blocked"] == 2,
+        "Loopback and metadata URLs are refused by default",
+    )
+    check(StandIn.hits.get("/article", 0) == hits, "Refused URLs are never requested")
+
+    fetcher = LoopbackOnlyFetcher(timeout_seconds=1, max_redirects=3)
+    redirected = await fetcher.fetch(f"{base_url}/redirect")
+    check(not redirected["error"], "Redirects to allowed hosts are followed")
+
+    internal = await fetcher.fetch(f"{base_url}/internal")
+    check(
+        internal["error"] and fetcher.errors.get("blocked") == 1,
+        "Redirects to non-public addresses are refused",
+    )
+
+    looping = await fetcher.fetch(f"{base_url}/loop")
+    check(
+        looping["error"] and StandIn.hits["/loop"] == 4,
+        "Redirect chains stop at max_redirects",
+    )
+
+
+class PublicOnlyFetcher(ArticleFetcher):
+    """Allows only the documentation address standing in for a public host."""
+
+    def _address_allowed(self, address: str) -> bool:
+        return address == PUBLIC_ADDRESS
+
+
+PUBLIC_ADDRESS = "93.184.216.34"
+
+
+async def check_rebinding(base_url: str):
+    # The host passes the check as a public address, then resolves to the
+    # loopback stand-in when the HTTP client connects
+    port = base_url.rsplit(":", 1)[1]
+    url = f"http://rebind.test:{port}/article"
+    real_getaddrinfo = socket.getaddrinfo
+    lookups = []
+
+    def rebinding_getaddrinfo(host, *args, **kwargs):
+        if host not in ("rebind.test", b"rebind.test"):
+            return real_getaddrinfo(host, *args, **kwargs)
+        lookups.append(host)
+        address = PUBLIC_ADDRESS if len(lookups) == 1 else "127.0.0.1"
+        return real_getaddrinfo(address, *args, **kwargs)
+
+    real_get_async_client = http_client.get_async_client
+    socket.getaddrinfo = rebinding_getaddrinfo
+    try:
+        for label, get_async_client in (
+            ("async", real_get_async_client),
+            ("blocking", lambda: None),
+        ):
+            lookups.clear()
+            http_client.get_async_client = get_async_client
+            fetcher = PublicOnlyFetcher(timeout_seconds=2)
+            result = await fetcher.fetch(url)
+            check(
+                len(lookups) == 2
+                and result["error"]
+                and fetcher.errors.get("blocked") == 1
+                and fetcher.bytes_downloaded == 0,
+                f"A host rebound to loopback after the check is refused ({label})",
+            )
+            allowed = await LoopbackOnlyFetcher(timeout_seconds=2).fetch(
+                f"{base_url}/article"
+            )
+            check(
+                not allowed["error"],
+                f"The connected address of an allowed host is accepted ({label})",
+            )
+    finally:
+        socket.getaddrinfo = real_getaddrinfo
+        http_client.get_async_client = real_get_async_client
+
+
+async def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print("🧪 Testing article extraction")
+    print("=" * 50)
+    try:
+        check_extraction()
+        check_canonical_url()
+        await check_fetching(base_url)
+        await check_address_checks(base_url)
+        await check_rebinding(base_url)
+    finally:
+        server.shutdown()
+    print("\n🎉 All article tests passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test script for the background artifact writer.
+
+Checks that records are written and read back, that drops are counted
+exactly under concurrent writes, and that retention removes old segments
+without waiting for a rotation, along with the index files of writers with
+no segments left. Uses a temporary directory.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agents.artifacts import ArtifactWriter, read_artifacts
+
+
+def check(condition: bool, label: str):
+    print(f"{'✅' if condition else '❌'} {label}")
+    if not condition:
+        raise AssertionError(label)
+
+
+def check_writing(directory: Path):
+    writer = ArtifactWriter(directory, flush_interval_seconds=0.05)
+    for index in range(10):
+        writer.write("extract", {"index": index})
+    writer.write("prompt", "Reflect on deep work")
+    check(writer.flush(timeout=5), "Queued records are flushed")
+    writer.close()
+
+    records = list(read_artifacts(directory, kind="extract"))
+    check(
+        [record["content"]["index"] for record in records] == list(range(10)),
+        "Records are read back in order",
+    )
+    index = json.loads(
+        directory.joinpath(f"index-{writer.writer_id}.json").read_text()
+    )
+    check(
+        index["segments"][0]["kinds"] == {"extract": 10, "prompt": 1},
+        "The index counts records per kind",
+    )
+
+
+def check_drops(directory: Path):
+    writer = ArtifactWriter(directory, max_queue=1, flush_interval_seconds=0.05)
+    per_thread = 500
+
+    def produce():
+        for index in range(per_thread):
+            writer.write("extract", index)
+
+    threads = [threading.Thread(target=produce) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.flush(timeout=5)
+    writer.close()
+
+    stats = writer.stats()
+    check(
+        stats["written"] + stats["dropped"].get("extract", 0) == 4 * per_thread,
+        f"Every record is written or counted as dropped ({stats['dropped']})",
+    )
+
+
+def check_retention(directory: Path):
+    # A writer whose segments were all deleted, and one with a segment left
+    directory.joinpath("index-100-1.json").write_text('{"segments": []}')
+    directory.joinpath("index-100-2.tmp").write_text("{")
+    directory.joinpath("index-200-3.json").write_text('{"segments": []}')
+    writer = ArtifactWriter(directory, flush_interval_seconds=0.05)
+    directory.joinpath("200-3-00001.jsonl.gz").write_bytes(b"")
+
+    writer.write("extract", "hello")
+    writer.flush(timeout=5)
+    writer.close()
+
+    names = sorted(path.name for path in directory.iterdir())
+    check(
+        "index-100-1.json" not in names and "index-100-2.tmp" not in names,
+        "Index files of writers without segments are deleted",
+    )
+    check(
+        "index-200-3.json" in names and f"index-{writer.writer_id}.json" in names,
+        "Index files of writers with segments are kept",
+    )
+    check(
+        writer.stats()["deleted_indexes"] == 2,
+        "Deleted index files are counted",
+    )
+
+
+def check_periodic_retention(directory: Path):
+    old = directory.joinpath("100-1-00001.jsonl.gz")
+    old.write_bytes(b"")
+    os.utime(old, (time.time() - 7200, time.time() - 7200))
+    writer = ArtifactWriter(
+        directory,
+        flush_interval_seconds=0.02,
+        max_age_seconds=3600,
+        retention_interval_seconds=0.05,
+    )
+    writer.start()
+    deadline = time.monotonic() + 2
+    while old.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    check(not old.exists(), "Old segments are deleted when the writer starts")
+
+    stale = directory.joinpath("100-2-00001.jsonl.gz")
+    stale.write_bytes(b"")
+    os.utime(stale, (time.time() - 7200, time.time() - 7200))
+    deadline = time.monotonic() + 2
+    while stale.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.close()
+    check(
+        not stale.exists() and writer.stats()["rotations"] == 0,
+        "Retention runs periodically on a quiet writer",
+    )
+
+
+def main():
+    print("🧪 Testing artifact writer")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as directory:
+        check_writing(Path(directory))
+    with tempfile.TemporaryDirectory() as directory:
+        check_drops(Path(directory))
+    with tempfile.TemporaryDirectory() as directory:
+        check_retention(Path(directory))
+    with tempfile.TemporaryDirectory() as directory:
+        check_periodic_retention(Path(directory))
+    print("\n🎉 All artifact tests passed")
+
+
+if __name__ == "__main__":
+    main()
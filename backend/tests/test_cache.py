@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script for the extraction caches.
+
+Checks that the layered cache promotes disk hits into memory without
+outliving the disk entry. Uses a temporary directory; no network access or
+API keys needed.
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agents.cache import DiskStore, LayeredCache, TTLCache
+
+
+def check(condition: bool, label: str):
+    print(f"{'✅' if condition else '❌'} {label}")
+    if not condition:
+        raise AssertionError(label)
+
+
+def memory_expiry(cache: LayeredCache, key: str) -> float:
+    """Expiry of a key in the memory layer, as a Unix timestamp."""
+    return cache.memory._entries[key][0]
+
+
+def check_promotion(directory: Path):
+    disk = DiskStore(directory, ttl_seconds=3600)
+    cache = LayeredCache(TTLCache(ttl_seconds=600), disk)
+
+    disk.set("short", {"title": "Deep Work"}, ttl_seconds=30)
+    _, disk_expires_at = disk.get_with_expiry("short")
+    check(cache.get("short") == {"title": "Deep Work"}, "Disk hits are served")
+    check(
+        memory_expiry(cache, "short") <= disk_expires_at + 1,
+        "A promoted entry expires no later than its disk entry",
+    )
+
+    disk.set("long", {"title": "Focus"})
+    started = time.time()
+    asyncio.run(cache.aget("long"))
+    check(
+        memory_expiry(cache, "long") <= started + 600 + 1,
+        "A promoted entry keeps at most the memory TTL",
+    )
+
+    disk.set("expired", {"title": "Gone"}, ttl_seconds=-1)
+    check(
+        cache.get("expired") is None and "expired" not in cache.memory._entries,
+        "Expired disk entries are neither served nor promoted",
+    )
+
+
+def main():
+    print("🧪 Testing extraction caches")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as directory:
+        check_promotion(Path(directory))
+    print("\n🎉 All cache tests passed")
+
+
+if __name__ == "__main__":
+    main()
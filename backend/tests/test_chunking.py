@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test script for transcript chunking and merging.
+
+Checks that chunks stay within the token budget, including sentences and
+words longer than the budget, that streamed text is chunked like the whole
+text, and that per-chunk insights are merged without duplicates. No network
+access or API keys needed.
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agents.chunking import (
+    StreamingChunker,
+    chunk_text,
+    estimate_tokens,
+    merge_insights,
+)
+
+SENTENCES = [f"Sentence number {index} is about deep work." for index in range(40)]
+
+
+def check(condition: bool, label: str):
+    print(f"{'✅' if condition else '❌'} {label}")
+    if not condition:
+        raise AssertionError(label)
+
+
+def within(chunks, max_tokens: int) -> bool:
+    return all(estimate_tokens(chunk) <= max_tokens for chunk in chunks)
+
+
+def check_budget():
+    text = " ".join(SENTENCES)
+    chunks = chunk_text(text, 40)
+    check(len(chunks) > 1 and within(chunks, 40), "Chunks fit the budget")
+    check(
+        chunks[1].startswith(chunks[0].split(". ")[-1]),
+        "Consecutive chunks share an overlap sentence",
+    )
+
+    run_on = " ".join(f"word{index}" for index in range(300)) + "."
+    chunks = chunk_text(f"{SENTENCES[0]} {run_on} {SENTENCES[1]}", 40)
+    check(within(chunks, 40), "An oversized sentence is split within the budget")
+    words = " ".join(chunks).split()
+    check(
+        all(word in words for word in run_on.split()),
+        "No words are lost when splitting",
+    )
+
+    url = "https://example.com/" + "a" * 500
+    chunks = chunk_text(f"See {url} for details.", 20)
+    check(
+        within(chunks, 20) and url in "".join(chunks),
+        "A word longer than the budget is cut to fit",
+    )
+
+
+def check_streaming():
+    # Pieces end between words, as pages of a document do
+    text = " ".join(SENTENCES)
+    words = text.split()
+    chunker = StreamingChunker(40)
+    streamed = []
+    for start in range(0, len(words), 11):
+        streamed += chunker.add(" ".join(words[start : start + 11]))
+    streamed += chunker.finish()
+    check(streamed == chunk_text(text, 40), "Streamed text is chunked like whole text")
+
+
+def check_merging():
+    results = [
+        {"insights": [{"point": "Protect deep work time every morning"}]},
+        {
+            "insights": [
+                {"point": "Protect deep work time each morning", "type": "actionable"},
+                {"point": "Sleep well before hard tasks"},
+            ]
+        },
+    ]
+    merged = merge_insights(results)
+    check(
+        [insight["point"] for insight in merged]
+        == ["Protect deep work time every morning", "Sleep well before hard tasks"],
+        "Near-duplicate insights are merged and ranked by support",
+    )
+
+
+def main():
+    print("🧪 Testing chunking")
+    print("=" * 50)
+    check_budget()
+    check_streaming()
+    check_merging()
+    print("\n🎉 All chunking tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test script for transcript normalization.
+
+Checks caption cleanup on hand-made caption fragments: rolling-caption
+overlaps, repeated lines, markers, fillers and stutters, token accounting
+and budget trimming. No network access or API keys needed.
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agents.chunking import estimate_tokens
+from agents.transcript_normalizer import TranscriptNormalizer
+
+
+def check(condition: bool, label: str):
+    print(f"{'✅' if condition else '❌'} {label}")
+    if not condition:
+        raise AssertionError(label)
+
+
+def normalize(texts, **options):
+    fragments = [{"text": text} for text in texts]
+    return TranscriptNormalizer(**options).normalize(fragments)
+
+
+def check_overlaps():
+    spoken = normalize(["so that is why I", "I think it works"])["text"]
+    check(
+        spoken == "so that is why I I think it works",
+        "A one-word repeat between separate cues is kept as speech",
+    )
+
+    rolling = TranscriptNormalizer().normalize(
+        [
+            {"text": "so that is why I", "start": 0.0, "duration": 3.0},
+            {"text": "I think it works", "start": 2.0, "duration": 3.0},
+        ]
+    )["text"]
+    check(
+        rolling == "so that is why I think it works",
+        "A repeat between cues overlapping in time is removed",
+    )
+
+    long_overlap = normalize(["we went to the store", "to the store and bought milk"])
+    check(
+        long_overlap["text"] == "we went to the store and bought milk"
+        and long_overlap["stats"]["overlap_words"] == 3,
+        "A repeat of min_overlap_words or more is removed",
+    )
+
+    repeated = normalize(
+        [
+            "the key to focus is removing distractions",
+            "the key to focus is removing distractions",
+            "then schedule deep work",
+        ]
+    )
+    check(
+        repeated["text"]
+        == "the key to focus is removing distractions then schedule deep work"
+        and repeated["stats"]["fragments_dropped"] == 1,
+        "A repeated line is dropped",
+    )
+
+
+def check_cleanup():
+    cleaned = normalize(["[Music] um so the the plan is uh simple ♪"])["text"]
+    check(
+        cleaned == "so the plan is simple",
+        "Markers, fillers and stutters are removed",
+    )
+
+    grammatical = normalize(["he had had enough", "I know that that works"])
+    check(
+        grammatical["text"] == "he had had enough I know that that works",
+        "Grammatical repeats are kept",
+    )
+
+
+def check_token_accounting():
+    texts = ["ab"] * 100
+    result = normalize(texts, strip_fillers=False)
+    joined = " ".join(texts)
+    check(
+        result["stats"]["tokens_in"] == estimate_tokens(joined),
+        "Input tokens are estimated once for the whole text",
+    )
+
+    words = [f"sentence number {index} about focus" for index in range(200)]
+    budgeted = normalize(words, token_budget=100, trim_strategy="head")
+    check(
+        estimate_tokens(budgeted["text"]) <= 100
+        and budgeted["text"].startswith("sentence number 0 "),
+        "Head trimming keeps the start within the budget",
+    )
+    uniform = normalize(words, token_budget=100, trim_strategy="uniform")
+    kept = [int(word) for word in uniform["text"].split() if word.isdigit()]
+    check(
+        estimate_tokens(uniform["text"]) <= 100 and kept[-1] >= 150,
+        "Uniform trimming samples across the transcript within the budget",
+    )
+
+
+def main():
+    print("🧪 Testing transcript normalization")
+    print("=" * 50)
+    check_overlaps()
+    check_cleanup()
+    check_token_accounting()
+    print("\n🎉 All normalizer tests passed")
+
+
+if __name__ == "__main__":
+    main()
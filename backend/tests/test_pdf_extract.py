@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test script for parallel PDF text extraction.
+
+Builds small PDFs in a temporary directory and checks page order, the
+per-document time limit inside the workers, and that workers let go of a
+document after its last range. Requires pypdf; no network access needed.
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import agents.pdf_extract as pdf_module
+from agents.pdf_extract import PYPDF_AVAILABLE, PdfExtractor, extract_page_range
+
+
+def check(condition: bool, label: str):
+    print(f"{'✅' if condition else '❌'} {label}")
+    if not condition:
+        raise AssertionError(label)
+
+
+def make_pdf(page_texts) -> bytes:
+    """Build a minimal PDF with one line of Helvetica text per page."""
+    count = len(page_texts)
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(count))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {count} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(page_texts):
+        stream = f"BT /F1 12 Tf 50 750 Td ({text}) Tj ET".encode()
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode()
+        )
+        objects.append(
+            b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    return bytes(out)
+
+
+def check_worker(path: str):
+    texts = extract_page_range(path, 0, 2, document_key="doc")
+    check(
+        [text.strip() for text in texts] == ["Page 0", "Page 1"],
+        "A range yields the text of its pages",
+    )
+    check(pdf_module._worker_reader[0] == "doc", "The document is kept between ranges")
+
+    extract_page_range(path, 2, 4, document_key="doc", release=True)
+    check(
+        pdf_module._worker_reader == (None, None),
+        "The document is released after its last range",
+    )
+
+    check(
+        extract_page_range(path, 0, 4, document_key="doc", deadline=time.time() - 1)
+        == [],
+        "Ranges starting after the deadline extract nothing",
+    )
+
+    # Each clock reading advances one second, so the deadline passes mid-range
+    clock = SimpleNamespace(now=1_000.0)
+
+    def tick():
+        clock.now += 1
+        return clock.now
+
+    real_time = pdf_module.time
+    pdf_module.time = SimpleNamespace(time=tick, monotonic=real_time.monotonic)
+    try:
+        partial = extract_page_range(path, 0, 8, document_key="doc", deadline=1_004.5)
+    finally:
+        pdf_module.time = real_time
+    check(
+        0 < len(partial) < 8 and pdf_module._worker_reader == (None, None),
+        f"Workers stop at the deadline and release the document ({len(partial)} pages)",
+    )
+
+
+async def check_extractor(path: Path):
+    extractor = PdfExtractor(workers=2, pages_per_task=3, chunk_tokens=50)
+    try:
+        result = await extractor.extract(path, "hash-1")
+    finally:
+        extractor.close()
+    pages = [line.strip() for line in result["text"].split("\n\n")]
+    check(
+        pages == [f"Page {index}" for index in range(12)]
+        and not result["timed_out"],
+        "Ranges from the pool are assembled in page order",
+    )
+    check(result["chunks"], "Text is split into chunks")
+
+
+def main():
+    print("🧪 Testing PDF extraction")
+    print("=" * 50)
+    if not PYPDF_AVAILABLE:
+        print("⚠️ pypdf not installed, skipping")
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory, "pages.pdf")
+        path.write_bytes(make_pdf([f"Page {index}" for index in range(12)]))
+        check_worker(str(path))
+        asyncio.run(check_extractor(path))
+    print("\n🎉 All PDF extraction tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test script for the rate limiter storage backends.
+
+Runs the same GCRA checks against every store, and checks how stores are
+configured. Uses a temporary SQLite database; no server needed.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from api.rate_limit_store import (
+    LocalKVClient,
+    MemoryRateLimitStore,
+    NetworkRateLimitStore,
+    SQLiteRateLimitStore,
+    create_store,
+)
+
+# 5 units per 100 seconds: one unit replenishes every 20 seconds
+INCREMENT = 20.0
+LIMIT = 100.0
+
+
+def make_kv_client():
+    """Factory named by RATE_LIMIT_KV_CLIENT in check_configuration."""
+    return LocalKVClient()
+
+
+def check(condition: bool, label: str):
+    print(f"{'✅' if condition else '❌'} {label}")
+    if not condition:
+        raise AssertionError(label)
+
+
+def check_gcra(store):
+    now = 1_000.0
+    allowed = [store.consume("client", now, INCREMENT, LIMIT)[0] for _ in range(6)]
+    check(allowed == [True] * 5 + [False], f"{store.name}: quota runs out")
+
+    check(
+        store.consume("client", now + INCREMENT, INCREMENT, LIMIT)[0],
+        f"{store.name}: one unit replenishes after the emission interval",
+    )
+
+    tat = store.refund("client", now + INCREMENT, 2 * INCREMENT)
+    check(
+        tat == now + 4 * INCREMENT,
+        f"{store.name}: refunds move the TAT back",
+    )
+    check(
+        store.refund("client", now + 10 * INCREMENT, INCREMENT)
+        == now + 10 * INCREMENT,
+        f"{store.name}: refunds never move the TAT before now",
+    )
+    check(
+        store.get("other", now) == now,
+        f"{store.name}: unknown clients have their full quota",
+    )
+
+
+def check_configuration():
+    try:
+        create_store("network")
+        refused = False
+    except ValueError:
+        refused = True
+    check(refused, "Network store without a KV client is refused")
+
+    store = create_store("network", kv_client=LocalKVClient())
+    check(store.name == "network", "Network store accepts an injected client")
+
+    os.environ["RATE_LIMIT_KV_CLIENT"] = f"{__name__}:make_kv_client"
+    try:
+        configured = create_store("network")
+    finally:
+        del os.environ["RATE_LIMIT_KV_CLIENT"]
+    check(
+        isinstance(configured.client, LocalKVClient),
+        "Network store loads the configured client factory",
+    )
+
+    check(
+        not MemoryRateLimitStore.blocking
+        and SQLiteRateLimitStore.blocking
+        and NetworkRateLimitStore.blocking,
+        "Stores waiting on locks or the network are marked blocking",
+    )
+
+
+def main():
+    print("🧪 Testing rate limit stores")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as directory:
+        for store in (
+            MemoryRateLimitStore(stripes=4),
+            SQLiteRateLimitStore(Path(directory, "rate_limits.sqlite3")),
+            NetworkRateLimitStore(LocalKVClient()),
+        ):
+            check_gcra(store)
+    check_configuration()
+    print("\n🎉 All rate limit store tests passed")
+
+
+if __name__ == "__main__":
+    main()
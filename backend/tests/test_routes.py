@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Test script for rate limit settlement in the API routes.
+
+Calls the route functions directly with stand-in requests and a stand-in
+agent, and checks that failed requests and failed hops get their charge
+back, that settling never charges more than the up-front cost, and that
+metrics never query a blocking store on the event loop. No server or API
+keys needed.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Keep the artifacts written by the agent out of the source tree
+os.environ.setdefault("ARTIFACTS_DIR", tempfile.mkdtemp(prefix="artifacts-"))
+
+from fastapi import HTTPException
+
+import api.main  # noqa: F401  (the app module imports the routes)
+from agents.agent import OUTCOME_FAILED, OUTCOME_FULL
+from api import routes
+from api.rate_limit_store import SQLiteRateLimitStore
+from api.rate_limiter import check_rate_limit, rate_limiter
+
+VIDEO_URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+EXTRACTED = {"title": "Deep Work", "summary": "Focus.", "insights": []}
+
+
+def check(condition: bool, label: str):
+    print(f"{'✅' if condition else '❌'} {label}")
+    if not condition:
+        raise AssertionError(label)
+
+
+def make_request(client_ip: str, path: str):
+    request = SimpleNamespace(
+        client=SimpleNamespace(host=client_ip),
+        headers={},
+        url=SimpleNamespace(path=path),
+        state=SimpleNamespace(),
+    )
+    check_rate_limit(request)
+    return request
+
+
+def used(request) -> int:
+    status = rate_limiter.peek(rate_limiter._get_client_id(request))
+    return rate_limiter.max_requests - status.remaining
+
+
+class StandInAgent:
+    """Agent whose extraction and prompt hops succeed, fail or raise."""
+
+    def __init__(self, extract=OUTCOME_FULL, prompt=OUTCOME_FULL):
+        self.extract = extract
+        self.prompt = prompt
+
+    async def extract_key_points_with_outcome_async(self, url):
+        if self.extract is None:
+            raise RuntimeError("extraction failed")
+        return dict(EXTRACTED), self.extract
+
+    async def generate_prompt_with_outcome_async(self, extracted_data, user_context):
+        if self.prompt is None:
+            raise RuntimeError("prompt failed")
+        return "Reflect on deep work", self.prompt
+
+
+async def status_of(route, request, **kwargs) -> int:
+    try:
+        await route(request, **kwargs)
+    except HTTPException as e:
+        return e.status_code
+    return 200
+
+
+async def check_settlement():
+    real_agent = routes.introspect_agent
+    try:
+        routes.introspect_agent = StandInAgent()
+        served = make_request("203.0.113.1", "/api/extract")
+        await routes.extract_content(served, file=None, youtube_url=VIDEO_URL)
+        check(used(served) == 1, "A full extraction keeps its charge")
+
+        empty = make_request("203.0.113.2", "/api/extract")
+        status = await status_of(
+            routes.extract_content, empty, file=None, youtube_url=None
+        )
+        check(
+            status == 400 and used(empty) == 0,
+            "Requests without content are refunded",
+        )
+
+        routes.introspect_agent = StandInAgent(extract=None)
+        failed = make_request("203.0.113.3", "/api/extract")
+        status = await status_of(
+            routes.extract_content, failed, file=None, youtube_url=VIDEO_URL
+        )
+        check(status == 500 and used(failed) == 0, "Failed extractions are refunded")
+
+        routes.introspect_agent = StandInAgent(extract=OUTCOME_FAILED)
+        placeholder = make_request("203.0.113.4", "/api/extract")
+        await routes.extract_content(placeholder, file=None, youtube_url=VIDEO_URL)
+        check(used(placeholder) == 0, "Placeholder extractions are not charged")
+
+        routes.introspect_agent = StandInAgent(prompt=None)
+        half = make_request("203.0.113.5", "/api/process")
+        status = await status_of(
+            routes.process_content,
+            half,
+            file=None,
+            youtube_url=VIDEO_URL,
+            interests="",
+            goals="",
+            background="",
+        )
+        check(
+            status == 500 and used(half) == 1,
+            "A failed prompt hop refunds only its own charge",
+        )
+        check(
+            getattr(half.state, "rate_limit_cost", None) is None,
+            "Every request is settled exactly once",
+        )
+
+        # Stores are only asked to move a client's TAT back, never forward
+        decrements = []
+        store_refund = rate_limiter.store.refund
+
+        def recording_refund(client_id, now, decrement):
+            decrements.append(decrement)
+            return store_refund(client_id, now, decrement)
+
+        rate_limiter.store.refund = recording_refund
+        try:
+            costly = make_request("203.0.113.6", "/api/extract")
+            await rate_limiter.asettle(costly, [OUTCOME_FULL, OUTCOME_FULL, "retried"])
+        finally:
+            del rate_limiter.store.refund
+        check(
+            decrements == [0.0] and used(costly) == 1,
+            "Outcomes costing more than the charge never add to it",
+        )
+    finally:
+        routes.introspect_agent = real_agent
+    print(rate_limiter.stats())
+
+
+class RecordingSQLiteStore(SQLiteRateLimitStore):
+    """SQLite store recording the threads its stats are read on."""
+
+    threads = []
+
+    def stats(self):
+        self.threads.append(threading.current_thread())
+        return super().stats()
+
+
+async def check_metrics():
+    real_store = rate_limiter.store
+    with tempfile.TemporaryDirectory() as directory:
+        rate_limiter.store = RecordingSQLiteStore(Path(directory, "limits.sqlite3"))
+        try:
+            metrics = await routes.get_metrics()
+        finally:
+            rate_limiter.store = real_store
+    check(
+        metrics["rate_limiter"]["backend"] == "sqlite"
+        and RecordingSQLiteStore.threads
+        and threading.main_thread() not in RecordingSQLiteStore.threads,
+        "Metrics read a blocking store's counts off the event loop",
+    )
+
+
+def main():
+    print("🧪 Testing route settlement")
+    print("=" * 50)
+    asyncio.run(check_settlement())
+    asyncio.run(check_metrics())
+    print("\n🎉 All route tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script for the offline rule engine.
+
+Matches transcripts against the shipped rule packs and checks that a pack
+only fires on content about its topic, and that markers match whole words.
+No network access or API keys needed.
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agents.rules import RuleEngine, RulePack
+
+RULE_PACKS_DIR = Path(__file__).parent.parent / "agents" / "rule_packs"
+
+ON_TOPIC = """
+The ultra wealthy are professionals at saying no. They guard the first hour
+of the day, no phone and no people. They design their defaults, like default
+meals, so there is zero cognitive load. And they weaponize boredom, because
+boredom is a feature and not a bug.
+"""
+
+# A list-style transcript about something else entirely
+OFF_TOPIC = """
+First thing, feed your sourdough starter the night before. The second thing
+is the autolyse: mix flour and water and let it rest. The third thing is the
+stretch and folds, every thirty minutes. The fifth thing people forget is
+steam, and seventh, let the loaf cool before you cut it. I color code my
+jars and track it for a week to see how the starter behaves.
+"""
+
+
+def check(condition: bool, label: str):
+    print(f"{'✅' if condition else '❌'} {label}")
+    if not condition:
+        raise AssertionError(label)
+
+
+def check_packs(engine: RuleEngine):
+    pack, matches = engine.match(ON_TOPIC)
+    check(
+        pack is not None and pack.name == "productivity",
+        "A transcript about the pack's topic matches it",
+    )
+    check(
+        len({found.rule_id for found in matches}) >= pack.required_matches,
+        f"Enough distinct rules matched ({len(matches)} markers)",
+    )
+
+    pack, matches = engine.match(OFF_TOPIC)
+    check(
+        pack is None and not matches,
+        "An off-topic list of 'second thing, third thing' matches no pack",
+    )
+
+
+def check_word_boundaries():
+    pack = RulePack(
+        {
+            "name": "test",
+            "rules": [
+                {"id": "hour", "markers": ["first hour"], "point": "Hour"},
+                {"id": "focus", "markers": ["deep work"], "point": "Focus"},
+            ],
+        }
+    )
+    engine = RuleEngine([pack])
+    check(
+        [found.rule_id for found in engine.scan("the first hours of deep working")]
+        == [],
+        "Markers do not match inside longer words",
+    )
+    check(
+        [found.rule_id for found in engine.scan("In the FIRST  hour, deep work.")]
+        == ["hour", "focus"],
+        "Whole-word markers match across case and whitespace",
+    )
+
+
+def check_required_matches():
+    rules = [
+        {"id": f"rule-{index}", "markers": [f"marker {index}"], "point": "x"}
+        for index in range(10)
+    ]
+    pack = RulePack({"name": "share", "rules": rules, "min_matches": 2})
+    check(pack.required_matches == 2, "min_matches applies without min_share")
+    pack.min_share = 0.5
+    check(pack.required_matches == 5, "min_share raises the required matches")
+
+    engine = RuleEngine([pack])
+    text = " ".join(f"marker {index}." for index in range(4))
+    check(engine.match(text)[0] is None, "Packs below their share do not match")
+
+
+def main():
+    print("🧪 Testing rule engine")
+    print("=" * 50)
+    check_packs(RuleEngine.from_directory(RULE_PACKS_DIR))
+    check_word_boundaries()
+    check_required_matches()
+    print("\n🎉 All rule engine tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script for single-flight coalescing.
+
+Checks that concurrent callers share one execution, and what happens when
+the caller running the work or a waiting caller is cancelled. No network
+access or API keys needed.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agents.singleflight import SingleFlight
+
+
+def check(condition: bool, label: str):
+    print(f"{'✅' if condition else '❌'} {label}")
+    if not condition:
+        raise AssertionError(label)
+
+
+class Work:
+    """Counts runs and answers after a delay."""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.runs = 0
+
+    async def __call__(self):
+        self.runs += 1
+        await asyncio.sleep(self.delay)
+        return {"run": self.runs}
+
+
+async def check_coalescing():
+    flight = SingleFlight()
+    work = Work()
+    results = await asyncio.gather(*(flight.do("key", work) for _ in range(4)))
+    check(work.runs == 1, "Concurrent callers share one execution")
+    check(
+        [shared for _, shared in results] == [False, True, True, True],
+        "Only the first caller runs the work",
+    )
+    results[1][0]["run"] = 99
+    check(results[2][0] == {"run": 1}, "Each caller gets its own copy")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    outcomes = await asyncio.gather(
+        *(flight.do("error", fail) for _ in range(3)), return_exceptions=True
+    )
+    check(
+        all(isinstance(outcome, ValueError) for outcome in outcomes),
+        "Errors reach every caller",
+    )
+
+
+async def check_cancellation():
+    flight = SingleFlight()
+    work = Work()
+    leader = asyncio.create_task(flight.do("key", work))
+    await asyncio.sleep(0)
+    followers = [asyncio.create_task(flight.do("key", work)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+
+    leader.cancel()
+    results = await asyncio.gather(*followers)
+    check(leader.cancelled(), "Cancelled leader stays cancelled")
+    check(
+        work.runs == 2 and [shared for _, shared in results].count(False) == 1,
+        "A follower takes over the work of a cancelled leader",
+    )
+    check(
+        all(result == {"run": 2} for result, _ in results),
+        "Every follower gets the result of the new execution",
+    )
+    check(flight.stats()["in_flight"] == 0, "Nothing is left in flight")
+
+    work = Work()
+    leader = asyncio.create_task(flight.do("other", work))
+    await asyncio.sleep(0)
+    impatient = asyncio.create_task(flight.do("other", work))
+    patient = asyncio.create_task(flight.do("other", work))
+    await asyncio.sleep(0.01)
+    impatient.cancel()
+    result, _ = await leader
+    check(
+        impatient.cancelled() and (await patient)[0] == result and work.runs == 1,
+        "A cancelled follower does not disturb the others",
+    )
+    print(flight.stats())
+
+
+def main():
+    print("🧪 Testing single-flight coalescing")
+    print("=" * 50)
+    asyncio.run(check_coalescing())
+    asyncio.run(check_cancellation())
+    print("\n🎉 All single-flight tests passed")
+
+
+if __name__ == "__main__":
+    main()
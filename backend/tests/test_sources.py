@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test script for content source routing.
+
+Checks that resources reach the right source with the right cache key, and
+that per-source time and concurrency limits are applied. No network access
+or API keys needed.
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agents.sources import ContentSource, source_router, youtube_video_id
+
+ROUTES = [
+    ("https://youtu.be/RQ24JDuyLNs?si=gkOjnrxqZ4L6m6Lc", "youtube:RQ24JDuyLNs"),
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", "youtube:dQw4w9WgXcQ"),
+    ("https://www.youtube.com/watch?list=PL1&v=dQw4w9WgXcQ", "youtube:dQw4w9WgXcQ"),
+    ("youtube.com/shorts/dQw4w9WgXcQ", "youtube:dQw4w9WgXcQ"),
+    ("https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ", "youtube:dQw4w9WgXcQ"),
+    ("https://www.youtube.com/@channel", "url:https://www.youtube.com/@channel"),
+    ("https://youtube.com.example.org/watch?v=dQw4w9WgXcQ", None),
+    ("https://Example.com/post?utm_source=x#top", "url:https://example.com/post"),
+    ("Deep Work by Cal Newport", "url:Deep Work by Cal Newport"),
+]
+
+SOURCES = ["youtube"] * 6 + ["article"] * 2 + ["text"]
+
+
+def check(condition: bool, label: str):
+    print(f"{'✅' if condition else '❌'} {label}")
+    if not condition:
+        raise AssertionError(label)
+
+
+def check_routing():
+    for (resource, key), name in zip(ROUTES, SOURCES):
+        match = source_router.match(resource)
+        check(
+            match.source.name == name and (key is None or match.key == key),
+            f"{resource} -> {match.source.name} ({match.key})",
+        )
+
+    check(
+        youtube_video_id("https://youtu.be/dQw4w9WgXcQX") is None,
+        "IDs longer than 11 characters are rejected",
+    )
+
+    pdf = source_router.route_upload("application/pdf", "abc123", "book.pdf")
+    check(
+        pdf.source.name == "pdf_upload" and pdf.key == "upload:abc123",
+        "PDF uploads are keyed by content hash",
+    )
+    other = source_router.route_upload("application/zip", "abc123", "files.zip")
+    check(
+        other.source is source_router.fallback and other.key == "upload:abc123",
+        "Unknown upload types use the fallback source",
+    )
+
+
+async def check_limits():
+    source = ContentSource("limited", timeout_seconds=0.3, max_concurrency=2)
+
+    async def work():
+        await asyncio.sleep(0.1)
+        return "done"
+
+    started = time.monotonic()
+    results = await asyncio.gather(*(source.run(work) for _ in range(4)))
+    elapsed = time.monotonic() - started
+    check(
+        results == ["done"] * 4 and elapsed >= 0.2,
+        f"Concurrency limit queues extra runs ({elapsed:.2f}s)",
+    )
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    try:
+        await source.run(slow)
+        timed_out = False
+    except asyncio.TimeoutError:
+        timed_out = True
+    check(timed_out and source.timeouts == 1, "Time limit cancels slow runs")
+    print(source.stats())
+
+
+def main():
+    print("🧪 Testing content source routing")
+    print("=" * 50)
+    check_routing()
+    asyncio.run(check_limits())
+    print("\n🎉 All source tests passed")
+
+
+if __name__ == "__main__":
+    main()
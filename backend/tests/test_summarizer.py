@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test script for the offline extractive summarizer.
+
+Checks that the NumPy and pure-Python TextRank paths agree, that the NumPy
+path stays fast on an hour-long transcript and never holds more than one
+block of similarities, and that the summary skips repeated sentences. No
+network access or API keys needed.
+"""
+
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import agents.summarizer as summarizer_module
+from agents.summarizer import (
+    NUMPY_AVAILABLE,
+    _textrank_numpy,
+    _textrank_python,
+    split_sentences,
+    summarize,
+    tokenize,
+)
+
+# Seconds allowed for TextRank over a 30k-word transcript (about three hours
+# of captions); a dense sentence-by-sentence product takes several times more
+LONG_TRANSCRIPT_SECONDS = 0.5
+
+TOPICS = [
+    "deep work focus attention distraction schedule",
+    "sleep recovery energy morning routine habits",
+    "writing clarity drafts editing feedback readers",
+    "exercise strength walking heart health",
+]
+
+
+def check(condition: bool, label: str):
+    print(f"{'✅' if condition else '❌'} {label}")
+    if not condition:
+        raise AssertionError(label)
+
+
+def make_sentences(count: int, seed: int = 7):
+    """Sentences drawn from topic words, varied enough to avoid tied scores."""
+    rng = random.Random(seed)
+    sentences = []
+    for index in range(count):
+        words = TOPICS[index % len(TOPICS)].split() + TOPICS[index % 3].split()
+        words = rng.sample(words, rng.randint(3, 8))
+        sentences.append(" ".join(words) + f" point{rng.randint(0, 40)}.")
+    return sentences
+
+
+def make_transcript(word_count: int, seed: int = 3) -> str:
+    """Random sentences over a vocabulary with a long-tailed word frequency."""
+    rng = random.Random(seed)
+    vocabulary = sorted(
+        {
+            "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
+            for _ in range(4000)
+        }
+    )
+    frequencies = [1 / (rank + 30) for rank in range(len(vocabulary))]
+    sentences, words = [], 0
+    while words < word_count:
+        length = rng.randint(8, 20)
+        sentence = " ".join(rng.choices(vocabulary, frequencies, k=length))
+        sentences.append(sentence.capitalize() + ".")
+        words += length
+    return " ".join(sentences)
+
+
+def transcript_tokens(word_count: int):
+    sentences = split_sentences(make_transcript(word_count))
+    return [tokenize(sentence) for sentence in sentences]
+
+
+def check_paths_agree():
+    tokens = transcript_tokens(2000)
+    fast, fast_similarity = _textrank_numpy(tokens, 10, 0.85, 50, block_rows=16)
+    slow, slow_similarity = _textrank_python(tokens, 10, 0.85, 50)
+    check(
+        max(abs(a - b) for a, b in zip(fast, slow)) < 1e-4,
+        "NumPy and pure-Python scores agree",
+    )
+    check(
+        abs(fast_similarity(0, 4) - slow_similarity(0, 4)) < 1e-6,
+        "Similarity is computed on demand by both paths",
+    )
+    check(
+        _textrank_numpy(tokens[:1], 10, 0.85, 50)[0]
+        == _textrank_python(tokens[:1], 10, 0.85, 50)[0],
+        "A single sentence is scored without any edges",
+    )
+
+
+def check_long_transcript():
+    tokens = transcript_tokens(30000)
+    sizes = []
+    real_np = summarizer_module.np
+
+    class RecordingNumpy:
+        """Forwards to NumPy and records the size of each similarity block."""
+
+        def __getattr__(self, name):
+            return getattr(real_np, name)
+
+        def bincount(self, *args, **kwargs):
+            counts = real_np.bincount(*args, **kwargs)
+            sizes.append(counts.size)
+            return counts
+
+    summarizer_module.np = RecordingNumpy()
+    try:
+        _textrank_numpy(tokens, 10, 0.85, 50, block_rows=64)
+    finally:
+        summarizer_module.np = real_np
+    check(
+        max(sizes) <= 64 * len(tokens),
+        f"At most one block of similarities is held ({len(tokens)} sentences)",
+    )
+
+    started = time.perf_counter()
+    _textrank_numpy(tokens, 10, 0.85, 50)
+    elapsed = time.perf_counter() - started
+    check(
+        elapsed < LONG_TRANSCRIPT_SECONDS,
+        f"A 30k-word transcript is ranked in {elapsed * 1000:.0f} ms",
+    )
+
+
+def check_summary():
+    text = " ".join(make_sentences(40)) + " You should protect deep work time."
+    result = summarize(text * 2, title="Habits", max_insights=4)
+    points = [insight["point"] for insight in result["insights"]]
+    check(
+        result["title"] == "Habits" and 0 < len(points) <= 4,
+        "Summary has a title and at most max_insights insights",
+    )
+    check(len(set(points)) == len(points), "Repeated sentences are selected once")
+
+
+def main():
+    print("🧪 Testing offline summarizer")
+    print("=" * 50)
+    if not NUMPY_AVAILABLE:
+        print("⚠️ numpy not installed, checking the pure-Python path only")
+    else:
+        check_paths_agree()
+        check_long_transcript()
+    check_summary()
+    print("\n🎉 All summarizer tests passed")
+
+
+if __name__ == "__main__":
+    main()
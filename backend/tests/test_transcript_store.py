@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test script for the on-disk transcript store.
+
+Checks key validation, that the index survives a restart (including access
+order for eviction), and that the index file is not rewritten on every
+store. Uses a temporary directory; no network access needed.
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agents import transcript_store as store_module
+from agents.transcript_store import INDEX_FILENAME, TranscriptStore
+
+FRAGMENTS = [{"text": "hello world", "start": 0.0, "duration": 1.5}]
+
+
+def check(condition: bool, label: str):
+    print(f"{'✅' if condition else '❌'} {label}")
+    if not condition:
+        raise AssertionError(label)
+
+
+def video_id(index: int) -> str:
+    return f"video{index:06d}"
+
+
+def check_keys(directory: Path):
+    store = TranscriptStore(directory)
+    for bad_id, language in [
+        ("../../etc/x", "en"),
+        ("dQw4w9WgXcQ", "../en"),
+        ("https://example.com/a", "en"),
+    ]:
+        try:
+            store.put(bad_id, FRAGMENTS, language)
+            rejected = False
+        except ValueError:
+            rejected = True
+        check(rejected, f"Malformed key is rejected: {bad_id!r}, {language!r}")
+    check(
+        sorted(p.name for p in directory.iterdir()) == [],
+        "Nothing is written for rejected keys",
+    )
+
+    results = store.prefetch(["../../etc/passwd", "dQw4w9WgXcQ"], lambda _: FRAGMENTS)
+    check(
+        results == {"dQw4w9WgXcQ": True},
+        "Prefetch skips malformed video IDs",
+    )
+    check(store.get("dQw4w9WgXcQ") == FRAGMENTS, "Stored transcript is read back")
+
+
+def check_restart(directory: Path):
+    store = TranscriptStore(directory)
+    for index in range(3):
+        store.put(video_id(index), FRAGMENTS)
+    time.sleep(0.01)
+    store.get(video_id(0))
+
+    check(
+        not directory.joinpath(INDEX_FILENAME).exists(),
+        "Stores are journaled without rewriting the index file",
+    )
+
+    blob_bytes = store.stats()["bytes"] // 3
+    reopened = TranscriptStore(directory, max_bytes=blob_bytes * 3)
+    check(reopened.stats()["entries"] == 3, "Entries survive a restart")
+
+    reopened.put(video_id(3), FRAGMENTS)
+    check(
+        reopened.contains(video_id(0)) and not reopened.contains(video_id(1)),
+        "Eviction after a restart follows the persisted access order",
+    )
+
+    store_module.MIN_JOURNAL_RECORDS = 4
+    for index in range(4, 8):
+        reopened.put(video_id(index), FRAGMENTS)
+    check(
+        directory.joinpath(INDEX_FILENAME).exists(),
+        "The journal is folded into the index file once it grows",
+    )
+    final = TranscriptStore(directory, max_bytes=blob_bytes * 3)
+    check(
+        sorted(final._index) == sorted(reopened._index),
+        "Index and journal replay agree after folding",
+    )
+
+
+def main():
+    print("🧪 Testing transcript store")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as directory:
+        check_keys(Path(directory))
+    with tempfile.TemporaryDirectory() as directory:
+        check_restart(Path(directory))
+    print("\n🎉 All transcript store tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Test script for upload ingestion.
+
+Checks content sniffing, size limits, that oversized request bodies are cut
+off before they are parsed, and that text extraction runs within the time
+and concurrency limits of the upload's content source. Uses in-memory
+stand-ins for uploaded files and requests; no server or API keys needed.
+"""
+
+import asyncio
+import codecs
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fastapi import HTTPException
+
+from agents.sources import source_router
+from api.uploads import (
+    MIME_HTML,
+    MIME_MARKDOWN,
+    MIME_PDF,
+    MIME_TEXT,
+    MIME_UNKNOWN,
+    MULTIPART_OVERHEAD_BYTES,
+    UploadIngestor,
+    UploadSizeLimitMiddleware,
+    sniff_mime_type,
+)
+
+SNIFFING = [
+    (b"%PDF-1.7\n...", "notes.txt", MIME_PDF, "PDF magic wins over the file name"),
+    (
+        codecs.BOM_UTF8 + b"  <!DOCTYPE html><html>",
+        "page.txt",
+        MIME_HTML,
+        "HTML behind a byte order mark",
+    ),
+    (b"<div>\n<html lang='en'>", None, MIME_HTML, "HTML fragment before <html>"),
+    (b"# Title\n\nSome text", "README.md", MIME_MARKDOWN, "Markdown by extension"),
+    (b"plain words", "notes.pdf", MIME_TEXT, "Text named .pdf is still text"),
+    (b"caf\xc3", "cut.txt", MIME_TEXT, "Head ending mid-character is text"),
+    (b"PK\x03\x04\x00\x00", "archive.txt", MIME_UNKNOWN, "Binary is unknown"),
+    (b"\xff\xfe\xfd", "latin.txt", MIME_UNKNOWN, "Invalid UTF-8 is unknown"),
+]
+
+
+class StandInUpload:
+    """Minimal UploadFile serving bytes in chunks."""
+
+    def __init__(self, data: bytes, filename: str, declared_size: bool = True):
+        self.data = data
+        self.filename = filename
+        self.size = len(data) if declared_size else None
+        self._offset = 0
+
+    async def read(self, size: int) -> bytes:
+        chunk = self.data[self._offset : self._offset + size]
+        self._offset += len(chunk)
+        return chunk
+
+
+def check(condition: bool, label: str):
+    print(f"{'✅' if condition else '❌'} {label}")
+    if not condition:
+        raise AssertionError(label)
+
+
+async def status_of(ingestor: UploadIngestor, upload: StandInUpload) -> int:
+    try:
+        await ingestor.ingest(upload)
+    except HTTPException as e:
+        return e.status_code
+    return 200
+
+
+def check_sniffing():
+    for head, filename, expected, label in SNIFFING:
+        check(sniff_mime_type(head, filename) == expected, label)
+
+
+async def check_ingestion():
+    ingestor = UploadIngestor(max_bytes=1024, chunk_bytes=16)
+    html = b"<html><head><title>x</title></head><body><p>Deep work</p></body></html>"
+    document = await ingestor.ingest(StandInUpload(html, "essay.html"))
+    check(
+        document["mime_type"] == MIME_HTML and document["text"] == "Deep work",
+        "HTML upload yields its visible text",
+    )
+    check(document["title"] == "essay", "Title comes from the file name")
+
+    too_large = StandInUpload(b"x" * 2048, "big.txt", declared_size=False)
+    check(await status_of(ingestor, too_large) == 413, "Oversized stream is rejected")
+    check(await status_of(ingestor, StandInUpload(b"", "a.txt")) == 400, "Empty file")
+    check(
+        await status_of(ingestor, StandInUpload(b"\x00\x01", "a.bin")) == 415,
+        "Unknown types are rejected",
+    )
+    ingestor.close()
+
+
+async def call_middleware(ingestor, path, chunks, content_length=None):
+    """Send a request body through the middleware; return status and app view."""
+    seen = {"bytes": 0, "disconnected": False, "called": False}
+
+    async def app(scope, receive, send):
+        seen["called"] = True
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                seen["disconnected"] = True
+                raise RuntimeError("client disconnected")
+            seen["bytes"] += len(message["body"])
+            if not message.get("more_body"):
+                break
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": index < len(chunks) - 1}
+        for index, chunk in enumerate(chunks)
+    ]
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    headers = []
+    if content_length is not None:
+        headers.append((b"content-length", str(content_length).encode()))
+    scope = {"type": "http", "method": "POST", "path": path, "headers": headers}
+    await UploadSizeLimitMiddleware(app, ingestor)(scope, receive, send)
+    statuses = [m["status"] for m in sent if m["type"] == "http.response.start"]
+    return statuses, seen
+
+
+async def check_size_middleware():
+    ingestor = UploadIngestor(max_bytes=1024)
+    limit = ingestor.max_bytes + MULTIPART_OVERHEAD_BYTES
+    chunk = b"x" * 16 * 1024
+
+    statuses, seen = await call_middleware(
+        ingestor, "/api/extract", [chunk], content_length=limit + 1
+    )
+    check(
+        statuses == [413] and not seen["called"],
+        "A declared oversized body is rejected before it is read",
+    )
+
+    chunks = [chunk] * (limit // len(chunk) + 2)
+    statuses, seen = await call_middleware(ingestor, "/api/process", chunks)
+    check(
+        statuses == [413] and seen["disconnected"] and seen["bytes"] <= limit,
+        "An undeclared body is cut off once it passes the limit",
+    )
+
+    statuses, seen = await call_middleware(
+        ingestor, "/api/extract", [chunk, chunk], content_length=2 * len(chunk)
+    )
+    check(
+        statuses == [200] and seen["bytes"] == 2 * len(chunk),
+        "Bodies within the limit reach the route",
+    )
+
+    statuses, seen = await call_middleware(ingestor, "/api/prompt", chunks)
+    check(statuses == [200], "Other routes are not limited")
+    check(
+        ingestor.stats()["rejected"].get("too_large") == 2,
+        "Middleware rejections are counted by the ingestor",
+    )
+    ingestor.close()
+
+
+async def check_source_limits():
+    source = source_router.upload_source(MIME_TEXT)
+    limits = source.max_concurrency, source.timeout_seconds
+    source.max_concurrency, source.timeout_seconds = 1, 0.0
+
+    ingestor = UploadIngestor()
+    active = peak = 0
+
+    async def slow_extract(path, mime_type, content_hash, filename):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+        return "some text", None, None
+
+    ingestor._extract = slow_extract
+    try:
+        uploads = [StandInUpload(b"text %d" % index, "a.txt") for index in range(3)]
+        await asyncio.gather(*(ingestor.ingest(upload) for upload in uploads))
+        check(peak == 1, "Text extraction waits for the source's concurrency slot")
+
+        source.timeout_seconds = 0.01
+        check(
+            await status_of(ingestor, StandInUpload(b"text", "a.txt")) == 504,
+            "Text extraction is cut off at the source's time limit",
+        )
+    finally:
+        source.max_concurrency, source.timeout_seconds = limits
+        ingestor.close()
+
+
+def main():
+    print("🧪 Testing upload ingestion")
+    print("=" * 50)
+    check_sniffing()
+    asyncio.run(check_ingestion())
+    asyncio.run(check_size_middleware())
+    asyncio.run(check_source_limits())
+    print("\n🎉 All upload tests passed")
+
+
+if __name__ == "__main__":
+    main()
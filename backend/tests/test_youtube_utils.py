@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test script for the YouTube backup utilities.
+
+Checks the pooled HTTP sessions, the negative cache of failed videos and
+the async processing path with the network calls replaced by stand-ins.
+No network access or API keys needed.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agents import http_client
+from agents import youtube_utils
+
+VIDEO_URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+VIDEO_INFO = {"title": "Deep Work", "author_name": "Cal Newport"}
+TRANSCRIPT = "Title: Deep Work\nChannel: Cal Newport\n\nTranscript:\n" + "focus " * 20
+
+
+def check(condition: bool, label: str):
+    print(f"{'✅' if condition else '❌'} {label}")
+    if not condition:
+        raise AssertionError(label)
+
+
+def check_sessions():
+    shared = http_client.get_session()
+    transcripts = http_client.get_session("youtube_transcript")
+    check(shared is http_client.get_session(), "The default session is reused")
+    check(
+        transcripts is not shared
+        and transcripts.get_adapter("https://") is shared.get_adapter("https://"),
+        "Named sessions share the connection pool",
+    )
+    transcripts.headers.update({"Accept-Language": "en-US"})
+    check(
+        "Accept-Language" not in shared.headers,
+        "Headers set on a named session do not leak into the shared one",
+    )
+
+
+def check_negative_cache():
+    youtube_utils._record_unavailable("dQw4w9WgXcQ", "de", "NoTranscriptFound", "")
+    check(
+        youtube_utils.get_known_unavailable(VIDEO_URL, "de") is not None
+        and youtube_utils.get_known_unavailable(VIDEO_URL, "en") is None,
+        "A missing transcript only blocks its own language",
+    )
+    youtube_utils._record_unavailable("dQw4w9WgXcQ", "de", "VideoUnavailable", "")
+    check(
+        youtube_utils.get_known_unavailable(VIDEO_URL, "en")["error_class"]
+        == "VideoUnavailable",
+        "An unavailable video blocks every language",
+    )
+    youtube_utils.unavailable_videos.delete("dQw4w9WgXcQ")
+    youtube_utils.unavailable_videos.delete("dQw4w9WgXcQ:de")
+
+
+async def check_async_processing():
+    calls = []
+
+    async def aget(url, **kwargs):
+        calls.append(("aget", url))
+        return SimpleNamespace(status_code=200, json=lambda: dict(VIDEO_INFO))
+
+    def get_transcript(youtube_url, video_info=None):
+        calls.append(("transcript", video_info))
+        return TRANSCRIPT
+
+    real_aget, real_get_transcript = http_client.aget, youtube_utils.get_transcript
+    http_client.aget = aget
+    youtube_utils.get_transcript = get_transcript
+    youtube_utils._video_info_cache.clear()
+    try:
+        result = await youtube_utils.aprocess_youtube_content(VIDEO_URL)
+    finally:
+        http_client.aget = real_aget
+        youtube_utils.get_transcript = real_get_transcript
+
+    check(
+        not result["error"] and result["content"] == TRANSCRIPT,
+        "Async processing returns the transcript",
+    )
+    check(
+        [name for name, _ in calls] == ["aget", "transcript"]
+        and calls[1][1] == VIDEO_INFO,
+        "Video info is fetched asynchronously and reused for the transcript",
+    )
+
+    invalid = await youtube_utils.aprocess_youtube_content("https://example.com/")
+    check(invalid["error"], "URLs without a video ID are rejected")
+
+
+def main():
+    print("🧪 Testing YouTube utilities")
+    print("=" * 50)
+    check_sessions()
+    check_negative_cache()
+    asyncio.run(check_async_processing())
+    print("\n🎉 All YouTube utility tests passed")
+
+
+if __name__ == "__main__":
+    main()